@@ -1,12 +1,14 @@
 """
 Base Agent class for LangGraph multi-agent system
 """
-from typing import Dict, Any, List, Optional
+import time
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
 from abc import ABC, abstractmethod
-from langchain_core.messages import BaseMessage
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 from shared.config import settings
+from shared.metrics import LLM_IN_FLIGHT, LLM_LATENCY
+from .prompt_utils import compact_sections, count_tokens
+from .llm_router import LLMRoute, LLMRouter
 
 
 class BaseAgent(ABC):
@@ -18,31 +20,85 @@ class BaseAgent(ABC):
         role: str,
         model_provider: str = "openai",
         model_name: str = "gpt-4-turbo-preview",
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        fallback_provider: Optional[str] = None,
+        fallback_model_name: Optional[str] = None
     ):
         self.name = name
         self.role = role
-        self.model_provider = model_provider
+        # LLM_PROVIDER_OVERRIDE swaps every agent onto one provider (e.g. "fake" for load tests)
+        self.model_provider = settings.LLM_PROVIDER_OVERRIDE or model_provider
         self.model_name = model_name
         self.temperature = temperature
+        self.fallback_provider = settings.LLM_PROVIDER_OVERRIDE or fallback_provider or settings.LLM_FALLBACK_PROVIDER
+        self.fallback_model_name = fallback_model_name or settings.LLM_FALLBACK_MODEL
         self.llm = self._initialize_llm()
+        self._system_message: Optional[SystemMessage] = None
 
     def _initialize_llm(self):
-        """Initialize the language model based on provider"""
-        if self.model_provider == "openai":
+        """
+        Initialize the language model based on provider
+
+        When a fallback provider is configured (and has credentials), the
+        primary model is wrapped in an LLMRouter that hedges slow calls to the
+        fallback and fails over to it on errors.
+        """
+        primary = LLMRoute(
+            self.model_provider,
+            self.model_name,
+            self._create_llm(self.model_provider, self.model_name)
+        )
+
+        fallback = (self.fallback_provider, self.fallback_model_name)
+        if not self.fallback_provider or fallback == (self.model_provider, self.model_name):
+            return primary.llm
+        if not self._provider_configured(self.fallback_provider):
+            return primary.llm
+
+        secondary = LLMRoute(
+            self.fallback_provider,
+            self.fallback_model_name,
+            self._create_llm(self.fallback_provider, self.fallback_model_name)
+        )
+        return LLMRouter([primary, secondary])
+
+    @staticmethod
+    def _provider_configured(provider: str) -> bool:
+        """Check whether credentials exist for a provider"""
+        if provider == "openai":
+            return bool(settings.OPENAI_API_KEY)
+        if provider == "anthropic":
+            return bool(settings.ANTHROPIC_API_KEY)
+        return provider == "fake"
+
+    def _create_llm(self, provider: str, model_name: str):
+        """Create a chat model for a provider (SDKs are imported only when used)"""
+        if provider == "openai":
+            from langchain_openai import ChatOpenAI
             return ChatOpenAI(
-                model=self.model_name,
+                model=model_name,
                 temperature=self.temperature,
                 api_key=settings.OPENAI_API_KEY
             )
-        elif self.model_provider == "anthropic":
+        elif provider == "anthropic":
+            from langchain_anthropic import ChatAnthropic
             return ChatAnthropic(
-                model=self.model_name,
+                model=model_name,
                 temperature=self.temperature,
                 api_key=settings.ANTHROPIC_API_KEY
             )
+        elif provider == "fake":
+            from .fake_llm import FakeChatModel
+            return FakeChatModel(
+                latency_ms=settings.FAKE_LLM_LATENCY_MS,
+                latency_distribution=settings.FAKE_LLM_LATENCY_DISTRIBUTION,
+                latency_jitter=settings.FAKE_LLM_LATENCY_JITTER,
+                tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+                error_rate=settings.FAKE_LLM_ERROR_RATE,
+                seed=settings.FAKE_LLM_SEED
+            )
         else:
-            raise ValueError(f"Unsupported model provider: {self.model_provider}")
+            raise ValueError(f"Unsupported model provider: {provider}")
 
     @abstractmethod
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -60,9 +116,65 @@ class BaseAgent(ABC):
         """
         pass
 
+    def get_system_message(self) -> SystemMessage:
+        """
+        Get the system message, built once per agent
+
+        The system prompt is static, so keeping it as the identical first
+        message of every call lets providers reuse it as a cached prefix.
+        OpenAI does this automatically; Anthropic needs an explicit marker.
+        """
+        if self._system_message is None:
+            prompt = self.get_system_prompt()
+            if self.model_provider == "anthropic" and settings.PROMPT_CACHE_ENABLED:
+                content: Any = [{
+                    "type": "text",
+                    "text": prompt,
+                    "cache_control": {"type": "ephemeral"}
+                }]
+            else:
+                content = prompt
+            self._system_message = SystemMessage(content=content)
+        return self._system_message
+
+    def build_messages(self, sections: Dict[str, Any]) -> Tuple[List[BaseMessage], Dict[str, Any]]:
+        """
+        Build the messages for a call from labelled input sections
+
+        Args:
+            sections: Section label -> value, rendered as compact canonical JSON
+                and truncated to AGENT_INPUT_TOKEN_BUDGET
+
+        Returns:
+            Tuple of the message list and a prompt usage report
+        """
+        content, usage = compact_sections(
+            sections,
+            self.model_name,
+            settings.AGENT_INPUT_TOKEN_BUDGET
+        )
+        usage["cached_prefix_tokens"] = count_tokens(self.get_system_prompt(), self.model_name)
+        return [self.get_system_message(), HumanMessage(content=content)], usage
+
     async def invoke(self, messages: List[BaseMessage]) -> Any:
         """Invoke the language model with messages"""
-        return await self.llm.ainvoke(messages)
+        outcome = "error"
+        started = time.perf_counter()
+        in_flight = LLM_IN_FLIGHT.labels(agent=self.name)
+        in_flight.inc()
+        try:
+            response = await self.llm.ainvoke(messages)
+            outcome = "ok"
+            return response
+        finally:
+            in_flight.dec()
+            LLM_LATENCY.labels(agent=self.name, outcome=outcome).observe(time.perf_counter() - started)
+
+    async def stream(self, messages: List[BaseMessage]) -> AsyncIterator[str]:
+        """Stream the language model response as text chunks"""
+        async for chunk in self.llm.astream(messages):
+            if chunk.content:
+                yield chunk.content
 
     def get_agent_info(self) -> Dict[str, Any]:
         """Get agent metadata"""
@@ -71,7 +183,8 @@ class BaseAgent(ABC):
             "role": self.role,
             "model_provider": self.model_provider,
             "model_name": self.model_name,
-            "capabilities": self.get_capabilities()
+            "capabilities": self.get_capabilities(),
+            "llm_routes": self.llm.describe() if isinstance(self.llm, LLMRouter) else None
         }
 
     @abstractmethod
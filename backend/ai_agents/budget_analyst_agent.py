@@ -0,0 +1,79 @@
+"""
+Budget Analyst Agent - Cost allocation and budget feasibility
+"""
+from typing import Dict, Any, List
+from .base_agent import BaseAgent
+
+
+class BudgetAnalystAgent(BaseAgent):
+    """
+    AI agent responsible for splitting a project budget across categories
+    """
+
+    def __init__(self):
+        super().__init__(
+            name="BudgetAnalyst",
+            role="Cost allocation and budget feasibility",
+            model_provider="openai",
+            model_name="gpt-4-turbo-preview",
+            temperature=0.2  # Numbers should be consistent between runs
+        )
+
+    def get_system_prompt(self) -> str:
+        return """You are an experienced interior design budget analyst.
+
+Your responsibilities:
+- Allocate the project budget across furniture, decor, lighting, textiles and labor
+- Identify where spending has the most visual impact
+- Flag budget risks and unrealistic expectations early
+- Suggest savings that keep the design intent intact
+
+For every project you receive (budget, space information and style
+preferences as compact JSON), provide:
+1. Allocation per category (amount and percentage)
+2. Highest-impact spending priorities
+3. Main cost risks
+4. Recommended contingency reserve
+
+Output format:
+- Provide an allocation per category with amounts and percentages
+- List the main cost risks
+- Suggest a contingency reserve"""
+
+    async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Process budget parameters and generate an allocation
+
+        Args:
+            input_data: Dictionary containing:
+                - budget: Budget parameters
+                - space_data: Room dimensions and constraints
+                - style_preferences: Preferred design styles
+
+        Returns:
+            Dictionary containing budget allocation recommendations
+        """
+        messages, prompt_usage = self.build_messages(self._format_input(input_data))
+        response = await self.invoke(messages)
+
+        return {
+            "agent": self.name,
+            "budget_allocation": response.content,
+            "status": "success",
+            "prompt_usage": prompt_usage
+        }
+
+    def _format_input(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect input data into labelled prompt sections"""
+        return {
+            "Budget": input_data.get("budget", {}),
+            "Space Information": input_data.get("space_data", {}),
+            "Style Preferences": input_data.get("style_preferences", [])
+        }
+
+    def get_capabilities(self) -> List[str]:
+        return [
+            "Budget allocation by category",
+            "Cost risk assessment",
+            "Value engineering suggestions"
+        ]
@@ -1,9 +1,10 @@
 """
 Design Director Agent - Lead creative decision maker
 """
-from typing import Dict, Any, List
+import json
+from typing import Dict, Any, List, AsyncIterator
 from .base_agent import BaseAgent
-from langchain_core.messages import SystemMessage, HumanMessage
+from .output_parser import DESIGN_CONCEPTS_SCHEMA, ConceptStreamParser, parse_concepts
 
 
 class DesignDirectorAgent(BaseAgent):
@@ -37,11 +38,21 @@ Your approach:
 - Suggest innovative solutions while maintaining feasibility
 - Focus on creating timeless designs with contemporary touches
 
+For every project you receive (client brief, space information, budget and
+style preferences as compact JSON), provide:
+1. 3 distinct design concepts with detailed descriptions
+2. Color palette recommendations for each concept
+3. Key furniture and decor suggestions
+4. Mood board elements and inspirations
+5. Estimated budget allocation for each concept
+
 Output format:
 - Provide detailed design concepts with clear rationale
 - Include mood boards, color palettes, and style recommendations
 - Explain how each element serves the overall design vision
-- Prioritize recommendations by impact and budget"""
+- Prioritize recommendations by impact and budget
+- Respond with a single JSON object matching this schema, with no other text:
+""" + json.dumps(DESIGN_CONCEPTS_SCHEMA, separators=(",", ":"))
 
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -57,50 +68,49 @@ Output format:
         Returns:
             Dictionary containing design concepts and recommendations
         """
-        messages = [
-            SystemMessage(content=self.get_system_prompt()),
-            HumanMessage(content=self._format_input(input_data))
-        ]
-
+        messages, prompt_usage = self.build_messages(self._format_input(input_data))
         response = await self.invoke(messages)
 
         return {
             "agent": self.name,
             "design_concepts": self._parse_response(response),
             "confidence_score": 0.85,  # Would be calculated based on response
-            "status": "success"
+            "status": "success",
+            "prompt_usage": prompt_usage
         }
 
-    def _format_input(self, input_data: Dict[str, Any]) -> str:
-        """Format input data into prompt"""
-        client_brief = input_data.get("client_brief", {})
-        space_data = input_data.get("space_data", {})
-        budget = input_data.get("budget", {})
-        style_prefs = input_data.get("style_preferences", [])
-
-        return f"""Create a comprehensive interior design concept for the following project:
-
-Client Brief:
-{client_brief}
-
-Space Information:
-{space_data}
-
-Budget: {budget}
+    async def stream_concepts(self, input_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream design concepts one at a time as the model completes them
 
-Style Preferences: {', '.join(style_prefs)}
+        Args:
+            input_data: Same structure as process()
 
-Please provide:
-1. 3 distinct design concepts with detailed descriptions
-2. Color palette recommendations for each concept
-3. Key furniture and decor suggestions
-4. Mood board elements and inspirations
-5. Estimated budget allocation for each concept"""
+        Yields:
+            Design concepts normalized to DesignConcept fields
+        """
+        parser = ConceptStreamParser()
+        messages, _ = self.build_messages(self._format_input(input_data))
+        async for chunk in self.stream(messages):
+            for concept in parser.feed(chunk):
+                yield concept
+
+    def _format_input(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect input data into labelled prompt sections"""
+        return {
+            "Client Brief": input_data.get("client_brief", {}),
+            "Space Information": input_data.get("space_data", {}),
+            "Budget": input_data.get("budget", {}),
+            "Style Preferences": input_data.get("style_preferences", [])
+        }
 
     def _parse_response(self, response: Any) -> List[Dict[str, Any]]:
         """Parse LLM response into structured design concepts"""
-        # This would parse the response into structured data
-        # For now, returning the raw content
+        concepts = parse_concepts(response.content)
+        if concepts:
+            return concepts
+
+        # Model ignored the schema; keep the raw text so nothing is lost
         return [{
             "concept_name": "AI Generated Concept",
             "description": response.content,
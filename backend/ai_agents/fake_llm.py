@@ -0,0 +1,129 @@
+"""
+Deterministic fake chat model for offline benchmarking and load tests
+"""
+import asyncio
+import json
+import random
+from typing import Any, AsyncIterator, List, Optional
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+
+
+class FakeLLMError(RuntimeError):
+    """Injected provider failure"""
+
+
+# Canned response that satisfies the design concepts schema
+DEFAULT_FAKE_RESPONSE = json.dumps({
+    "concepts": [
+        {
+            "concept_name": name,
+            "description": f"{name} concept generated by the fake provider.",
+            "style_category": style,
+            "color_palette": [
+                {"name": "Base", "hex": base, "usage": "walls"},
+                {"name": "Accent", "hex": accent, "usage": "textiles"}
+            ],
+            "key_elements": ["Sofa", "Area rug", "Pendant lighting"],
+            "mood_board": [],
+            "design_elements": {"materials": ["oak", "linen"]},
+            "budget_allocation": {"furniture": 0.6, "decor": 0.25, "lighting": 0.15},
+            "ai_confidence_score": 0.8
+        }
+        for name, style, base, accent in [
+            ("Quiet Nordic", "Scandinavian", "#F4F1EA", "#7A8B6F"),
+            ("Urban Loft", "Industrial", "#D9D4CC", "#3B3B3B"),
+            ("Warm Minimal", "Japandi", "#EDE6DB", "#A0522D")
+        ]
+    ]
+})
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal")
+
+
+class FakeChatModel:
+    """
+    Chat model stand-in with configurable latency, streaming rate and failures
+
+    Implements the subset of the LangChain chat model interface that agents
+    use (ainvoke/astream). All randomness comes from a seeded generator, so a
+    run with the same seed draws the same sequence of latencies and errors.
+
+    Args:
+        latency_ms: Median time to first token
+        latency_distribution: One of constant, uniform, normal, lognormal
+        latency_jitter: Spread of the distribution, relative to latency_ms
+            (half-width for uniform, std-dev for normal, sigma for lognormal)
+        tokens_per_second: Streaming rate after the first token; 0 disables the delay
+        error_rate: Probability that a call raises FakeLLMError
+        seed: Seed for the latency/error generator
+        response: Text returned by every call
+    """
+
+    # Approximate characters per streamed token
+    CHUNK_SIZE = 4
+
+    def __init__(
+        self,
+        latency_ms: float = 800.0,
+        latency_distribution: str = "lognormal",
+        latency_jitter: float = 0.25,
+        tokens_per_second: float = 50.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = 0,
+        response: str = DEFAULT_FAKE_RESPONSE
+    ):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unsupported latency distribution: {latency_distribution}")
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError(f"error_rate must be between 0 and 1, got {error_rate}")
+
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.latency_jitter = latency_jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.response = response
+        self._rng = random.Random(seed)
+
+    def _sample_latency(self) -> float:
+        """Draw a time-to-first-token in seconds"""
+        base = self.latency_ms
+        if self.latency_distribution == "uniform":
+            spread = base * self.latency_jitter
+            value = self._rng.uniform(base - spread, base + spread)
+        elif self.latency_distribution == "normal":
+            value = self._rng.gauss(base, base * self.latency_jitter)
+        elif self.latency_distribution == "lognormal":
+            # Median equals latency_ms; jitter is sigma of the underlying normal
+            value = base * self._rng.lognormvariate(0.0, self.latency_jitter)
+        else:
+            value = base
+        return max(value, 0.0) / 1000
+
+    def _maybe_fail(self):
+        """Raise an injected error with probability error_rate"""
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise FakeLLMError("Injected fake provider error")
+
+    def _chunks(self) -> List[str]:
+        size = self.CHUNK_SIZE
+        return [self.response[i:i + size] for i in range(0, len(self.response), size)]
+
+    async def ainvoke(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        """Return the canned response after the sampled latency and streaming time"""
+        delay = self._sample_latency()
+        self._maybe_fail()
+        if self.tokens_per_second:
+            delay += len(self._chunks()) / self.tokens_per_second
+        await asyncio.sleep(delay)
+        return AIMessage(content=self.response)
+
+    async def astream(self, messages: List[BaseMessage], **kwargs: Any) -> AsyncIterator[AIMessageChunk]:
+        """Stream the canned response at tokens_per_second"""
+        await asyncio.sleep(self._sample_latency())
+        self._maybe_fail()
+        interval = 1 / self.tokens_per_second if self.tokens_per_second else 0
+        for chunk in self._chunks():
+            yield AIMessageChunk(content=chunk)
+            if interval:
+                await asyncio.sleep(interval)
@@ -0,0 +1,231 @@
+"""
+Latency-aware routing, hedging and failover across LLM providers
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+from langchain_core.messages import BaseMessage
+from shared.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """Rolling latency and error statistics for one provider/model pair"""
+
+    MIN_SAMPLES = 20
+
+    def __init__(self, window: int):
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool):
+        """Record a finished call; latency in seconds"""
+        self._outcomes.append(ok)
+        if ok:
+            self._latencies.append(latency)
+
+    def record_cancelled(self, elapsed: float):
+        """
+        Record a call cancelled after losing a hedge race
+
+        Its true latency is at least `elapsed`, so keep that as a lower bound;
+        dropping it would make a slow provider look faster than it is.
+        """
+        self._latencies.append(elapsed)
+
+    def p95(self) -> Optional[float]:
+        """95th percentile latency in seconds, or None without enough samples"""
+        if len(self._latencies) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return 1 - sum(self._outcomes) / len(self._outcomes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            "samples": len(self._outcomes),
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate(), 4)
+        }
+
+
+class HedgeBudget:
+    """
+    Caps hedged requests to a fraction of all requests
+
+    Each routed request earns `ratio` tokens and each hedge spends one, with
+    the balance capped at `burst`. With ratio=0.1 no more than ~10% of calls
+    are duplicated, however slow the primary gets.
+    """
+
+    def __init__(self, ratio: float, burst: float):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+
+    def on_request(self):
+        self._tokens = min(self._tokens + self.ratio, self.burst)
+
+    def try_spend(self) -> bool:
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+# Shared across agents so statistics and the hedge budget are per process,
+# not per agent instance
+_provider_stats: Dict[Tuple[str, str], ProviderStats] = {}
+hedge_budget = HedgeBudget(settings.LLM_HEDGE_BUDGET_RATIO, settings.LLM_HEDGE_BUDGET_BURST)
+
+
+def get_provider_stats(provider: str, model_name: str) -> ProviderStats:
+    """Get (or create) rolling stats for a provider/model pair"""
+    key = (provider, model_name)
+    if key not in _provider_stats:
+        _provider_stats[key] = ProviderStats(settings.LLM_STATS_WINDOW)
+    return _provider_stats[key]
+
+
+class LLMRoute:
+    """A chat model together with the provider/model it represents"""
+
+    def __init__(self, provider: str, model_name: str, llm: Any):
+        self.provider = provider
+        self.model_name = model_name
+        self.llm = llm
+        self.stats = get_provider_stats(provider, model_name)
+
+    @property
+    def label(self) -> str:
+        return f"{self.provider}:{self.model_name}"
+
+
+class LLMRouter:
+    """
+    Chat model wrapper that hedges slow calls and fails over on errors
+
+    Routes are tried in priority order, except that a route whose rolling
+    error rate exceeds LLM_FAILOVER_ERROR_RATE is moved behind healthy ones.
+    If the first route has not answered by its own p95 latency, the same
+    request is sent to the next route (budget permitting). The first
+    successful answer wins and the other call is cancelled. Errors fail over
+    to the next route immediately.
+    """
+
+    def __init__(self, routes: List[LLMRoute], hedging: Optional[bool] = None):
+        if not routes:
+            raise ValueError("LLMRouter needs at least one route")
+        self.routes = routes
+        self.hedging = settings.LLM_HEDGE_ENABLED if hedging is None else hedging
+
+    def _ordered_routes(self) -> List[LLMRoute]:
+        threshold = settings.LLM_FAILOVER_ERROR_RATE
+        healthy = [r for r in self.routes if r.stats.error_rate() <= threshold]
+        unhealthy = [r for r in self.routes if r.stats.error_rate() > threshold]
+        return healthy + unhealthy
+
+    def _hedge_delay(self, route: LLMRoute) -> float:
+        p95 = route.stats.p95()
+        if p95 is None:
+            return settings.LLM_HEDGE_DEFAULT_DELAY_MS / 1000
+        return max(p95, settings.LLM_HEDGE_MIN_DELAY_MS / 1000)
+
+    async def _call(self, route: LLMRoute, messages: List[BaseMessage], **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            result = await route.llm.ainvoke(messages, **kwargs)
+        except asyncio.CancelledError:
+            route.stats.record_cancelled(time.perf_counter() - started)
+            raise
+        except Exception as e:
+            route.stats.record(time.perf_counter() - started, ok=False)
+            logger.warning("LLM route %s failed: %s", route.label, e)
+            raise
+        route.stats.record(time.perf_counter() - started, ok=True)
+        return result
+
+    async def ainvoke(self, messages: List[BaseMessage], **kwargs: Any) -> Any:
+        """Invoke the best available route, hedging and failing over as needed"""
+        hedge_budget.on_request()
+        remaining = self._ordered_routes()
+        in_flight: Dict[asyncio.Task, LLMRoute] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            route = remaining.pop(0)
+            in_flight[asyncio.create_task(self._call(route, messages, **kwargs))] = route
+
+        launch()
+        try:
+            while in_flight:
+                timeout = None
+                can_hedge = self.hedging and remaining and len(in_flight) == 1
+                if can_hedge:
+                    timeout = self._hedge_delay(next(iter(in_flight.values())))
+
+                done, _ = await asyncio.wait(
+                    in_flight.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # Primary is past its p95: hedge if the budget allows, else keep waiting
+                    if hedge_budget.try_spend():
+                        launch()
+                    else:
+                        done, _ = await asyncio.wait(in_flight.keys(), return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    in_flight.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+
+                # Fail over when nothing is left running
+                if not in_flight and remaining:
+                    launch()
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+        raise last_error
+
+    async def astream(self, messages: List[BaseMessage], **kwargs: Any) -> AsyncIterator[Any]:
+        """
+        Stream from the best available route
+
+        Streams are not hedged (the client would see two interleaved answers),
+        but an error before the first chunk fails over to the next route.
+        """
+        last_error: Optional[BaseException] = None
+        for route in self._ordered_routes():
+            started = time.perf_counter()
+            first_chunk = True
+            try:
+                async for chunk in route.llm.astream(messages, **kwargs):
+                    first_chunk = False
+                    yield chunk
+            except Exception as e:
+                route.stats.record(time.perf_counter() - started, ok=False)
+                logger.warning("LLM route %s failed while streaming: %s", route.label, e)
+                if not first_chunk:
+                    raise
+                last_error = e
+                continue
+            route.stats.record(time.perf_counter() - started, ok=True)
+            return
+        raise last_error
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Describe routes and their current statistics"""
+        return [{"route": route.label, **route.stats.snapshot()} for route in self.routes]
@@ -0,0 +1,113 @@
+"""
+Agent Orchestrator - concurrent fan-out/fan-in across independent agents
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Optional
+from .base_agent import BaseAgent
+from shared.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AgentOrchestrator:
+    """
+    Runs a team of independent agents concurrently on the same input.
+
+    Every agent gets its own timeout, and the whole run is bounded by a
+    request deadline. Agents still running when the deadline passes are
+    cancelled, and whatever finished in time is returned as a partial result,
+    so total latency tracks the slowest agent rather than the sum of all.
+    """
+
+    def __init__(
+        self,
+        agents: List[BaseAgent],
+        agent_timeout: Optional[float] = None,
+        deadline: Optional[float] = None
+    ):
+        names = [agent.name for agent in agents]
+        if len(names) != len(set(names)):
+            raise ValueError(f"Agent names must be unique: {names}")
+
+        self.agents = agents
+        self.agent_timeout = agent_timeout or settings.AGENT_TIMEOUT_SECONDS
+        self.deadline = deadline or settings.ORCHESTRATION_DEADLINE_SECONDS
+
+    async def _run_agent(self, agent: BaseAgent, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a single agent under its per-agent timeout"""
+        return await asyncio.wait_for(agent.process(input_data), timeout=self.agent_timeout)
+
+    async def run(
+        self,
+        input_data: Dict[str, Any],
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Fan out input to all agents and collect their outputs
+
+        Args:
+            input_data: Input passed unchanged to every agent's process()
+            deadline: Optional override of the overall deadline in seconds
+
+        Returns:
+            Dictionary containing:
+                - results: Agent name -> agent output for agents that succeeded
+                - errors: Agent name -> error message for agents that failed
+                - timed_out: Names of agents that missed their timeout or the deadline
+                - status: "success", "partial" or "failed"
+                - elapsed_ms: Wall-clock time of the whole run
+        """
+        deadline = deadline or self.deadline
+        started = time.perf_counter()
+
+        tasks = {
+            asyncio.create_task(self._run_agent(agent, input_data), name=agent.name): agent.name
+            for agent in self.agents
+        }
+
+        done, pending = await asyncio.wait(tasks.keys(), timeout=deadline)
+
+        # Cancel stragglers and wait for them to unwind so nothing leaks past the request
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        timed_out: List[str] = [tasks[task] for task in pending]
+
+        for task in done:
+            name = tasks[task]
+            exc = task.exception()
+            if exc is None:
+                results[name] = task.result()
+            elif isinstance(exc, asyncio.TimeoutError):
+                timed_out.append(name)
+            else:
+                logger.error("Agent %s failed", name, exc_info=exc)
+                errors[name] = str(exc) or exc.__class__.__name__
+
+        if timed_out:
+            logger.warning("Agents timed out: %s", ", ".join(sorted(timed_out)))
+
+        if len(results) == len(self.agents):
+            status = "success"
+        elif results:
+            status = "partial"
+        else:
+            status = "failed"
+
+        return {
+            "results": results,
+            "errors": errors,
+            "timed_out": sorted(timed_out),
+            "status": status,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def get_team_info(self) -> List[Dict[str, Any]]:
+        """Get metadata for every agent in the team"""
+        return [agent.get_agent_info() for agent in self.agents]
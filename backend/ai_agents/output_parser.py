@@ -0,0 +1,213 @@
+"""
+Incremental structured-output parser for design concepts
+"""
+import json
+from typing import Dict, Any, List, Optional
+
+
+# JSON schema the design director is asked to follow. Field names mirror the
+# DesignConcept model so parsed concepts can be stored without remapping.
+DESIGN_CONCEPTS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "concepts": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "concept_name": {"type": "string"},
+                    "description": {"type": "string"},
+                    "style_category": {"type": "string"},
+                    "color_palette": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string"},
+                                "hex": {"type": "string"},
+                                "usage": {"type": "string"}
+                            },
+                            "required": ["hex"]
+                        }
+                    },
+                    "key_elements": {"type": "array", "items": {"type": "string"}},
+                    "mood_board": {"type": "array", "items": {"type": "string"}},
+                    "design_elements": {"type": "object"},
+                    "budget_allocation": {"type": "object"},
+                    "ai_confidence_score": {"type": "number", "minimum": 0, "maximum": 1}
+                },
+                "required": ["concept_name", "description", "style_category"]
+            }
+        }
+    },
+    "required": ["concepts"]
+}
+
+# Top-level keys whose array holds the concepts ("design_concepts" mirrors the API response)
+CONCEPT_KEYS = ("concepts", "design_concepts")
+
+
+def normalize_concept(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Coerce a parsed concept object into the DesignConcept field layout
+
+    Missing or wrongly typed fields fall back to empty values instead of
+    failing, since LLM output rarely matches the schema exactly.
+    """
+    def as_list(value: Any) -> List[Any]:
+        if isinstance(value, list):
+            return value
+        if value in (None, ""):
+            return []
+        return [value]
+
+    def as_dict(value: Any) -> Dict[str, Any]:
+        return value if isinstance(value, dict) else {}
+
+    palette = []
+    for swatch in as_list(raw.get("color_palette")):
+        if isinstance(swatch, str):
+            swatch = {"hex": swatch}
+        if isinstance(swatch, dict) and swatch.get("hex"):
+            palette.append({
+                "name": swatch.get("name"),
+                "hex": str(swatch["hex"]).upper(),
+                "usage": swatch.get("usage")
+            })
+
+    confidence = raw.get("ai_confidence_score")
+    try:
+        confidence = min(max(float(confidence), 0.0), 1.0) if confidence is not None else None
+    except (TypeError, ValueError):
+        confidence = None
+
+    return {
+        "concept_name": str(raw.get("concept_name") or "Untitled Concept"),
+        "description": str(raw.get("description") or ""),
+        "style_category": str(raw.get("style_category") or ""),
+        "color_palette": palette,
+        "key_elements": [str(item) for item in as_list(raw.get("key_elements"))],
+        "mood_board": as_list(raw.get("mood_board")),
+        "design_elements": as_dict(raw.get("design_elements")),
+        "budget_allocation": as_dict(raw.get("budget_allocation")),
+        "ai_confidence_score": confidence
+    }
+
+
+class ConceptStreamParser:
+    """
+    Incremental parser that yields design concepts as soon as each one closes
+
+    Feed it chunks of model output as they arrive. The scanner keeps its
+    bracket and string state between calls, so every character is visited
+    once; consumed text is dropped from the buffer. Each element of the
+    concepts array is decoded on its own, so a malformed concept is skipped
+    without affecting the ones around it.
+
+    Accepts `{"concepts": [...]}`, a bare `[...]` array, and output wrapped
+    in markdown code fences or surrounded by prose. Other arrays in the
+    top-level object (e.g. `"notes": [...]`) are skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0                   # next index in _buffer to scan
+        self._stack: List[str] = []     # open containers: "{" or "["
+        self._in_string = False
+        self._escaped = False
+        self._element_start: Optional[int] = None
+        self._key = ""                  # last string read directly inside the top-level object
+        self._array_key: Optional[str] = None  # key of the array open in the top-level object
+        self.errors = 0
+
+    def _is_concept_level(self) -> bool:
+        """True when the scanner sits directly inside the concepts array"""
+        if self._stack == ["["]:
+            return True
+        return self._stack == ["{", "["] and self._array_key in CONCEPT_KEYS
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Consume a chunk of output
+
+        Args:
+            chunk: Next piece of streamed model text
+
+        Returns:
+            Concepts completed by this chunk, normalized to DesignConcept fields
+        """
+        self._buffer += chunk
+        completed: List[Dict[str, Any]] = []
+        buffer = self._buffer
+
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    continue
+                if self._stack == ["{"]:
+                    self._key += char
+                continue
+
+            if char == '"':
+                # Strings only matter inside JSON; prose quotes at depth 0 are ignored
+                if self._stack:
+                    self._in_string = True
+                    if self._stack == ["{"]:
+                        self._key = ""
+            elif char in "{[":
+                if char == "{" and self._is_concept_level():
+                    self._element_start = i
+                if char == "[" and self._stack == ["{"]:
+                    # The last string before a top-level array is its key
+                    self._array_key = self._key
+                self._stack.append(char)
+            elif char in "}]":
+                expected = "{" if char == "}" else "["
+                if not self._stack or self._stack[-1] != expected:
+                    # Stray closer: skip it; the enclosing concept then fails to
+                    # decode on its own and is dropped without a resync
+                    self.errors += 1
+                    continue
+                self._stack.pop()
+                if char == "}" and self._element_start is not None and self._is_concept_level():
+                    concept = self._decode(buffer[self._element_start:i + 1])
+                    if concept is not None:
+                        completed.append(concept)
+                    self._element_start = None
+
+        self._pos = len(buffer)
+        self._compact()
+        return completed
+
+    def _decode(self, fragment: str) -> Optional[Dict[str, Any]]:
+        """Decode one concept object, counting rather than raising on bad JSON"""
+        try:
+            raw = json.loads(fragment)
+        except json.JSONDecodeError:
+            self.errors += 1
+            return None
+        if not isinstance(raw, dict):
+            self.errors += 1
+            return None
+        return normalize_concept(raw)
+
+    def _compact(self):
+        """Drop text that can no longer be part of a pending concept"""
+        keep_from = self._element_start if self._element_start is not None else self._pos
+        if keep_from:
+            self._buffer = self._buffer[keep_from:]
+            self._pos -= keep_from
+            if self._element_start is not None:
+                self._element_start -= keep_from
+
+
+def parse_concepts(text: str) -> List[Dict[str, Any]]:
+    """Parse a complete model response into normalized design concepts"""
+    return ConceptStreamParser().feed(text)
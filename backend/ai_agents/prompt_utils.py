@@ -0,0 +1,135 @@
+"""
+Prompt compaction and token accounting for agent calls
+"""
+import json
+from functools import lru_cache
+from typing import Dict, Any, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - installed with langchain-openai
+    tiktoken = None
+
+
+TRUNCATION_MARKER = "…[truncated]"
+
+# Rough characters-per-token ratio used when no tokenizer exists for a model
+CHARS_PER_TOKEN = 4
+
+
+def _prune(value: Any) -> Any:
+    """Drop None and empty containers, which cost tokens but carry no information"""
+    if isinstance(value, dict):
+        pruned = {str(k): _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, (list, tuple, set)):
+        items = [_prune(v) for v in value]
+        return [v for v in items if v not in (None, "", [], {})]
+    return value
+
+
+def canonical_json(value: Any) -> str:
+    """
+    Serialize a value compactly and deterministically
+
+    Keys are sorted and whitespace removed, so identical inputs always produce
+    identical prompts (and identical token counts).
+    """
+    return json.dumps(
+        _prune(value),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str):
+    """Get the tokenizer for a model, or None when only estimates are possible"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        # Non-OpenAI models (e.g. Claude) get a close approximation
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Encoding files are fetched on first use; offline runs fall back to estimates
+        return None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str, model_name: str) -> int:
+    """Count tokens in text for a model, memoized per (text, model)"""
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model_name: str) -> str:
+    """Cut text down to at most max_tokens tokens, marking the cut"""
+    if count_tokens(text, model_name) <= max_tokens:
+        return text
+
+    marker_tokens = count_tokens(TRUNCATION_MARKER, model_name)
+    keep = max(max_tokens - marker_tokens, 0)
+
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return text[:keep * CHARS_PER_TOKEN] + TRUNCATION_MARKER
+    tokens = encoding.encode(text, disallowed_special=())
+    return encoding.decode(tokens[:keep]) + TRUNCATION_MARKER
+
+
+def compact_sections(
+    sections: Dict[str, Any],
+    model_name: str,
+    max_tokens: int
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Render labelled prompt sections compactly within a token budget
+
+    Args:
+        sections: Section label -> value (dicts/lists are serialized as canonical JSON)
+        model_name: Model whose tokenizer is used for counting
+        max_tokens: Token budget for the rendered sections
+
+    Returns:
+        Tuple of the rendered prompt and a usage report with the token count of
+        the legacy repr-style rendering, the compact count and the savings
+    """
+    rendered = {
+        label: value if isinstance(value, str) else canonical_json(value)
+        for label, value in sections.items()
+    }
+    tokens = {label: count_tokens(text, model_name) for label, text in rendered.items()}
+
+    # Shrink the largest section first until everything fits
+    truncated = False
+    overflow = sum(tokens.values()) - max_tokens
+    while overflow > 0:
+        label = max(tokens, key=tokens.get)
+        target = max(tokens[label] - overflow, 0)
+        shortened = truncate_to_tokens(rendered[label], target, model_name)
+        shortened_tokens = count_tokens(shortened, model_name)
+        if shortened_tokens >= tokens[label]:
+            break
+        rendered[label] = shortened
+        tokens[label] = shortened_tokens
+        overflow = sum(tokens.values()) - max_tokens
+        truncated = True
+
+    prompt = "\n".join(f"{label}: {text}" for label, text in rendered.items())
+
+    raw_prompt = "\n\n".join(f"{label}:\n{value}" for label, value in sections.items())
+    raw_tokens = count_tokens(raw_prompt, model_name)
+    prompt_tokens = count_tokens(prompt, model_name)
+
+    return prompt, {
+        "raw_input_tokens": raw_tokens,
+        "input_tokens": prompt_tokens,
+        "saved_tokens": raw_tokens - prompt_tokens,
+        "truncated": truncated
+    }
@@ -0,0 +1,78 @@
+"""
+Space Planner Agent - Spatial analysis and layout optimization
+"""
+from typing import Dict, Any, List
+from .base_agent import BaseAgent
+
+
+class SpacePlannerAgent(BaseAgent):
+    """
+    AI agent responsible for room analysis, traffic flow and furniture placement
+    """
+
+    def __init__(self):
+        super().__init__(
+            name="SpacePlanner",
+            role="Spatial analysis and layout optimization",
+            model_provider="openai",
+            model_name="gpt-4-turbo-preview",
+            temperature=0.3  # Layouts should be precise rather than creative
+        )
+
+    def get_system_prompt(self) -> str:
+        return """You are an expert space planner specializing in residential and commercial interiors.
+
+Your responsibilities:
+- Analyze room dimensions, openings and existing features
+- Optimize traffic flow and circulation paths
+- Propose furniture placement that respects clearances and ergonomics
+- Check layouts against accessibility guidelines
+
+For every space you receive (space information and client brief as compact
+JSON), provide:
+1. Recommended furniture zones and placement
+2. Circulation paths and minimum clearances
+3. Accessibility considerations
+4. Constraints the design concept must respect
+
+Output format:
+- Provide one or more layout options per room
+- State the key clearances and circulation paths for each option
+- Flag any constraints that limit the design concept"""
+
+    async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Process space data and generate layout recommendations
+
+        Args:
+            input_data: Dictionary containing:
+                - space_data: Room dimensions and constraints
+                - client_brief: Client requirements and preferences
+
+        Returns:
+            Dictionary containing layout recommendations
+        """
+        messages, prompt_usage = self.build_messages(self._format_input(input_data))
+        response = await self.invoke(messages)
+
+        return {
+            "agent": self.name,
+            "layout_recommendations": response.content,
+            "status": "success",
+            "prompt_usage": prompt_usage
+        }
+
+    def _format_input(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect input data into labelled prompt sections"""
+        return {
+            "Space Information": input_data.get("space_data", {}),
+            "Client Brief": input_data.get("client_brief", {})
+        }
+
+    def get_capabilities(self) -> List[str]:
+        return [
+            "Room measurement and analysis",
+            "Traffic flow optimization",
+            "Furniture placement algorithms",
+            "Accessibility compliance checking"
+        ]
@@ -11,7 +11,7 @@ from alembic import context
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from shared.database import Base
-from shared.models import Client, Project, DesignConcept, Product, User
+from shared.models import Client, Project, DesignConcept, Product, User, Upload
 from shared.config import settings
 
 # this is the Alembic Config object, which provides
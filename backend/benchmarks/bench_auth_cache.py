@@ -0,0 +1,360 @@
+"""
+Offline benchmark for the gateway's auth endpoints and the Redis cache layer
+
+Runs the API gateway in-process (no sockets) against local stand-ins: a
+throwaway SQLite database (or --database-url, e.g. a local Postgres) and an
+in-memory Redis (fakeredis when installed, otherwise a minimal built-in
+stand-in; or --redis-url for a real server). Measures throughput and
+latency of POST /auth/register, POST /auth/login and GET /auth/me at a fixed
+concurrency, then of raw RedisCache operations.
+
+Results can be saved as a baseline and later runs compared against it;
+the exit status is 1 when any metric regresses beyond --tolerance, so it
+can gate CI. Compare only runs from the same machine. A run where any
+request failed, or where an auth benchmark couldn't run (no user registered,
+so there was no token for /auth/me), always exits 1 and is never saved as a
+baseline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_auth_cache --save-baseline benchmarks/results/auth_cache_baseline.json
+    python -m benchmarks.bench_auth_cache --baseline benchmarks/results/auth_cache_baseline.json
+    python -m benchmarks.bench_auth_cache --database-url postgresql+asyncpg://localhost/bench --redis-url redis://localhost:6379/15
+"""
+import argparse
+import asyncio
+import fnmatch
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.common import (
+    compare_to_baseline, environment_info, failed_benchmarks, read_results, summarize, write_results
+)
+
+PASSWORD = "benchmark-password"
+
+SQLITE_BUSY_TIMEOUT_SECONDS = 30
+
+AUTH_BENCHMARKS = ("auth.register", "auth.login", "auth.me")
+
+# Typical cached value: a serialized design summary
+CACHE_VALUE = {
+    "style": "scandinavian",
+    "palette": ["#F5F1EA", "#C9B79C", "#6B705C", "#3A3A3A"],
+    "items": [{"sku": f"SKU-{i:05d}", "price": 129.0 + i, "qty": 1} for i in range(10)],
+    "notes": "Light oak, linen textures and matte black accents." * 3
+}
+
+
+class InMemoryRedis:
+    """
+    Asyncio stand-in for the Redis commands RedisCache uses
+
+    Keeps string values in a dict with optional expiry, so cache benchmarks
+    measure RedisCache's own overhead (serialization, metrics, error
+    handling) without a server.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}  # key -> (value, expires at)
+
+    def _live(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return item
+
+    async def get(self, key: str) -> Optional[str]:
+        item = self._live(key)
+        return item[0] if item else None
+
+    async def set(self, key: str, value: str) -> bool:
+        self._data[key] = (value, None)
+        return True
+
+    async def setex(self, key: str, seconds: int, value: str) -> bool:
+        self._data[key] = (value, time.monotonic() + seconds)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        deleted = 0
+        for key in keys:
+            if self._live(key):
+                del self._data[key]
+                deleted += 1
+        return deleted
+
+    async def exists(self, *keys: str) -> int:
+        return sum(self._live(key) is not None for key in keys)
+
+    async def incrby(self, key: str, amount: int) -> int:
+        item = self._live(key)
+        value = int(item[0]) + amount if item else amount
+        self._data[key] = (str(value), item[1] if item else None)
+        return value
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        item = self._live(key)
+        if item is None:
+            return False
+        self._data[key] = (item[0], time.monotonic() + seconds)
+        return True
+
+    async def scan_iter(self, match: Optional[str] = None):
+        for key in list(self._data):
+            if self._live(key) and fnmatch.fnmatchcase(key, match or "*"):
+                yield key
+
+    async def ping(self) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+
+def configure_environment(args: argparse.Namespace) -> str:
+    """
+    Point settings at the local stand-ins; must run before the gateway is imported
+
+    Returns:
+        The database URL in use
+    """
+    database_url = args.database_url
+    if not database_url:
+        directory = tempfile.mkdtemp(prefix="bench-auth-")
+        # Concurrent registrations contend for SQLite's single writer lock; wait for it
+        # instead of failing with "database is locked"
+        database_url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}?timeout={SQLITE_BUSY_TIMEOUT_SECONDS}"
+    os.environ["DATABASE_URL"] = database_url
+    if args.redis_url:
+        os.environ["REDIS_URL"] = args.redis_url
+    os.environ.setdefault("DEBUG", "false")  # no SQL echo
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    return database_url
+
+
+def build_redis_client(redis_url: Optional[str]) -> Tuple[Optional[Any], str]:
+    """Redis client to install in RedisCache (None to connect to REDIS_URL) and its description"""
+    if redis_url:
+        return None, redis_url
+    if importlib.util.find_spec("fakeredis"):
+        import fakeredis
+        return fakeredis.FakeAsyncRedis(decode_responses=True), "fakeredis"
+    return InMemoryRedis(), "in-memory stand-in"
+
+
+def use_char_uuids_on_sqlite():
+    """Let SQLite create the models' PostgreSQL UUID columns (stored as CHAR(32), like sqlalchemy.Uuid)"""
+    from sqlalchemy.dialects.postgresql import UUID
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(UUID, "sqlite")
+    def compile_uuid(type_, compiler, **kw):
+        return "CHAR(32)"
+
+
+async def measure(
+    call: Callable[[int], Awaitable[Any]],
+    count: int,
+    concurrency: int,
+    ok_status: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Run `call(i)` for i in range(count) with `concurrency` callers (closed loop)
+
+    With `ok_status`, calls return HTTP responses and anything else counts
+    as an error; otherwise a call that raises is an error.
+    """
+    latencies: List[float] = []
+    status_counts: Dict[str, int] = {}
+    next_index = iter(range(count))
+
+    async def worker():
+        for index in next_index:
+            started = time.perf_counter()
+            try:
+                result = await call(index)
+                key = str(result.status_code) if ok_status is not None else "ok"
+            except Exception as e:
+                key = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            status_counts[key] = status_counts.get(key, 0) + 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(max(concurrency, 1))])
+    elapsed = time.perf_counter() - began
+
+    ok = status_counts.get(str(ok_status) if ok_status is not None else "ok", 0)
+    return {
+        "count": count,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(ok / elapsed, 3) if elapsed else 0.0,
+        "error_rate": round(1 - ok / count, 4) if count else 0.0,
+        "status_counts": status_counts,
+        "latency_ms": summarize(latencies)
+    }
+
+
+async def bench_auth(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    """Register, log in and fetch the profile of fresh users through the in-process gateway"""
+    import httpx
+    import shared.models  # noqa: F401 - registers the tables
+    from main import app
+    from shared.database import Base, dispose_engine, engine
+
+    if engine.dialect.name == "sqlite":
+        use_char_uuids_on_sqlite()
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    run_id = uuid.uuid4().hex[:8]
+    emails = [f"bench-{run_id}-{i}@example.com" for i in range(args.auth_requests)]
+    tokens: List[str] = []
+    results: Dict[str, Dict[str, Any]] = {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway", timeout=120.0) as client:
+        async def register(i: int):
+            response = await client.post("/api/v1/auth/register", json={
+                "email": emails[i], "password": PASSWORD, "full_name": f"Bench User {i}"
+            })
+            if response.status_code == 201:
+                tokens.append(response.json()["access_token"])
+            return response
+
+        async def login(i: int):
+            return await client.post("/api/v1/auth/login", json={"email": emails[i], "password": PASSWORD})
+
+        async def me(i: int):
+            token = tokens[i % len(tokens)]
+            return await client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+        results["auth.register"] = await measure(register, args.auth_requests, args.concurrency, ok_status=201)
+        results["auth.login"] = await measure(login, args.auth_requests, args.concurrency, ok_status=200)
+        if tokens:
+            results["auth.me"] = await measure(me, args.me_requests, args.concurrency, ok_status=200)
+
+    await dispose_engine()
+    return results
+
+
+async def bench_cache(args: argparse.Namespace, client: Optional[Any]) -> Dict[str, Dict[str, Any]]:
+    """Time each RedisCache operation on its own"""
+    from shared.cache import cache
+
+    if client is not None:
+        cache._client = client
+    prefix = f"bench:{uuid.uuid4().hex[:8]}"
+    count = args.cache_operations
+
+    operations: List[Tuple[str, Callable[[int], Awaitable[Any]]]] = [
+        ("cache.set", lambda i: cache.set(f"{prefix}:{i}", CACHE_VALUE, expire=300)),
+        ("cache.get_hit", lambda i: cache.get(f"{prefix}:{i}")),
+        ("cache.get_miss", lambda i: cache.get(f"{prefix}:missing:{i}")),
+        ("cache.exists", lambda i: cache.exists(f"{prefix}:{i}")),
+        ("cache.increment", lambda i: cache.increment(f"{prefix}:counter:{i % 100}")),
+        ("cache.delete", lambda i: cache.delete(f"{prefix}:{i}")),
+    ]
+    results = {}
+    for name, call in operations:
+        results[name] = await measure(call, count, args.concurrency)
+
+    await cache.clear_pattern(f"{prefix}:*")
+    await cache.disconnect()
+    return results
+
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    for row in rows:
+        flag = "REGRESSED" if row["regressed"] else "ok"
+        print(f"  {row['benchmark']:<18} {row['metric']:<18} {row['baseline']:>12} -> {row['current']:>12} "
+              f"({row['change']:+.1%}) {flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Async SQLAlchemy URL (default: a temporary SQLite file)")
+    parser.add_argument("--redis-url", help="Real Redis server (default: in-memory)")
+    parser.add_argument("--auth-requests", type=int, default=50, help="Users to register and log in")
+    parser.add_argument("--me-requests", type=int, default=500)
+    parser.add_argument("--cache-operations", type=int, default=5000, help="Calls per cache operation")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--skip-auth", action="store_true")
+    parser.add_argument("--skip-cache", action="store_true")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    parser.add_argument("--baseline", help="Compare against results saved at this path")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Save these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-latency-change-ms", type=float, default=0.05,
+                        help="Ignore latency increases smaller than this (timer and scheduling noise)")
+    args = parser.parse_args(argv)
+
+    database_url = configure_environment(args)
+    redis_client, redis_backend = build_redis_client(args.redis_url)
+
+    async def run():
+        benchmarks: Dict[str, Dict[str, Any]] = {}
+        if not args.skip_auth:
+            benchmarks.update(await bench_auth(args))
+        if not args.skip_cache:
+            benchmarks.update(await bench_cache(args, redis_client))
+        return benchmarks
+
+    results: Dict[str, Any] = {
+        "benchmarks": asyncio.run(run()),
+        "config": {
+            "database": database_url.split("://")[0],
+            "redis": redis_backend if not args.redis_url else "redis server",
+            "concurrency": args.concurrency
+        },
+        "environment": environment_info()
+    }
+
+    for name, result in results["benchmarks"].items():
+        latency = result["latency_ms"]
+        print(f"{name:<18} {result['throughput_per_s']:>10}/s  p50={latency['p50']}ms "
+              f"p95={latency['p95']}ms p99={latency['p99']}ms errors={result['error_rate']:.2%}")
+
+    if args.output:
+        write_results(args.output, results)
+
+    failures = failed_benchmarks(results["benchmarks"], () if args.skip_auth else AUTH_BENCHMARKS)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+
+    if args.save_baseline:
+        if failures:
+            print(f"Not saving {args.save_baseline}: a baseline must come from a clean run", file=sys.stderr)
+        else:
+            write_results(args.save_baseline, results)
+            print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        baseline = read_results(args.baseline)
+        if baseline is None:
+            print(f"No baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+            return 1
+        if failed_benchmarks(baseline["benchmarks"]):
+            print(f"Baseline {args.baseline} has failed benchmarks; save a new one from a clean run",
+                  file=sys.stderr)
+            return 1
+        rows = compare_to_baseline(
+            results["benchmarks"], baseline["benchmarks"], args.tolerance, args.min_latency_change_ms
+        )
+        print(f"Compared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+        print_comparison(rows)
+        regressions = [row for row in rows if row["regressed"]]
+        if regressions:
+            print(f"FAIL: {len(regressions)} regressed metrics", file=sys.stderr)
+            return 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Latency benchmark for the budget-constrained furnishing optimizer
+
+Builds a synthetic catalog (random style vectors, log-normal prices,
+some items out of stock) and times optimize() for a typical room with
+several slots and ranked alternatives. The target is p95 under 100 ms
+for 100k+ candidates.
+
+Usage (from backend/):
+    python -m benchmarks.bench_optimizer --products 100000 --runs 50
+"""
+import argparse
+import sys
+import time
+import uuid
+from typing import List, Optional
+
+import numpy as np
+
+from benchmarks.common import environment_info, summarize, write_results
+from design_generation_service.furniture_matching.optimizer import FurnishingOptimizer
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--slots", type=int, default=8, help="Categories to furnish per run")
+    parser.add_argument("--budget", type=float, default=5000.0)
+    parser.add_argument("--alternatives", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    names = [f"category-{i}" for i in range(args.categories)]
+    optimizer = FurnishingOptimizer(
+        [uuid.UUID(int=i) for i in range(args.products)],
+        rng.choice(names, args.products),
+        rng.lognormal(5.5, 1.0, args.products).round(2),
+        rng.standard_normal((args.products, args.dim)).astype(np.float32),
+        rng.random(args.products) > 0.1
+    )
+    slots = {names[i]: 1 + i % 3 for i in range(args.slots)}
+
+    # Warm up
+    optimizer.optimize(slots, rng.standard_normal(args.dim), args.budget, alternatives=args.alternatives)
+
+    latencies = []
+    found = 0
+    for _ in range(args.runs):
+        style_vector = rng.standard_normal(args.dim)
+        started = time.perf_counter()
+        selections = optimizer.optimize(slots, style_vector, args.budget, alternatives=args.alternatives)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found += bool(selections)
+
+    results = {
+        "products": args.products,
+        "dim": args.dim,
+        "slots": args.slots,
+        "alternatives": args.alternatives,
+        "runs": args.runs,
+        "feasible_runs": found,
+        "latency_ms": summarize(latencies),
+        "environment": environment_info()
+    }
+    latency = results["latency_ms"]
+    print(f"{args.products} products, {args.slots} slots: "
+          f"p50={latency['p50']}ms p95={latency['p95']}ms max={latency['max']}ms")
+
+    if args.output:
+        write_results(args.output, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
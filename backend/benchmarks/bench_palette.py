@@ -0,0 +1,94 @@
+"""
+Benchmark for batched color palette extraction
+
+Measures clustering throughput on pre-decoded pixels and end-to-end
+throughput including JPEG decode and downsampling, on synthetic images.
+
+Usage (from backend/):
+    python -m benchmarks.bench_palette --images 512 --batch-size 256
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from benchmarks.common import environment_info, write_results
+from design_generation_service.color_palette.extractor import (
+    SAMPLE_SIZE,
+    extract_palettes,
+    palettes_from_pixels,
+)
+
+
+def synthetic_pixels(count: int, seed: int = 0) -> np.ndarray:
+    """Images made of a few flat color regions plus noise, (count, P, 3) uint8"""
+    rng = np.random.default_rng(seed)
+    pixels = SAMPLE_SIZE * SAMPLE_SIZE
+    base_colors = rng.integers(0, 256, size=(count, 5, 3))
+    region = rng.integers(0, 5, size=(count, pixels))
+    noise = rng.normal(0, 6, size=(count, pixels, 3))
+    values = base_colors[np.arange(count)[:, None], region] + noise
+    return np.clip(values, 0, 255).astype(np.uint8)
+
+
+def write_jpegs(pixels: np.ndarray, directory: str, size: int) -> List[str]:
+    """Write upscaled JPEGs so decoding cost resembles real photos"""
+    from PIL import Image
+
+    paths = []
+    for i, image in enumerate(pixels):
+        img = Image.fromarray(image.reshape(SAMPLE_SIZE, SAMPLE_SIZE, 3)).resize((size, size))
+        path = os.path.join(directory, f"{i}.jpg")
+        img.save(path, quality=85)
+        paths.append(path)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--jpeg-size", type=int, default=1024, help="Edge length of synthetic JPEGs")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args(argv)
+
+    pixels = synthetic_pixels(args.images)
+
+    # Warm up so first-call allocation isn't measured
+    palettes_from_pixels(pixels[:8], k=args.k)
+
+    started = time.perf_counter()
+    for start in range(0, args.images, args.batch_size):
+        palettes_from_pixels(pixels[start:start + args.batch_size], k=args.k)
+    cluster_s = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_jpegs(pixels, directory, args.jpeg_size)
+        started = time.perf_counter()
+        extract_palettes(paths, k=args.k, batch_size=args.batch_size)
+        end_to_end_s = time.perf_counter() - started
+
+    results = {
+        "images": args.images,
+        "batch_size": args.batch_size,
+        "k": args.k,
+        "jpeg_size": args.jpeg_size,
+        "clustering_images_per_s": round(args.images / cluster_s, 1),
+        "end_to_end_images_per_s": round(args.images / end_to_end_s, 1),
+        "environment": environment_info()
+    }
+    print(f"clustering only: {results['clustering_images_per_s']} images/s")
+    print(f"decode + cluster ({args.jpeg_size}px JPEG): {results['end_to_end_images_per_s']} images/s")
+
+    if args.output:
+        write_results(args.output, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
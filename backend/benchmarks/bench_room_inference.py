@@ -0,0 +1,102 @@
+"""
+Throughput/latency benchmark for batched room-photo inference on CPU
+
+Sends a fixed number of preprocessed inputs from many concurrent callers
+and compares one-image-per-forward-pass (max batch size 1) against dynamic
+batching. Uses randomly initialized weights by default, so nothing is
+downloaded; compute cost is identical to the pretrained model.
+
+Usage (from backend/):
+    python -m benchmarks.bench_room_inference --requests 256 --concurrency 32
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from benchmarks.common import environment_info, summarize, write_results
+from design_generation_service.style_analysis.room_analyzer import INPUT_SIZE, RoomAnalyzer
+
+
+async def run_case(
+    max_batch_size: int,
+    max_wait_ms: float,
+    requests: int,
+    concurrency: int,
+    threads: Optional[int],
+    weights: str
+) -> Dict[str, Any]:
+    analyzer = RoomAnalyzer(
+        weights=weights,
+        max_batch_size=max_batch_size,
+        max_wait_ms=max_wait_ms,
+        intra_op_threads=threads
+    )
+    rng = np.random.default_rng(0)
+    tensor = rng.standard_normal((3, INPUT_SIZE, INPUT_SIZE)).astype(np.float32)
+
+    # Warm up: loads the model and lets torch pick kernels
+    await asyncio.gather(*[analyzer.analyze_tensor(tensor) for _ in range(max_batch_size)])
+    analyzer.batcher.batches_run = analyzer.batcher.items_run = 0
+
+    latencies: List[float] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with slots:
+            started = time.perf_counter()
+            await analyzer.analyze_tensor(tensor)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    elapsed = time.perf_counter() - started
+    mean_batch = analyzer.batcher.mean_batch_size
+    await analyzer.close()
+
+    return {
+        "max_batch_size": max_batch_size,
+        "max_wait_ms": max_wait_ms,
+        "intra_op_threads": analyzer.intra_op_threads,
+        "throughput_per_s": round(requests / elapsed, 2),
+        "mean_batch_size": round(mean_batch, 2),
+        "latency_ms": summarize(latencies)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-sizes", default="1,8,16,32", help="Comma-separated max batch sizes")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--threads", type=int, help="Intra-op threads (default: half the CPUs)")
+    parser.add_argument("--weights", default="none", help='"none" (random init) or "DEFAULT"')
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args(argv)
+
+    cases = []
+    for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+        case = asyncio.run(run_case(
+            batch_size, args.max_wait_ms, args.requests, args.concurrency, args.threads, args.weights
+        ))
+        latency = case["latency_ms"]
+        print(f"max_batch={batch_size:>3} mean_batch={case['mean_batch_size']:>5} "
+              f"throughput={case['throughput_per_s']:>7}/s p50={latency['p50']}ms p95={latency['p95']}ms")
+        cases.append(case)
+
+    if args.output:
+        write_results(args.output, {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cases": cases,
+            "environment": environment_info()
+        })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Import-time budget check for the service entry points
+
+Imports each module in a fresh interpreter (so nothing is cached in
+sys.modules) several times and compares the median wall time against a
+budget. Also fails if a module pulls in a heavy dependency that should
+only load on first use (torch, the OpenAI/Anthropic SDKs). Exits non-zero
+on any violation, so it can gate CI. One extra `-X importtime` run shows
+which packages the time goes to.
+
+Usage (from backend/):
+    python -m benchmarks.check_import_time --budget-ms 2000
+    python -m benchmarks.check_import_time --module design_generation_service.main --budget-ms 2500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, Any, List, Optional, Tuple
+
+from benchmarks.common import BACKEND_DIR, environment_info, write_results
+
+# Modules that must stay out of startup; they load lazily when first needed
+DEFERRED_MODULES = ("torch", "torchvision", "openai", "anthropic", "langchain_openai", "langchain_anthropic")
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print("IMPORT_SECONDS", elapsed)
+print("LOADED", ",".join(sorted(m for m in {deferred!r} if m in sys.modules)))
+"""
+
+
+def run_once(module: str, env: Dict[str, str], importtime: bool = False) -> Tuple[float, List[str], str]:
+    """Import a module in a fresh interpreter; returns (seconds, deferred modules loaded, importtime log)"""
+    code = PROBE.format(module=module, deferred=DEFERRED_MODULES)
+    flags = ["-X", "importtime"] if importtime else []
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    seconds, loaded = 0.0, []
+    for line in result.stdout.splitlines():
+        if line.startswith("IMPORT_SECONDS"):
+            seconds = float(line.split()[1])
+        elif line.startswith("LOADED"):
+            loaded = [name for name in line.partition(" ")[2].split(",") if name]
+    return seconds, loaded, result.stderr
+
+
+def slowest_imports(importtime_log: str, top: int) -> List[Tuple[str, float]]:
+    """Top-level packages by self time in ms, from `-X importtime` output"""
+    totals: Dict[str, float] = {}
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header row
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0.0) + int(self_us) / 1000
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="Module to import (default: the API gateway)")
+    parser.add_argument("--budget-ms", type=float, default=2000.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    parser.add_argument("--allow-deferred", action="store_true", help="Don't fail on heavy eager imports")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    env.setdefault("LLM_PROVIDER_OVERRIDE", "fake")  # no API keys needed to import the agents
+
+    timings, loaded = [], []
+    for _ in range(args.runs):
+        seconds, loaded, _ = run_once(args.module, env)
+        timings.append(seconds * 1000)
+    # One extra traced run for the breakdown (tracing itself slows imports down)
+    _, _, log = run_once(args.module, env, importtime=True)
+
+    median_ms = statistics.median(timings)
+    results: Dict[str, Any] = {
+        "module": args.module,
+        "runs": args.runs,
+        "budget_ms": args.budget_ms,
+        "import_ms": {"median": round(median_ms, 1), "min": round(min(timings), 1), "max": round(max(timings), 1)},
+        "deferred_modules_loaded": loaded,
+        "slowest_packages_ms": {name: round(ms, 1) for name, ms in slowest_imports(log, args.top)},
+        "environment": environment_info()
+    }
+
+    print(f"import {args.module}: median {median_ms:.0f}ms (budget {args.budget_ms:.0f}ms)")
+    for name, ms in results["slowest_packages_ms"].items():
+        print(f"  {name:<24} {ms:8.1f}ms")
+    if args.output:
+        write_results(args.output, results)
+
+    failed = False
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import time over budget by {median_ms - args.budget_ms:.0f}ms")
+        failed = True
+    if loaded and not args.allow_deferred:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(loaded)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Shared helpers for benchmark and load-test scripts
+"""
+import json
+import math
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+# Make backend packages importable when a script is run from anywhere
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Metrics compared against a baseline: (dotted path, whether higher is better)
+BASELINE_METRICS: Tuple[Tuple[str, bool], ...] = (
+    ("throughput_per_s", True),
+    ("latency_ms.p50", False),
+    ("latency_ms.p95", False),
+)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of values (0 when empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(values_ms: List[float]) -> Dict[str, float]:
+    """Summarize a list of millisecond timings"""
+    if not values_ms:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": len(values_ms),
+        "mean": round(sum(values_ms) / len(values_ms), 3),
+        "p50": round(percentile(values_ms, 50), 3),
+        "p95": round(percentile(values_ms, 95), 3),
+        "p99": round(percentile(values_ms, 99), 3),
+        "max": round(max(values_ms), 3)
+    }
+
+
+def environment_info() -> Dict[str, Any]:
+    """Describe the machine a benchmark ran on"""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def write_results(path: str, results: Dict[str, Any]):
+    """Write benchmark results as pretty JSON"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def read_results(path: str) -> Optional[Dict[str, Any]]:
+    """Read results JSON written by write_results (None if the file doesn't exist)"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _metric(result: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = result
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare_to_baseline(
+    current: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+    min_latency_change_ms: float = 0.0
+) -> List[Dict[str, Any]]:
+    """
+    Compare named benchmark results against a saved baseline
+
+    Benchmarks missing from either side are skipped. A metric regresses when
+    it is worse than the baseline by more than `tolerance` (0.2 = 20%);
+    latencies must also have grown by at least `min_latency_change_ms`, so
+    microsecond-scale timings don't flag noise. Any increase in error rate
+    is a regression.
+
+    Args:
+        current: Benchmark name to its results (throughput_per_s, latency_ms, error_rate)
+        baseline: The same mapping from an earlier run
+        tolerance: Allowed relative slowdown
+        min_latency_change_ms: Smallest latency increase that counts
+
+    Returns:
+        One row per compared metric, with "regressed" set on regressions
+    """
+    rows = []
+    for name, result in current.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for path, higher_is_better in BASELINE_METRICS:
+            now, before = _metric(result, path), _metric(previous, path)
+            if now is None or not before:
+                continue
+            change = (now - before) / before
+            if higher_is_better:
+                regressed = change < -tolerance
+            else:
+                regressed = change > tolerance and now - before >= min_latency_change_ms
+            rows.append({"benchmark": name, "metric": path, "baseline": before, "current": now,
+                         "change": round(change, 4), "regressed": regressed})
+        now, before = result.get("error_rate"), previous.get("error_rate")
+        if now is not None and before is not None and (now or before):
+            rows.append({"benchmark": name, "metric": "error_rate", "baseline": before, "current": now,
+                         "change": round(now - before, 4), "regressed": now > before})
+    return rows
+
+
+def failed_benchmarks(
+    results: Dict[str, Dict[str, Any]],
+    required: Sequence[str] = ()
+) -> List[str]:
+    """
+    Problems that make a run unfit to save as a baseline or to pass a comparison
+
+    Args:
+        results: Benchmark name to its results
+        required: Benchmarks the run must include
+
+    Returns:
+        One description per benchmark with errors or missing (empty when the run is clean)
+    """
+    problems = [f"{name}: not run" for name in required if name not in results]
+    problems.extend(
+        f"{name}: error rate {result['error_rate']:.2%}"
+        for name, result in results.items()
+        if result.get("error_rate")
+    )
+    return problems
@@ -0,0 +1,200 @@
+"""
+Offline load test for the design generation service
+
+Drives /generate-design at a fixed arrival rate (open loop) and reports
+throughput, latency percentiles and client-side queueing. By default the
+service runs in-process against the fake LLM provider, so no network access
+or API spend is involved.
+
+Requests are spread across --tenants simulated tenants, cycling through
+--tiers, with tenant headers signed the way the gateway signs them (the
+target service must share SECRET_KEY). Per-tenant concurrency caps apply as
+in production; --tenants 0 sends no tenant headers, so every request runs
+as the uncapped internal caller (the in-process service allows this; a
+--url target needs ALLOW_INTERNAL_CALLERS=True).
+
+With the default fake provider settings each generation takes about
+FAKE_LLM_LATENCY_MS plus the canned response (~380 tokens) at
+FAKE_LLM_TOKENS_PER_SECOND, i.e. ~8.3 s, and a process runs
+DESIGN_GENERATION_CONCURRENCY (8) at once, so it sustains about 1 request/s.
+Raise FAKE_LLM_TOKENS_PER_SECOND to test higher rates.
+
+Usage (from backend/):
+    python -m benchmarks.load_test_design_service --rps 0.5 --duration 30 --max-p95-ms 12000
+    FAKE_LLM_TOKENS_PER_SECOND=1000 python -m benchmarks.load_test_design_service --rps 4 --max-p95-ms 3000
+    python -m benchmarks.load_test_design_service --url http://localhost:8001 --rps 0.5
+    python -m benchmarks.load_test_design_service --tenants 1 --tiers enterprise
+
+Exits with status 1 when --max-p95-ms or --max-error-rate is exceeded, so it
+can gate CI.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+from benchmarks.common import environment_info, summarize, write_results
+
+TIERS = ("starter", "professional", "enterprise")
+
+SAMPLE_REQUEST = {
+    "client_brief": {
+        "client_name": "Load Test",
+        "lifestyle": "Young family with a dog",
+        "goals": ["more storage", "brighter living room"]
+    },
+    "space_data": {
+        "rooms": [{"name": "living room", "width_m": 5.2, "length_m": 4.1, "height_m": 2.6}]
+    },
+    "budget": {"total": 15000, "currency": "USD"},
+    "style_preferences": ["scandinavian", "japandi"]
+}
+
+
+def tenant_headers(tenants: int, tiers: List[str]) -> List[Dict[str, str]]:
+    """Identity of each simulated tenant, tiers assigned round robin (empty: no headers)"""
+    return [
+        {"X-Tenant-ID": f"load-test-{i}", "X-Subscription-Tier": tiers[i % len(tiers)]}
+        for i in range(tenants)
+    ]
+
+
+def build_client(url: Optional[str], timeout: float):
+    """Create an HTTP client for a remote URL or the in-process service"""
+    import httpx
+
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=timeout)
+
+    # Agents read settings at import time, so the overrides must come first;
+    # monthly quotas need Redis, which an offline run doesn't have, and
+    # --tenants 0 needs untenanted calls
+    os.environ.setdefault("LLM_PROVIDER_OVERRIDE", "fake")
+    os.environ.setdefault("QUOTAS_ENABLED", "false")
+    os.environ.setdefault("ALLOW_INTERNAL_CALLERS", "true")
+    from design_generation_service.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://design-service", timeout=timeout)
+
+
+async def run_load(
+    client,
+    path: str,
+    rps: float,
+    duration: float,
+    concurrency: int,
+    tenants: Optional[List[Dict[str, str]]] = None
+) -> Dict[str, Any]:
+    """
+    Fire requests at a fixed rate and record per-request timings
+
+    Requests are scheduled on a fixed timetable regardless of how fast earlier
+    ones complete. When `concurrency` requests are already in flight, new ones
+    wait for a slot; that wait is reported as queueing time. Request i is sent
+    as tenant i mod len(tenants), with freshly signed headers.
+    """
+    # Settings load on first import, so this waits until build_client() has set the environment
+    from shared.auth import TENANT_SIGNATURE_HEADER, sign_tenant
+
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    queue_times: List[float] = []
+    status_counts: Dict[str, int] = {}
+    total = int(rps * duration)
+    interval = 1 / rps
+
+    async def one_request(scheduled_at: float, tenant: Optional[Dict[str, str]]):
+        headers = {}
+        if tenant:
+            headers = {
+                **tenant,
+                TENANT_SIGNATURE_HEADER: sign_tenant(tenant["X-Tenant-ID"], tenant["X-Subscription-Tier"])
+            }
+        async with slots:
+            started = time.perf_counter()
+            queue_times.append((started - scheduled_at) * 1000)
+            try:
+                response = await client.post(path, json=SAMPLE_REQUEST, headers=headers)
+                key = str(response.status_code)
+            except Exception as e:
+                key = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            status_counts[key] = status_counts.get(key, 0) + 1
+
+    began = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        scheduled_at = began + i * interval
+        delay = scheduled_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tenant = tenants[i % len(tenants)] if tenants else None
+        tasks.append(asyncio.create_task(one_request(scheduled_at, tenant)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - began
+
+    ok = status_counts.get("200", 0)
+    return {
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "target_rps": rps,
+        "tenants": len(tenants or []),
+        "throughput_rps": round(ok / elapsed, 3) if elapsed else 0.0,
+        "error_rate": round(1 - ok / total, 4) if total else 0.0,
+        "status_counts": status_counts,
+        "latency_ms": summarize(latencies),
+        "queue_ms": summarize(queue_times)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running service (default: in-process with the fake provider)")
+    parser.add_argument("--path", default="/generate-design")
+    parser.add_argument("--rps", type=float, default=0.5,
+                        help="Target arrival rate (~1/s saturates one process at the default fake latency)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to generate load for")
+    parser.add_argument("--concurrency", type=int, default=100, help="Max requests in flight")
+    parser.add_argument("--tenants", type=int, default=12, help="Simulated tenants (0: untenanted internal calls)")
+    parser.add_argument("--tiers", default=",".join(TIERS), help="Comma-separated tiers assigned to tenants in turn")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Write results JSON to this path")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if p95 latency exceeds this")
+    parser.add_argument("--max-error-rate", type=float, help="Fail if the error rate exceeds this")
+    args = parser.parse_args(argv)
+    tiers = [tier.strip() for tier in args.tiers.split(",") if tier.strip()]
+    if args.tenants and not tiers:
+        parser.error("--tiers needs at least one tier")
+    tenants = tenant_headers(args.tenants, tiers)
+
+    async def run():
+        async with build_client(args.url, args.timeout) as client:
+            return await run_load(client, args.path, args.rps, args.duration, args.concurrency, tenants)
+
+    results = asyncio.run(run())
+    results["environment"] = environment_info()
+
+    latency, queue = results["latency_ms"], results["queue_ms"]
+    print(f"requests={results['requests']} throughput={results['throughput_rps']}/s "
+          f"errors={results['error_rate']:.2%}")
+    print(f"latency ms: p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} max={latency['max']}")
+    print(f"queue ms:   p50={queue['p50']} p95={queue['p95']} p99={queue['p99']}")
+
+    if args.output:
+        write_results(args.output, results)
+
+    failed = False
+    if args.max_p95_ms is not None and latency["p95"] > args.max_p95_ms:
+        print(f"FAIL: p95 {latency['p95']}ms > {args.max_p95_ms}ms", file=sys.stderr)
+        failed = True
+    if args.max_error_rate is not None and results["error_rate"] > args.max_error_rate:
+        print(f"FAIL: error rate {results['error_rate']} > {args.max_error_rate}", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Vectorized color palette extraction for room photos and mood boards
+"""
+from typing import Dict, Any, List, Optional, Sequence
+import numpy as np
+
+
+# Images are downsampled to SAMPLE_SIZE x SAMPLE_SIZE before clustering;
+# a palette doesn't need more pixels than that
+SAMPLE_SIZE = 32
+
+# D65 reference white for sRGB -> CIE XYZ -> Lab
+_XYZ_WHITE = np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+], dtype=np.float32)
+_XYZ_TO_RGB = np.linalg.inv(_RGB_TO_XYZ).astype(np.float32)
+_LAB_EPSILON = 216 / 24389
+_LAB_KAPPA = 24389 / 27
+
+
+def srgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """Convert uint8 sRGB values (..., 3) to CIE Lab (..., 3) float32"""
+    c = rgb.astype(np.float32) / 255.0
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T / _XYZ_WHITE
+    f = np.where(xyz > _LAB_EPSILON, np.cbrt(xyz), (_LAB_KAPPA * xyz + 16) / 116)
+    L = 116 * f[..., 1] - 16
+    a = 500 * (f[..., 0] - f[..., 1])
+    b = 200 * (f[..., 1] - f[..., 2])
+    return np.stack([L, a, b], axis=-1)
+
+
+def lab_to_srgb(lab: np.ndarray) -> np.ndarray:
+    """Convert CIE Lab (..., 3) to uint8 sRGB (..., 3), clipping out-of-gamut colors"""
+    L, a, b = lab[..., 0], lab[..., 1], lab[..., 2]
+    fy = (L + 16) / 116
+    f = np.stack([fy + a / 500, fy, fy - b / 200], axis=-1)
+    xyz = np.where(f ** 3 > _LAB_EPSILON, f ** 3, (116 * f - 16) / _LAB_KAPPA) * _XYZ_WHITE
+    linear = np.clip(xyz @ _XYZ_TO_RGB.T, 0.0, 1.0)
+    c = np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+    return np.round(np.clip(c, 0.0, 1.0) * 255).astype(np.uint8)
+
+
+def load_pixels(path: str, size: int = SAMPLE_SIZE) -> np.ndarray:
+    """Decode and downsample an image to a (size*size, 3) uint8 pixel array"""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.draft("RGB", (size, size))  # JPEG decodes at 1/2..1/8 scale directly
+        img = img.convert("RGB").resize((size, size), Image.BILINEAR)
+        return np.asarray(img, dtype=np.uint8).reshape(-1, 3)
+
+
+def _init_centroids(X: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Batched k-means++ seeding: X is (B, P, 3), returns (B, k, 3)"""
+    B, P, _ = X.shape
+    batch = np.arange(B)
+    centroids = np.empty((B, k, 3), dtype=X.dtype)
+    centroids[:, 0] = X[batch, rng.integers(0, P, size=B)]
+    closest = ((X - centroids[:, :1]) ** 2).sum(-1)
+
+    for j in range(1, k):
+        cumulative = np.cumsum(closest, axis=1)
+        # All-identical images have zero distance everywhere; any pick is fine then
+        targets = rng.random(B) * cumulative[:, -1]
+        picks = np.minimum((cumulative < targets[:, None]).sum(axis=1), P - 1)
+        centroids[:, j] = X[batch, picks]
+        closest = np.minimum(closest, ((X - centroids[:, j:j + 1]) ** 2).sum(-1))
+    return centroids
+
+
+def batched_kmeans(
+    X: np.ndarray,
+    k: int,
+    max_iter: int = 20,
+    tol: float = 0.5,
+    seed: Optional[int] = 0
+) -> tuple:
+    """
+    Run k-means on many images at once
+
+    Args:
+        X: (B, P, 3) float32 pixels per image
+        k: Clusters per image
+        max_iter: Iteration cap
+        tol: Stop once no centroid moves more than this (Lab units)
+        seed: Seed for k-means++ initialization
+
+    Returns:
+        Tuple of centroids (B, k, 3) and pixel counts per cluster (B, k)
+    """
+    rng = np.random.default_rng(seed)
+    B, P, _ = X.shape
+    centroids = _init_centroids(X, k, rng)
+    x_sq = (X ** 2).sum(-1, keepdims=True)  # (B, P, 1)
+    # Offsets so every (image, cluster) pair gets its own bincount slot
+    offsets = (np.arange(B) * k)[:, None]
+    counts = np.zeros((B, k), dtype=X.dtype)
+
+    for _ in range(max_iter):
+        # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2, as one batched matmul
+        distances = x_sq - 2 * (X @ centroids.transpose(0, 2, 1)) \
+            + (centroids ** 2).sum(-1)[:, None, :]
+        slots = (distances.argmin(-1) + offsets).ravel()             # (B * P,)
+        counts = np.bincount(slots, minlength=B * k).reshape(B, k).astype(X.dtype)
+        sums = np.stack([
+            np.bincount(slots, weights=X[..., c].ravel(), minlength=B * k)
+            for c in range(3)
+        ], axis=-1).reshape(B, k, 3).astype(X.dtype)
+
+        # Empty clusters keep their previous centroid
+        updated = np.where(
+            counts[..., None] > 0,
+            sums / np.maximum(counts, 1)[..., None],
+            centroids
+        )
+        shift = np.abs(updated - centroids).max()
+        centroids = updated
+        if shift < tol:
+            break
+
+    return centroids, counts
+
+
+def palettes_from_pixels(
+    pixels: np.ndarray,
+    k: int = 6,
+    min_weight: float = 0.02,
+    seed: Optional[int] = 0
+) -> List[List[Dict[str, Any]]]:
+    """
+    Extract weighted palettes from a batch of pixel arrays
+
+    Args:
+        pixels: (B, P, 3) uint8 sRGB pixels, one row of P pixels per image
+        k: Maximum swatches per image
+        min_weight: Drop swatches covering less than this fraction of the image
+        seed: Seed for clustering
+
+    Returns:
+        One palette per image: swatches sorted by weight, in the same
+        {name, hex, usage} shape as DesignConcept.color_palette plus
+        `weight` and `lab`
+    """
+    lab = srgb_to_lab(pixels)
+    centroids, counts = batched_kmeans(lab, k, seed=seed)
+    weights = counts / counts.sum(axis=1, keepdims=True)
+    rgb = lab_to_srgb(centroids)
+
+    palettes = []
+    for i in range(len(pixels)):
+        swatches = []
+        for j in np.argsort(-weights[i]):
+            if weights[i, j] < min_weight:
+                continue
+            r, g, b = (int(v) for v in rgb[i, j])
+            swatches.append({
+                "name": None,
+                "hex": f"#{r:02X}{g:02X}{b:02X}",
+                "usage": None,
+                "weight": round(float(weights[i, j]), 4),
+                "lab": [round(float(v), 2) for v in centroids[i, j]]
+            })
+        palettes.append(swatches)
+    return palettes
+
+
+def extract_palettes(
+    paths: Sequence[str],
+    k: int = 6,
+    batch_size: int = 256,
+    seed: Optional[int] = 0
+) -> List[List[Dict[str, Any]]]:
+    """
+    Extract palettes from image files, clustering them in batches
+
+    Args:
+        paths: Image file paths
+        k: Maximum swatches per image
+        batch_size: Images clustered together per NumPy pass
+        seed: Seed for clustering
+
+    Returns:
+        One palette per path, in input order
+    """
+    palettes: List[List[Dict[str, Any]]] = []
+    for start in range(0, len(paths), batch_size):
+        batch = np.stack([load_pixels(path) for path in paths[start:start + batch_size]])
+        palettes.extend(palettes_from_pixels(batch, k=k, seed=seed))
+    return palettes
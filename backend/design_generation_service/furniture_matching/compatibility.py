@@ -0,0 +1,470 @@
+"""
+Sparse product compatibility graph - top-N compatible products per product
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from shared.config import settings
+
+
+NO_CATEGORY = -1
+
+ProductIds = Union[np.ndarray, Sequence[Union[str, uuid.UUID]]]
+
+
+def _keys(product_ids: ProductIds) -> np.ndarray:
+    """Product ids as an array of 16-byte keys (the embedding store's id format)"""
+    if isinstance(product_ids, np.ndarray) and product_ids.dtype == np.dtype("V16"):
+        return np.asarray(product_ids)
+    raw = b"".join(
+        (pid if isinstance(pid, uuid.UUID) else uuid.UUID(str(pid))).bytes
+        for pid in product_ids
+    )
+    return np.frombuffer(raw, dtype="V16")
+
+
+def _prepare(
+    product_ids: ProductIds,
+    vectors: np.ndarray,
+    categories: Sequence[Optional[str]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """Sort by id, L2-normalize vectors and encode categories as small ints"""
+    keys = _keys(product_ids)
+    if len(keys) != len(vectors) or len(keys) != len(categories):
+        raise ValueError("product_ids, vectors and categories must have the same length")
+
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    vectors = np.asarray(vectors, dtype=np.float32)[order]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms > 0, norms, 1.0)
+
+    names = sorted({category for category in categories if category})
+    lookup = {name: code for code, name in enumerate(names)}
+    codes = np.array([lookup.get(categories[i], NO_CATEGORY) for i in order], dtype=np.int16)
+    return keys, vectors, codes, names
+
+
+def _select_top(indices: np.ndarray, scores: np.ndarray, top_n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Keep the best top_n (index, score) pairs per row, best first
+
+    Invalid entries have score -inf and come back as index -1.
+    """
+    k = min(top_n, scores.shape[1])
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        indices = np.take_along_axis(indices, part, axis=1)
+        scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    indices = np.take_along_axis(indices, order, axis=1)
+    scores = np.take_along_axis(scores, order, axis=1)
+    indices = np.where(np.isfinite(scores), indices, -1)
+    return indices.astype(np.int32), scores.astype(np.float32)
+
+
+def _score_block(
+    vectors: np.ndarray,
+    codes: np.ndarray,
+    rows: np.ndarray,
+    columns: np.ndarray,
+    min_score: float,
+    exclude_same_category: bool
+) -> np.ndarray:
+    """Cosine scores of rows against columns, with ineligible pairs set to -inf"""
+    scores = vectors[rows] @ vectors[columns].T
+    invalid = rows[:, None] == columns[None, :]
+    if exclude_same_category:
+        row_codes = codes[rows][:, None]
+        invalid |= (row_codes == codes[columns][None, :]) & (row_codes != NO_CATEGORY)
+    invalid |= scores < min_score
+    scores[invalid] = -np.inf
+    return scores
+
+
+def _topn_block(
+    vectors: np.ndarray,
+    codes: np.ndarray,
+    rows: np.ndarray,
+    top_n: int,
+    min_score: float,
+    exclude_same_category: bool
+) -> Tuple[np.ndarray, np.ndarray]:
+    columns = np.arange(len(vectors))
+    scores = _score_block(vectors, codes, rows, columns, min_score, exclude_same_category)
+    return _select_top(np.broadcast_to(columns, scores.shape), scores, top_n)
+
+
+def _topn_worker(vectors_path: str, codes: np.ndarray, rows: np.ndarray, *args) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-N for a chunk of rows (runs in a worker process, vectors are memory-mapped)"""
+    return _topn_block(np.load(vectors_path, mmap_mode="r"), codes, rows, *args)
+
+
+def _compute_rows(
+    vectors: np.ndarray,
+    codes: np.ndarray,
+    rows: np.ndarray,
+    top_n: int,
+    min_score: float,
+    exclude_same_category: bool,
+    workers: int,
+    chunk_size: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Dense (len(rows), top_n) neighbour and score arrays, computed in chunks"""
+    chunks = [rows[start:start + chunk_size] for start in range(0, len(rows), chunk_size)]
+    if not chunks:
+        return np.empty((0, top_n), np.int32), np.empty((0, top_n), np.float32)
+
+    args = (top_n, min_score, exclude_same_category)
+    if workers <= 1 or len(chunks) == 1:
+        results = [_topn_block(vectors, codes, chunk, *args) for chunk in chunks]
+    else:
+        # Workers mmap one shared copy instead of each receiving the matrix by pickle
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            vectors_path = os.path.join(tmp_dir, "vectors.npy")
+            np.save(vectors_path, vectors)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(
+                    _topn_worker, repeat(vectors_path), repeat(codes), chunks,
+                    *[repeat(arg) for arg in args]
+                ))
+
+    indices = np.vstack([result[0] for result in results])
+    scores = np.vstack([result[1] for result in results])
+    if indices.shape[1] < top_n:  # catalogs smaller than top_n
+        pad = top_n - indices.shape[1]
+        indices = np.pad(indices, ((0, 0), (0, pad)), constant_values=-1)
+        scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+    return indices, scores
+
+
+def _to_csr(indices: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    valid = indices >= 0
+    indptr = np.zeros(len(indices) + 1, dtype=np.int64)
+    np.cumsum(valid.sum(axis=1), out=indptr[1:])
+    return indptr, indices[valid].astype(np.int32), scores[valid].astype(np.float32)
+
+
+class CompatibilityGraph:
+    """
+    Top-N compatible products per product, stored as CSR arrays
+
+    Row i lists the neighbours of ids[i] in indices[indptr[i]:indptr[i+1]]
+    with their cosine style similarity in the matching slice of scores,
+    best first. By default products of the same category are not linked,
+    so a sofa's neighbours are the chairs, tables and lamps that go with
+    it rather than other sofas.
+
+    Graphs are immutable: build() and update() return a new graph, so a
+    reader never sees a half-applied update.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        codes: np.ndarray,
+        categories: List[str],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        scores: np.ndarray,
+        top_n: int,
+        min_score: float,
+        exclude_same_category: bool
+    ):
+        self.ids = ids
+        self.codes = codes
+        self.categories = categories
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+        self.top_n = top_n
+        self.min_score = min_score
+        self.exclude_same_category = exclude_same_category
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    @classmethod
+    def build(
+        cls,
+        product_ids: ProductIds,
+        vectors: np.ndarray,
+        categories: Sequence[Optional[str]],
+        top_n: Optional[int] = None,
+        min_score: Optional[float] = None,
+        exclude_same_category: bool = True,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ) -> "CompatibilityGraph":
+        """
+        Build the graph from product style vectors
+
+        Args:
+            product_ids: Product UUIDs, or the embedding store's 16-byte id array
+            vectors: (n, dim) style vectors, one row per product
+            categories: Product category per row (None if unknown)
+            top_n: Neighbours kept per product
+            min_score: Pairs below this cosine similarity are never linked
+            exclude_same_category: Only link products of different categories
+            workers: Processes to compute chunks in (1 computes inline)
+            chunk_size: Rows scored per matrix product
+
+        Returns:
+            New CompatibilityGraph
+        """
+        keys, vectors, codes, names = _prepare(product_ids, vectors, categories)
+        top_n = top_n or settings.COMPATIBILITY_TOP_N
+        min_score = settings.COMPATIBILITY_MIN_SCORE if min_score is None else min_score
+
+        indices, scores = _compute_rows(
+            vectors, codes, np.arange(len(keys)), top_n, min_score, exclude_same_category,
+            workers or settings.COMPATIBILITY_WORKERS,
+            chunk_size or settings.COMPATIBILITY_CHUNK_SIZE
+        )
+        return cls(keys, codes, names, *_to_csr(indices, scores), top_n, min_score, exclude_same_category)
+
+    def update(
+        self,
+        product_ids: ProductIds,
+        vectors: np.ndarray,
+        categories: Sequence[Optional[str]],
+        changed: ProductIds,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ) -> "CompatibilityGraph":
+        """
+        Incrementally update the graph after products were added, changed or removed
+
+        Only rows that must change are recomputed in full: new and changed
+        products, and products whose neighbour list contains a changed or
+        removed product. Every other row keeps its neighbours and merges in
+        the changed products as candidates, which gives the same result as
+        a full rebuild.
+
+        Args:
+            product_ids: The full current catalog
+            vectors: Style vectors for the full catalog
+            categories: Categories for the full catalog
+            changed: Ids of products whose vector or category changed
+                (added and removed products are detected automatically)
+
+        Returns:
+            New CompatibilityGraph
+        """
+        keys, vectors, codes, names = _prepare(product_ids, vectors, categories)
+        changed_keys = _keys(changed)
+        n = len(keys)
+        top_n = self.top_n
+        args = (self.min_score, self.exclude_same_category)
+
+        # Old row -> new row (-1 when the product was removed)
+        positions = np.minimum(np.searchsorted(keys, self.ids), max(n - 1, 0))
+        present = (keys[positions] == self.ids) if n else np.zeros(len(self.ids), bool)
+        remap = np.where(present, positions, -1)
+
+        stale_old = ~present | np.isin(self.ids, changed_keys)
+        is_changed = ~np.isin(keys, self.ids) | np.isin(keys, changed_keys)
+
+        # Rows that link to a stale product can't be patched; recompute them
+        edge_rows = np.repeat(np.arange(len(self.ids)), np.diff(self.indptr))
+        touched = np.unique(edge_rows[stale_old[self.indices]])
+        recompute = is_changed.copy()
+        recompute[remap[touched][remap[touched] >= 0]] = True
+
+        dense_indices = np.full((n, top_n), -1, dtype=np.int32)
+        dense_scores = np.full((n, top_n), -np.inf, dtype=np.float32)
+
+        # Carry over the neighbours of untouched rows
+        keep_rows = np.flatnonzero(~recompute)
+        old_rows = np.searchsorted(self.ids, keys[keep_rows])
+        starts = self.indptr[old_rows]
+        lengths = (self.indptr[old_rows + 1] - starts).astype(np.int64)
+        row_of = np.repeat(np.arange(len(keep_rows)), lengths)
+        slot = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        source = np.repeat(starts, lengths) + slot
+        dense_indices[keep_rows[row_of], slot] = remap[self.indices[source]]
+        dense_scores[keep_rows[row_of], slot] = self.scores[source]
+
+        # Merge changed products into untouched rows as candidates
+        candidates = np.flatnonzero(is_changed)
+        chunk_size = chunk_size or settings.COMPATIBILITY_CHUNK_SIZE
+        if len(candidates) and len(keep_rows):
+            for start in range(0, len(keep_rows), chunk_size):
+                rows = keep_rows[start:start + chunk_size]
+                scores = _score_block(vectors, codes, rows, candidates, *args)
+                merged_indices, merged_scores = _select_top(
+                    np.hstack([dense_indices[rows], np.broadcast_to(candidates, scores.shape)]),
+                    np.hstack([dense_scores[rows], scores]),
+                    top_n
+                )
+                dense_indices[rows], dense_scores[rows] = merged_indices, merged_scores
+
+        rows = np.flatnonzero(recompute)
+        dense_indices[rows], dense_scores[rows] = _compute_rows(
+            vectors, codes, rows, top_n, *args,
+            workers or settings.COMPATIBILITY_WORKERS, chunk_size
+        )
+
+        return CompatibilityGraph(
+            keys, codes, names, *_to_csr(dense_indices, dense_scores),
+            top_n, self.min_score, self.exclude_same_category
+        )
+
+    def _row(self, product_id: Union[str, uuid.UUID]) -> Optional[int]:
+        key = _keys([product_id])[0]
+        row = int(np.searchsorted(self.ids, key))
+        if row < len(self.ids) and self.ids[row] == key:
+            return row
+        return None
+
+    def neighbours(
+        self,
+        product_id: Union[str, uuid.UUID],
+        category: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Compatible products for a product, best first
+
+        Args:
+            product_id: Product to look up
+            category: Only return products of this category (e.g. "chair")
+            limit: Maximum number of results
+
+        Returns:
+            List of {product_id, category, score}, or None if the product
+            isn't in the graph
+        """
+        row = self._row(product_id)
+        if row is None:
+            return None
+
+        start, end = self.indptr[row], self.indptr[row + 1]
+        indices = self.indices[start:end]
+        scores = self.scores[start:end]
+        if category is not None:
+            code = self.categories.index(category) if category in self.categories else -2
+            mask = self.codes[indices] == code
+            indices, scores = indices[mask], scores[mask]
+        if limit is not None:
+            indices, scores = indices[:limit], scores[:limit]
+
+        return [
+            {
+                "product_id": str(uuid.UUID(bytes=self.ids[index].tobytes())),
+                "category": self.categories[self.codes[index]] if self.codes[index] != NO_CATEGORY else None,
+                "score": round(float(score), 4)
+            }
+            for index, score in zip(indices, scores)
+        ]
+
+    def save(self, directory: Optional[str] = None):
+        """Write the graph as .npy arrays, replacing any previous graph in the directory"""
+        directory = directory or settings.COMPATIBILITY_GRAPH_DIR
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".graph-")
+        for name in ("ids", "codes", "indptr", "indices", "scores"):
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({
+                "categories": self.categories,
+                "top_n": self.top_n,
+                "min_score": self.min_score,
+                "exclude_same_category": self.exclude_same_category
+            }, f)
+
+        old_dir = f"{tmp_dir}.old"
+        if os.path.exists(directory):
+            os.rename(directory, old_dir)
+        os.rename(tmp_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: Optional[str] = None) -> "CompatibilityGraph":
+        """Open a saved graph; the arrays are memory-mapped and shared between workers"""
+        directory = directory or settings.COMPATIBILITY_GRAPH_DIR
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in ("ids", "codes", "indptr", "indices", "scores")
+        }
+        return cls(
+            arrays["ids"], arrays["codes"], meta["categories"],
+            arrays["indptr"], arrays["indices"], arrays["scores"],
+            meta["top_n"], meta["min_score"], meta["exclude_same_category"]
+        )
+
+
+_graph: Optional[CompatibilityGraph] = None
+_graph_stamp: Optional[Tuple[int, int]] = None  # meta.json (inode, mtime) of the open graph
+_checked_at = 0.0
+
+
+def _saved_stamp() -> Optional[Tuple[int, int]]:
+    """Identifies the saved graph; save() writes a new meta.json, so this changes on every rebuild"""
+    try:
+        stat = os.stat(os.path.join(settings.COMPATIBILITY_GRAPH_DIR, "meta.json"))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def get_compatibility_graph(force: bool = False) -> Optional[CompatibilityGraph]:
+    """
+    The saved graph (None if none has been built yet)
+
+    Reopened when any process saves a new one, checked at most every
+    COMPATIBILITY_REFRESH_SECONDS unless forced.
+    """
+    global _graph, _graph_stamp, _checked_at
+    now = time.monotonic()
+    if not force and _graph is not None and now - _checked_at < settings.COMPATIBILITY_REFRESH_SECONDS:
+        return _graph
+    _checked_at = now
+
+    stamp = _saved_stamp()
+    if stamp != _graph_stamp:
+        try:
+            _graph = CompatibilityGraph.load() if stamp else None
+            _graph_stamp = stamp
+        except FileNotFoundError:
+            pass  # caught mid-swap by save(); keep the open graph and retry next time
+    return _graph
+
+
+def refresh_compatibility_graph(
+    product_ids: ProductIds,
+    vectors: np.ndarray,
+    categories: Sequence[Optional[str]],
+    changed: Optional[ProductIds] = None
+) -> CompatibilityGraph:
+    """
+    Rebuild (or incrementally update, when `changed` is given) and save the graph
+
+    Typically called after EmbeddingStore.compact() with the store's
+    snapshot_arrays() and the categories of those products.
+    """
+    global _graph, _graph_stamp, _checked_at
+    current = get_compatibility_graph(force=True)  # update the latest saved graph
+    if current is None or changed is None:
+        graph = CompatibilityGraph.build(product_ids, vectors, categories)
+    else:
+        graph = current.update(product_ids, vectors, categories, changed)
+    graph.save()
+    _graph_stamp = _saved_stamp()
+    _graph = CompatibilityGraph.load()
+    _checked_at = time.monotonic()
+    return _graph
@@ -0,0 +1,293 @@
+"""
+Budget-constrained furnishing optimizer - pick products per category under a budget
+"""
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from shared.config import settings
+
+
+def parse_budget_allocation(allocation: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Read per-category amounts from a Project.budget_allocation / concept budget
+
+    Accepts `{"sofa": 1200}` as well as `{"sofa": {"amount": 1200, ...}}`;
+    entries without a usable amount are ignored.
+    """
+    budgets: Dict[str, float] = {}
+    for category, value in (allocation or {}).items():
+        if isinstance(value, dict):
+            value = value.get("amount")
+        try:
+            budgets[category] = float(value)
+        except (TypeError, ValueError):
+            continue
+    return budgets
+
+
+def _pareto_layers(prices: np.ndarray, scores: np.ndarray, layers: int) -> np.ndarray:
+    """
+    Indices of items in the first `layers` price/score Pareto layers
+
+    An item outside them is beaten (cheaper and better) by at least `layers`
+    other items, so it can't appear in any of the top `layers` selections.
+    """
+    order = np.lexsort((-scores, prices))
+    remaining = order
+    kept: List[np.ndarray] = []
+    for _ in range(layers):
+        if not len(remaining):
+            break
+        layer_scores = scores[remaining]
+        best_before = np.maximum.accumulate(np.concatenate([[-np.inf], layer_scores[:-1]]))
+        frontier = layer_scores > best_before
+        kept.append(remaining[frontier])
+        remaining = remaining[~frontier]
+    return np.concatenate(kept) if kept else order[:0]
+
+
+class FurnishingOptimizer:
+    """
+    Chooses one product per furnishing slot to maximize style fit under a budget
+
+    Each slot (e.g. "sofa" x1, "dining chair" x4) is a group in a
+    multiple-choice knapsack. Candidates are scored in one matrix-vector
+    product against the target style vector, filtered by availability and
+    per-category budget, and pruned to the few price/score Pareto layers
+    that can matter. A k-best dynamic program over the budget (discretized
+    into `resolution` steps, prices rounded up so results never exceed
+    the budget) then yields the best selection plus ranked alternatives.
+    """
+
+    def __init__(
+        self,
+        product_ids: Sequence[Any],
+        categories: Sequence[Optional[str]],
+        prices: Sequence[float],
+        vectors: np.ndarray,
+        available: Optional[Sequence[bool]] = None
+    ):
+        prices = np.asarray(prices, dtype=np.float64)
+        categories = np.asarray([category or "" for category in categories])
+        available = np.ones(len(prices), bool) if available is None else np.asarray(available, bool)
+
+        # Keep purchasable items only, grouped by category so that each
+        # category's vectors are one contiguous block (scored without a copy)
+        usable = np.flatnonzero(available & np.isfinite(prices) & (prices > 0) & (categories != ""))
+        order = usable[np.argsort(categories[usable], kind="stable")]
+        categories = categories[order]
+
+        self.product_ids = [str(product_ids[i]) for i in order]
+        self.prices = prices[order]
+        vectors = np.asarray(vectors, dtype=np.float32)[order]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.where(norms > 0, norms, 1.0)
+
+        names, starts = np.unique(categories, return_index=True)
+        ends = np.append(starts[1:], len(categories))
+        self._slices: Dict[str, Tuple[int, int]] = {
+            str(name): (int(start), int(end)) for name, start, end in zip(names, starts, ends)
+        }
+
+    @classmethod
+    def from_products(cls, products: Iterable[Any], store) -> "FurnishingOptimizer":
+        """
+        Build from Product rows and an EmbeddingStore
+
+        Price comes from `pricing_data["price"]`, availability from
+        `availability["in_stock"]` (assumed in stock if missing). Products
+        without a style vector are skipped.
+        """
+        products = list(products)
+        vectors, found = store.get_many([product.product_id for product in products])
+        rows = [(product, vector) for product, vector, ok in zip(products, vectors, found) if ok]
+
+        def price(product) -> float:
+            try:
+                return float((product.pricing_data or {}).get("price"))
+            except (TypeError, ValueError):
+                return float("nan")
+
+        return cls(
+            [product.product_id for product, _ in rows],
+            [product.category for product, _ in rows],
+            [price(product) for product, _ in rows],
+            np.array([vector for _, vector in rows], dtype=np.float32).reshape(len(rows), -1),
+            [(product.availability or {}).get("in_stock", True) is not False for product, _ in rows]
+        )
+
+    @property
+    def categories(self) -> List[str]:
+        return sorted(self._slices)
+
+    def _candidates(
+        self,
+        category: str,
+        quantity: int,
+        style_vector: np.ndarray,
+        cap: float,
+        layers: int,
+        max_candidates: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Scored, budget-filtered, Pareto-pruned (rows, total prices, values) for one slot"""
+        start, end = self._slices.get(category, (0, 0))
+        totals = self.prices[start:end] * quantity
+        values = (self.vectors[start:end] @ style_vector) * quantity
+        rows = np.flatnonzero(totals <= cap)
+        totals, values = totals[rows], values[rows]
+        rows += start
+
+        keep = _pareto_layers(totals, values, layers)
+        if len(keep) > max_candidates:
+            keep = keep[np.argsort(-values[keep], kind="stable")[:max_candidates]]
+        return rows[keep], totals[keep], values[keep]
+
+    def optimize(
+        self,
+        slots: Dict[str, int],
+        style_vector: np.ndarray,
+        budget: float,
+        category_budgets: Optional[Dict[str, float]] = None,
+        optional: Sequence[str] = (),
+        alternatives: Optional[int] = None,
+        resolution: Optional[int] = None,
+        max_candidates: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the best product selections under the budget
+
+        Args:
+            slots: Quantity needed per category, e.g. {"sofa": 1, "chair": 4}
+            style_vector: Target style embedding (e.g. from the chosen concept)
+            budget: Total budget for all slots
+            category_budgets: Optional per-category spending caps
+            optional: Categories that may be left empty
+            alternatives: Number of ranked selections to return
+            resolution: Budget steps used by the dynamic program
+            max_candidates: Products kept per slot after pruning
+
+        Returns:
+            Up to `alternatives` selections, best first, each with its
+            items, total price and style score. Empty if no selection fits.
+        """
+        alternatives = alternatives or settings.OPTIMIZER_ALTERNATIVES
+        resolution = resolution or settings.OPTIMIZER_BUDGET_RESOLUTION
+        max_candidates = max_candidates or settings.OPTIMIZER_MAX_CANDIDATES
+        category_budgets = category_budgets or {}
+        target = np.asarray(style_vector, dtype=np.float32)
+        target = target / (np.linalg.norm(target) or 1.0)
+        unit = budget / resolution
+
+        groups = []
+        for category, quantity in slots.items():
+            cap = min(budget, category_budgets.get(category, budget))
+            rows, totals, values = self._candidates(category, quantity, target, cap, alternatives, max_candidates)
+            costs = np.ceil(totals / unit - 1e-9).astype(np.int64)
+            if category in optional:  # "buy nothing" option
+                rows = np.append(rows, -1)
+                totals, values, costs = np.append(totals, 0.0), np.append(values, 0.0), np.append(costs, 0)
+            if not len(rows):
+                return []
+            groups.append((category, quantity, rows, totals, values, costs))
+
+        solutions = self._solve([(g[4], g[5]) for g in groups], resolution, alternatives)
+
+        results = []
+        for score, choice in solutions:
+            items = []
+            for (category, quantity, rows, totals, values, _), pick in zip(groups, choice):
+                if rows[pick] < 0:
+                    continue
+                items.append({
+                    "category": category,
+                    "product_id": self.product_ids[rows[pick]],
+                    "quantity": quantity,
+                    "unit_price": round(float(self.prices[rows[pick]]), 2),
+                    "total_price": round(float(totals[pick]), 2),
+                    "style_score": round(float(values[pick]) / quantity, 4)
+                })
+            results.append({
+                "items": items,
+                "total_price": round(sum(item["total_price"] for item in items), 2),
+                "style_score": round(float(score), 4)
+            })
+        return results
+
+    @staticmethod
+    def _solve(
+        groups: List[Tuple[np.ndarray, np.ndarray]],
+        capacity: int,
+        best_k: int
+    ) -> List[Tuple[float, List[int]]]:
+        """
+        k-best multiple-choice knapsack by dynamic programming
+
+        dp[c, r] is the r-th best value using exactly c budget steps over
+        the groups so far; each group extends every state by each of its
+        items at once and keeps the best k per cost.
+
+        Args:
+            groups: (values, integer costs) per group
+            capacity: Budget in steps
+            best_k: Number of solutions to keep
+
+        Returns:
+            (value, chosen item index per group) pairs, best first
+        """
+        # One extra all -inf row that out-of-range predecessors point at
+        dp = np.full((capacity + 2, best_k), -np.inf, dtype=np.float32)
+        dp[0, 0] = 0.0
+        choices = []
+        low = high = 0  # range of reachable total costs so far
+
+        for values, costs in groups:
+            # Only costs reachable after this group need computing
+            low, high = low + int(costs.min()), min(high + int(costs.max()), capacity)
+            if low > capacity:
+                return []
+
+            previous = np.arange(low, high + 1)[:, None] - costs[None, :]      # (C, K)
+            previous[previous < 0] = capacity + 1
+            values = values.astype(np.float32)
+
+            # Ranks per state are sorted, so an item's r-th extension can only
+            # make the top k if its best one does: shortlist k items first
+            items = np.broadcast_to(np.arange(len(costs)), previous.shape)
+            if len(costs) > best_k:
+                heads = dp[previous, 0] + values[None, :]
+                items = np.argpartition(heads, len(costs) - best_k, axis=1)[:, len(costs) - best_k:]
+            shortlist = np.take_along_axis(previous, items, axis=1)
+            candidates = (dp[shortlist] + values[items][:, :, None]).reshape(len(previous), -1)
+
+            width = candidates.shape[1]
+            if width > best_k:
+                top = np.argpartition(candidates, width - best_k, axis=1)[:, width - best_k:]
+            else:
+                top = np.broadcast_to(np.arange(width), candidates.shape)
+            top_values = np.take_along_axis(candidates, top, axis=1)
+            order = np.argsort(-top_values, axis=1, kind="stable")
+
+            dp = np.full((capacity + 2, best_k), -np.inf, dtype=np.float32)
+            dp[low:high + 1, :top.shape[1]] = np.take_along_axis(top_values, order, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            picks = np.zeros((capacity + 1, best_k), dtype=np.int64)
+            picks[low:high + 1, :top.shape[1]] = np.take_along_axis(items, top // best_k, axis=1)
+            ranks = np.zeros((capacity + 1, best_k), dtype=np.int64)
+            ranks[low:high + 1, :top.shape[1]] = top % best_k
+            choices.append((picks, ranks, costs))   # item, previous rank
+
+        # Best states over every total cost within the budget
+        flat = dp[:capacity + 1].ravel()
+        finite = np.flatnonzero(np.isfinite(flat))
+        best = finite[np.argsort(-flat[finite], kind="stable")[:best_k]]
+
+        solutions = []
+        for state in best:
+            cost, rank = divmod(int(state), best_k)
+            picks = []
+            for items, ranks, costs in reversed(choices):
+                item = int(items[cost, rank])
+                picks.append(item)
+                cost, rank = cost - int(costs[item]), int(ranks[cost, rank])
+            solutions.append((float(flat[state]), picks[::-1]))
+        return solutions
@@ -0,0 +1,376 @@
+"""
+2D furniture layout engine for rooms described in Project.space_data
+"""
+import math
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from shared.config import settings
+from .spatial_index import CLEARANCE, SOLID, OccupancyGrid
+
+
+# width, depth, front/side/back clearance (m), placed against a wall
+DEFAULT_DIMENSIONS: Dict[str, Tuple[float, float, float, float, float, bool]] = {
+    "sofa": (2.2, 0.95, 0.45, 0.0, 0.0, True),  # leg room up to a coffee table
+    "armchair": (0.85, 0.85, 0.45, 0.0, 0.0, False),
+    "coffee table": (1.2, 0.6, 0.0, 0.0, 0.0, False),
+    "side table": (0.5, 0.5, 0.0, 0.0, 0.0, False),
+    "tv unit": (1.8, 0.45, 1.0, 0.0, 0.0, True),
+    "bookcase": (0.9, 0.35, 0.8, 0.0, 0.0, True),
+    "bed": (1.6, 2.1, 0.7, 0.0, 0.0, True),  # sides left free for nightstands
+    "nightstand": (0.5, 0.4, 0.0, 0.0, 0.0, True),
+    "wardrobe": (1.2, 0.6, 0.9, 0.0, 0.0, True),
+    "dresser": (1.2, 0.5, 0.8, 0.0, 0.0, True),
+    "desk": (1.4, 0.7, 0.9, 0.0, 0.0, True),
+    "dining table": (1.8, 0.9, 0.75, 0.75, 0.75, False),
+    "rug": (2.4, 1.7, 0.0, 0.0, 0.0, False),
+}
+
+WALLS = ("south", "north", "west", "east")
+
+# Rotation -> unit vector the item's front faces (rotation 0 has its back on the south wall)
+FRONT = {0: (0, 1), 90: (-1, 0), 180: (0, -1), 270: (1, 0)}
+
+
+def _number(data: Dict[str, Any], field: str, default: float, owner: str) -> float:
+    """Read a numeric field, naming the field and its owner when it isn't a finite number"""
+    value = data.get(field, default)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{owner}: {field} must be a number, got {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"{owner}: {field} must be finite, got {value!r}")
+    return number
+
+
+def parse_room(room: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normalize a space_data room
+
+    Rooms look like `{"name", "width_m", "length_m", "features": [...]}`.
+    Features are either on a wall (`{"type": "door", "wall": "south",
+    "offset_m": 0.5, "width_m": 0.9}`) or free-standing (`{"type":
+    "column", "x_m", "y_m", "width_m", "depth_m"}`). Doors keep a swing
+    area clear; wall features with a `depth_m` (radiators, fireplaces)
+    are solid and may request `clearance_m` in front of them.
+
+    Raises:
+        ValueError: If the room has no usable dimensions, exceeds the size
+            or feature limits, or a feature field isn't numeric
+    """
+    try:
+        width, length = float(room["width_m"]), float(room["length_m"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Room needs numeric width_m and length_m")
+    if not (math.isfinite(width) and math.isfinite(length)):
+        raise ValueError("Room dimensions must be finite")
+    if width <= 0 or length <= 0:
+        raise ValueError("Room dimensions must be positive")
+    # The occupancy grid and candidate arrays grow with the floor area
+    if max(width, length) > settings.LAYOUT_MAX_ROOM_M:
+        raise ValueError(f"Room sides can be at most {settings.LAYOUT_MAX_ROOM_M:g} m")
+
+    features = room.get("features") or []
+    if len(features) > settings.LAYOUT_MAX_FEATURES:
+        raise ValueError(f"A room can have at most {settings.LAYOUT_MAX_FEATURES} features")
+
+    solid: List[Tuple[float, float, float, float]] = []
+    clearance: List[Tuple[float, float, float, float]] = []
+    for index, feature in enumerate(features):
+        if not isinstance(feature, dict):
+            raise ValueError(f"Feature {index} must be an object")
+        kind = feature.get("type", "")
+        owner = f"Feature {index} ({kind or 'untyped'})"
+        span = _number(feature, "width_m", 0.0, owner)
+        depth = _number(feature, "depth_m", 0.0, owner)
+        wall = feature.get("wall")
+
+        if wall in WALLS:
+            offset = _number(feature, "offset_m", 0.0, owner)
+            keep_clear = span if kind == "door" else _number(feature, "clearance_m", 0.0, owner)
+            if depth > 0:
+                solid.append(_wall_rect(wall, offset, span, 0.0, depth, width, length))
+            if keep_clear > 0:
+                clearance.append(_wall_rect(wall, offset, span, depth, depth + keep_clear, width, length))
+        elif "x_m" in feature and "y_m" in feature:
+            x, y = _number(feature, "x_m", 0.0, owner), _number(feature, "y_m", 0.0, owner)
+            solid.append((x, y, x + span, y + depth))
+
+    return {
+        "name": room.get("name"),
+        "width": width,
+        "length": length,
+        "solid": solid,
+        "clearance": clearance,
+    }
+
+
+def _wall_rect(
+    wall: str, offset: float, span: float, near: float, far: float, width: float, length: float
+) -> Tuple[float, float, float, float]:
+    """Rectangle along a wall, from `near` to `far` meters into the room"""
+    if wall == "south":
+        return (offset, near, offset + span, far)
+    if wall == "north":
+        return (offset, length - far, offset + span, length - near)
+    if wall == "west":
+        return (near, offset, far, offset + span)
+    return (width - far, offset, width - near, offset + span)
+
+
+def parse_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normalize a furniture item, filling gaps from DEFAULT_DIMENSIONS by category
+
+    Raises:
+        ValueError: If the item's size is unknown or a size field isn't numeric
+    """
+    category = str(item.get("category") or "").lower()
+    defaults = DEFAULT_DIMENSIONS.get(category)
+    if defaults is None and not ("width_m" in item and "depth_m" in item):
+        raise ValueError(f"Unknown size for item {item.get('name') or category!r}")
+    width, depth, front, side, back, against_wall = defaults or (0.0, 0.0, 0.6, 0.0, 0.0, False)
+    owner = f"Item {item.get('name') or category!r}"
+
+    return {
+        "name": item.get("name") or category,
+        "category": category,
+        "width": _number(item, "width_m", width, owner),
+        "depth": _number(item, "depth_m", depth, owner),
+        "front": _number(item, "clearance_m", front, owner),
+        "side": _number(item, "side_clearance_m", side, owner),
+        "back": _number(item, "back_clearance_m", back, owner),
+        "against_wall": bool(item.get("against_wall", against_wall)),
+        "near": str(item.get("near") or "").lower() or None,
+    }
+
+
+def _candidates(item: Dict[str, Any], grid: OccupancyGrid, step: float) -> Dict[str, np.ndarray]:
+    """
+    Every position and rotation for an item, as arrays
+
+    Positions whose clearance would leave the room are dropped up front,
+    and grid offsets are precomputed so each placement round only does
+    table lookups.
+
+    Returns:
+        Dict with rotation (M,), body (M, 4) and clearance (M, S, 4)
+        rectangles for the S strips the item needs (of front, back, left,
+        right), plus the grid corners of bodies and strips
+    """
+    width, length = grid.width, grid.length
+    rotations, bodies, clearances = [], [], []
+    w, d, front, side, back = item["width"], item["depth"], item["front"], item["side"], item["back"]
+    active = [front > 0, back > 0, side > 0, side > 0]
+
+    for rotation, (fx, fy) in FRONT.items():
+        sx, sy = (w, d) if fx == 0 else (d, w)
+        if sx > width or sy > length:
+            continue
+        xs = np.unique(np.append(np.arange(0.0, width - sx, step), width - sx))
+        ys = np.unique(np.append(np.arange(0.0, length - sy, step), length - sy))
+        if item["against_wall"]:
+            # Back flush with the wall behind the item
+            if fy:
+                ys = np.array([0.0 if fy > 0 else length - sy])
+            else:
+                xs = np.array([0.0 if fx > 0 else width - sx])
+
+        x0, y0 = (axis.ravel() for axis in np.meshgrid(xs, ys))
+        x1, y1 = x0 + sx, y0 + sy
+        body = np.stack([x0, y0, x1, y1], axis=1)
+
+        # Clearance strips relative to the item's own front/back/left/right
+        if fy:
+            ahead = (y1, y1 + front) if fy > 0 else (y0 - front, y0)
+            behind = (y0 - back, y0) if fy > 0 else (y1, y1 + back)
+            strips = [
+                (x0, ahead[0], x1, ahead[1]),
+                (x0, behind[0], x1, behind[1]),
+                (x0 - side, y0, x0, y1),
+                (x1, y0, x1 + side, y1),
+            ]
+        else:
+            ahead = (x1, x1 + front) if fx > 0 else (x0 - front, x0)
+            behind = (x0 - back, x0) if fx > 0 else (x1, x1 + back)
+            strips = [
+                (ahead[0], y0, ahead[1], y1),
+                (behind[0], y0, behind[1], y1),
+                (x0, y0 - side, x1, y0),
+                (x0, y1, x1, y1 + side),
+            ]
+        strips = [np.stack(strip, axis=1) for strip, needed in zip(strips, active) if needed]
+        clearance = np.stack(strips, axis=1) if strips else np.empty((len(body), 0, 4))
+
+        rotations.append(np.full(len(body), rotation))
+        bodies.append(body)
+        clearances.append(clearance)
+
+    if not bodies:
+        rotations, bodies, clearances = [np.empty(0, int)], [np.empty((0, 4))], [np.empty((0, sum(active), 4))]
+    rotation = np.concatenate(rotations)
+    body = np.concatenate(bodies)
+    clearance = np.concatenate(clearances)
+
+    inside = (clearance[:, :, 0] >= -1e-9) & (clearance[:, :, 1] >= -1e-9) \
+        & (clearance[:, :, 2] <= width + 1e-9) & (clearance[:, :, 3] <= length + 1e-9)
+    keep = inside.all(axis=1)
+    rotation, body, clearance = rotation[keep], body[keep], clearance[keep]
+
+    return {
+        "rotation": rotation,
+        "body": body,
+        "clearance": clearance,
+        "body_corners": grid.corners(body),
+        "strip_corners": grid.corners(clearance.reshape(-1, 4)),
+    }
+
+
+def _valid(grid: OccupancyGrid, candidates: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Vectorized collision and clearance test for all candidates
+
+    Bodies may not touch anything; clearance strips may not touch solid
+    obstacles but may overlap other clearance (walkways are shared).
+    """
+    corners = candidates["body_corners"]
+    valid = (grid.count_at(corners, SOLID) == 0) & (grid.count_at(corners, CLEARANCE) == 0)
+    strips = candidates["clearance"].shape[1]
+    if strips:
+        valid &= (grid.count_at(candidates["strip_corners"], SOLID) == 0).reshape(-1, strips).all(axis=1)
+    return valid
+
+
+def _subset(candidates: Dict[str, np.ndarray], rows: np.ndarray) -> Dict[str, np.ndarray]:
+    subset = {key: value[rows] for key, value in candidates.items() if not key.endswith("corners")}
+    subset["body_corners"] = candidates["body_corners"][:, rows]
+    strips = candidates["clearance"].shape[1]
+    strip_rows = (rows[:, None] * strips + np.arange(strips)).ravel()
+    subset["strip_corners"] = candidates["strip_corners"][:, strip_rows]
+    return subset
+
+
+def _preference(
+    item: Dict[str, Any],
+    body: np.ndarray,
+    rotation: np.ndarray,
+    placed: Dict[str, np.ndarray],
+    width: float,
+    length: float
+) -> np.ndarray:
+    """Higher is better: close to the `near` item, otherwise centered"""
+    centers = np.stack([(body[:, 0] + body[:, 2]) / 2, (body[:, 1] + body[:, 3]) / 2], axis=1)
+
+    target = placed.get(item["near"]) if item["near"] else None
+    if target is not None:
+        return -np.linalg.norm(centers - target, axis=1)
+    if item["against_wall"]:
+        # Centered along its wall
+        along = np.where(rotation % 180 == 0, centers[:, 0] - width / 2, centers[:, 1] - length / 2)
+        return -0.1 * np.abs(along)
+    return -0.2 * np.linalg.norm(centers - (width / 2, length / 2), axis=1)
+
+
+def generate_layouts(
+    room: Dict[str, Any],
+    items: List[Dict[str, Any]],
+    count: Optional[int] = None,
+    seed: int = 0,
+    step: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    Generate distinct valid furniture layouts for a room
+
+    Items are placed greedily, largest first (items with a `near` target
+    after their target). Each placement tests every position and rotation
+    at once against the occupancy grid. The first attempt always takes the
+    best-scoring spot; later attempts add Gumbel noise to the scores to
+    explore, and duplicates are dropped.
+
+    Args:
+        room: A space_data room (see parse_room)
+        items: Furniture to place (see parse_item)
+        count: Number of layouts wanted
+        seed: Random seed for exploration
+        step: Position step in meters
+
+    Returns:
+        Up to `count` layouts, best first. Each has its placements, score
+        and the share of floor left free. Empty if nothing fits.
+
+    Raises:
+        ValueError: If the room or an item can't be parsed, or there are
+            more than LAYOUT_MAX_ITEMS items
+    """
+    count = count or settings.LAYOUT_COUNT
+    step = step or settings.LAYOUT_STEP_M
+    if len(items) > settings.LAYOUT_MAX_ITEMS:
+        raise ValueError(f"At most {settings.LAYOUT_MAX_ITEMS} items can be laid out at once")
+    room = parse_room(room)
+    items = [parse_item(item) for item in items]
+    width, length = room["width"], room["length"]
+
+    base = OccupancyGrid(width, length, settings.LAYOUT_GRID_CELL_M)
+    if room["solid"]:
+        base.add(np.array(room["solid"]), SOLID)
+    if room["clearance"]:
+        base.add(np.array(room["clearance"]), CLEARANCE)
+
+    names = {item["category"] for item in items}
+    items.sort(key=lambda item: (item["near"] in names, -item["width"] * item["depth"]))
+    # Occupancy only grows, so anything blocked by the room itself stays blocked
+    candidates = []
+    for item in items:
+        options = _candidates(item, base, step)
+        candidates.append(_subset(options, np.flatnonzero(_valid(base, options))))
+
+    rng = np.random.default_rng(seed)
+    layouts: List[Dict[str, Any]] = []
+    seen = set()
+    for attempt in range(count * settings.LAYOUT_ATTEMPTS_PER_LAYOUT):
+        grid = base.copy()
+        placed: Dict[str, np.ndarray] = {}
+        placements = []
+        score = 0.0
+
+        for item, options in zip(items, candidates):
+            valid = np.flatnonzero(_valid(grid, options))
+            if not len(valid):
+                break
+            scores = _preference(item, options["body"][valid], options["rotation"][valid], placed, width, length)
+            noisy = scores if attempt == 0 else scores + rng.gumbel(size=len(scores)) * settings.LAYOUT_TEMPERATURE
+            best = int(np.argmax(noisy))
+            choice = valid[best]
+            score += float(scores[best])
+
+            body = options["body"][choice]
+            strips = options["clearance"][choice]
+            grid.add(body[None], SOLID)
+            if len(strips):
+                grid.add(strips, CLEARANCE)
+            placed.setdefault(item["category"], np.array([(body[0] + body[2]) / 2, (body[1] + body[3]) / 2]))
+            placements.append({
+                "name": item["name"],
+                "category": item["category"],
+                "x_m": round(float(body[0]), 3),
+                "y_m": round(float(body[1]), 3),
+                "size_x_m": round(float(body[2] - body[0]), 3),
+                "size_y_m": round(float(body[3] - body[1]), 3),
+                "rotation": int(options["rotation"][choice]),
+                "clearance": [[round(float(v), 3) for v in strip] for strip in strips],
+            })
+        else:
+            signature = tuple((p["x_m"], p["y_m"], p["rotation"]) for p in placements)
+            if signature not in seen:
+                seen.add(signature)
+                layouts.append({
+                    "room": room["name"],
+                    "placements": placements,
+                    "score": round(score, 4),
+                    "free_floor_ratio": round(1.0 - grid.occupied_ratio(SOLID), 4),
+                })
+                if len(layouts) >= count:
+                    break
+
+    layouts.sort(key=lambda layout: -layout["score"])
+    return layouts
@@ -1,21 +1,193 @@
 """
 Design Generation Service - AI design creation and style analysis
 """
-from fastapi import FastAPI, HTTPException
+import time
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+import anyio
+import asyncio
+import json
+import logging
 import sys
 sys.path.append('..')
 
 from ai_agents.design_director_agent import DesignDirectorAgent
+from ai_agents.space_planner_agent import SpacePlannerAgent
+from ai_agents.budget_analyst_agent import BudgetAnalystAgent
+from ai_agents.orchestrator import AgentOrchestrator
+from design_generation_service.furniture_matching.compatibility import get_compatibility_graph
+from design_generation_service.layout_optimization.layout_engine import generate_layouts
+from design_generation_service.style_analysis.room_analyzer import (
+    UndecodableImageError,
+    merge_into_space_data,
+    room_analyzer
+)
+from shared.auth import verify_tenant_signature
+from shared.cache import cache
+from shared.config import settings
+from shared.log import RequestIdMiddleware, configure_logging
+from shared.metrics import STARTUP_SECONDS, PrometheusMiddleware, metrics_response
+from shared.profiling import ProfilerMiddleware
+from shared.quotas import apply_quota, quotas
+from shared.scheduler import QueueFull, TierScheduler
+from shared.storage import SHA256_PATTERN, object_path
+
+configure_logging("design-generation")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Record startup time; stop inference workers on shutdown"""
+    # The room model and torch load on the first /analyze-room request, not here
+    import_seconds = time.perf_counter() - _import_started
+    STARTUP_SECONDS.labels(phase="import").set(import_seconds)
+    logger.info("Design generation service ready: imports %.2fs", import_seconds)
+
+    yield
+
+    await room_analyzer.close()
+    await cache.disconnect()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Design Generation Service",
     version="0.1.0"
 )
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(PrometheusMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
 # Initialize AI agents
 design_director = DesignDirectorAgent()
+space_planner = SpacePlannerAgent()
+budget_analyst = BudgetAnalystAgent()
+
+# Independent specialists run concurrently; the director stays the single-agent path
+design_team = AgentOrchestrator([design_director, space_planner, budget_analyst])
+
+# Tenant and tier of calls that don't come through the gateway (internal tools, load tests)
+ANONYMOUS_TENANT = "anonymous"
+INTERNAL_TIER = "internal"
+
+# Generation jobs are admitted fairly across tenants, weighted by subscription tier;
+# internal callers may use every slot
+generation_scheduler = TierScheduler(
+    "design-generation",
+    settings.DESIGN_GENERATION_CONCURRENCY,
+    tenant_limits={**settings.SCHEDULER_TENANT_CONCURRENCY, INTERNAL_TIER: settings.DESIGN_GENERATION_CONCURRENCY}
+)
+
+
+def get_tenant(
+    x_tenant_id: Optional[str] = Header(default=None),
+    x_subscription_tier: Optional[str] = Header(default=None),
+    x_tenant_signature: Optional[str] = Header(default=None)
+) -> Dict[str, str]:
+    """
+    Tenant and tier of the caller, as forwarded and signed by the API gateway
+
+    Calls without tenant headers get 401 unless ALLOW_INTERNAL_CALLERS is
+    set; then they are internal tools that share the anonymous tenant,
+    aren't metered and aren't capped per tenant. Tenant headers without a valid gateway signature are rejected,
+    so a direct caller can't claim another tenant or tier.
+    """
+    if x_tenant_id is None and x_subscription_tier is None:
+        if not settings.ALLOW_INTERNAL_CALLERS:
+            raise HTTPException(status_code=401, detail="Tenant headers are required")
+        return {"tenant_id": ANONYMOUS_TENANT, "tier": INTERNAL_TIER}
+
+    tier = x_subscription_tier or "starter"
+    if not (x_tenant_id and x_tenant_signature and verify_tenant_signature(x_tenant_id, tier, x_tenant_signature)):
+        raise HTTPException(status_code=401, detail="Tenant headers must be signed by the API gateway")
+    return {"tenant_id": x_tenant_id, "tier": tier}
+
+
+async def charge_generation(
+    request: Request,
+    response: Response,
+    tenant: Dict[str, str] = Depends(get_tenant)
+) -> Dict[str, str]:
+    """
+    Tenant of a generation request, after charging it to their monthly allowance (429 when used up)
+
+    The charge is taken before the request waits for a slot, so concurrent
+    requests can't overshoot the allowance; refund_generation() gives it
+    back if the generation then fails.
+    """
+    if settings.QUOTAS_ENABLED and tenant["tenant_id"] != ANONYMOUS_TENANT:
+        decision = await quotas.design_generation(tenant["tenant_id"], tenant["tier"])
+        apply_quota(request, response, decision, "Monthly design generation quota used up for your plan")
+        request.state.generation_charge = decision
+    return tenant
+
+
+async def refund_generation(request: Request):
+    """Give back the generation charged for this request, if any"""
+    decision = getattr(request.state, "generation_charge", None)
+    if decision is not None:
+        await quotas.refund(decision)
+
+
+async def admit(tenant: Dict[str, str], cost: float = 1.0):
+    """Wait for a generation slot; 429 if the tenant's queue is full"""
+    try:
+        return await generation_scheduler.acquire(tenant["tenant_id"], tenant["tier"], cost)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+
+
+@asynccontextmanager
+async def scheduled(tenant: Dict[str, str], cost: float = 1.0):
+    """Hold a generation slot for the duration of the block"""
+    job = await admit(tenant, cost)
+    try:
+        yield
+    finally:
+        generation_scheduler.release(job)
+
+
+@asynccontextmanager
+async def generation(request: Request, tenant: Dict[str, str], cost: float = 1.0):
+    """
+    Hold a generation slot for the block, refunding the request's charge if it fails
+
+    A request turned away by the scheduler (429), that errors or times out,
+    or whose client disconnects doesn't count against the allowance.
+    """
+    try:
+        async with scheduled(tenant, cost):
+            yield
+    except (Exception, asyncio.CancelledError):
+        await refund_generation(request)
+        raise
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that runs `on_close` once it has been sent
+
+    Unlike a BackgroundTask, `on_close` also runs when sending fails or the
+    request is cancelled, and it is shielded so a disconnect can't
+    interrupt it halfway.
+    """
+
+    def __init__(self, content: Any, on_close: Callable[[], Awaitable[None]], **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.on_close()
 
 
 class DesignRequest(BaseModel):
@@ -32,6 +204,35 @@ class DesignResponse(BaseModel):
     design_concepts: List[Dict[str, Any]]
     confidence_score: float
     status: str
+    prompt_usage: Optional[Dict[str, Any]] = None
+
+
+class TeamDesignResponse(BaseModel):
+    """Multi-agent design generation response"""
+    results: Dict[str, Dict[str, Any]]
+    errors: Dict[str, str]
+    timed_out: List[str]
+    status: str
+    elapsed_ms: float
+
+
+class RoomAnalysisRequest(BaseModel):
+    """Room photo analysis request"""
+    file_ids: List[str]
+    space_data: Dict[str, Any] = {}
+
+
+class RoomAnalysisResponse(BaseModel):
+    """Room photo analysis response"""
+    space_data: Dict[str, Any]
+
+
+class LayoutRequest(BaseModel):
+    """Furniture layout request"""
+    room: Dict[str, Any]
+    items: List[Dict[str, Any]]
+    count: int = 3
+    seed: int = 0
 
 
 @app.get("/")
@@ -44,10 +245,19 @@ async def root():
 
 
 @app.post("/generate-design", response_model=DesignResponse)
-async def generate_design(request: DesignRequest):
+async def generate_design(
+    request: DesignRequest,
+    http_request: Request,
+    tenant: Dict[str, str] = Depends(charge_generation)
+):
     """
     Generate design concepts using AI
     """
+    async with generation(http_request, tenant):
+        return await _generate_design(request)
+
+
+async def _generate_design(request: DesignRequest) -> DesignResponse:
     try:
         input_data = {
             "client_brief": request.client_brief,
@@ -60,17 +270,188 @@ async def generate_design(request: DesignRequest):
         return DesignResponse(**result)
 
     except Exception as e:
+        logger.exception("Design generation failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/generate-design/stream")
+async def generate_design_stream(
+    request: DesignRequest,
+    http_request: Request,
+    tenant: Dict[str, str] = Depends(charge_generation)
+):
+    """
+    Stream design concepts as newline-delimited JSON
+
+    Each line is one complete concept, sent as soon as the model finishes it.
+    The generation slot is held until the stream ends; a stream that doesn't
+    finish isn't charged.
+    """
+    input_data = {
+        "client_brief": request.client_brief,
+        "space_data": request.space_data,
+        "budget": request.budget,
+        "style_preferences": request.style_preferences
+    }
+
+    try:
+        job = await admit(tenant)
+    except HTTPException:
+        await refund_generation(http_request)
+        raise
+
+    completed = False
+
+    async def concept_lines():
+        nonlocal completed
+        async for concept in design_director.stream_concepts(input_data):
+            yield json.dumps(concept) + "\n"
+        completed = True
+
+    lines = concept_lines()
+
+    async def finish():
+        # Runs once the response is done, including when the client left
+        # before the stream started and the generator never ran
+        generation_scheduler.release(job)
+        try:
+            await lines.aclose()
+        finally:
+            if not completed:  # failed, the client went away, or never started
+                await refund_generation(http_request)
+
+    return ClosingStreamingResponse(
+        lines,
+        on_close=finish,
+        media_type="application/x-ndjson",
+        headers=getattr(http_request.state, "quota_headers", None)
+    )
+
+
+@app.post("/generate-design/team", response_model=TeamDesignResponse)
+async def generate_design_team(
+    request: DesignRequest,
+    http_request: Request,
+    tenant: Dict[str, str] = Depends(charge_generation)
+):
+    """
+    Generate design concepts, layout and budget allocation with the full agent team
+
+    Agents run concurrently; agents that miss the deadline are cancelled and
+    reported in `timed_out` while the rest of the results are still returned.
+    """
+    input_data = {
+        "client_brief": request.client_brief,
+        "space_data": request.space_data,
+        "budget": request.budget,
+        "style_preferences": request.style_preferences
+    }
+
+    # One slot-unit per agent in the team
+    async with generation(http_request, tenant, cost=len(design_team.agents)):
+        result = await design_team.run(input_data)
+        if result["status"] == "failed":
+            raise HTTPException(
+                status_code=504 if result["timed_out"] and not result["errors"] else 500,
+                detail=result
+            )
+
+    return TeamDesignResponse(**result)
+
+
+@app.post("/analyze-room", response_model=RoomAnalysisResponse)
+async def analyze_room(request: RoomAnalysisRequest, tenant: Dict[str, str] = Depends(get_tenant)):
+    """
+    Analyze uploaded room photos and merge the results into space data
+
+    Photos are referenced by upload file id. The returned `space_data` is
+    the request's space data with `photo_analysis` (and `room_type`, if it
+    was missing) filled in, ready to store on the project.
+    """
+    for file_id in request.file_ids:
+        if not SHA256_PATTERN.match(file_id):
+            raise HTTPException(status_code=400, detail=f"Invalid file id: {file_id}")
+
+    try:
+        async with scheduled(tenant, cost=max(len(request.file_ids), 1) / settings.INFERENCE_MAX_BATCH_SIZE):
+            results = await asyncio.gather(*[
+                room_analyzer.analyze(object_path(file_id)) for file_id in request.file_ids
+            ])
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    except UndecodableImageError:
+        raise HTTPException(status_code=415, detail="Room photos must be decodable images (JPEG, PNG or WebP)")
+
+    analyses = dict(zip(request.file_ids, results))
+    return RoomAnalysisResponse(space_data=merge_into_space_data(request.space_data, analyses))
+
+
+@app.post("/generate-layouts")
+async def generate_room_layouts(request: LayoutRequest, tenant: Dict[str, str] = Depends(get_tenant)):
+    """
+    Generate furniture layouts for one room of a project's space data
+
+    The room uses the space_data room shape (`width_m`, `length_m`,
+    optional `features`); items give a category and optionally their
+    size, clearances and a `near` category to stay close to. Rooms,
+    features and item counts are capped (LAYOUT_MAX_*), and layouts are
+    queued with other generation jobs.
+    """
+    try:
+        async with scheduled(tenant):
+            layouts = await asyncio.to_thread(
+                generate_layouts, request.room, request.items, min(max(request.count, 1), 10), request.seed
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"room": request.room.get("name"), "layouts": layouts}
+
+
+@app.get("/products/{product_id}/compatible")
+async def get_compatible_products(product_id: str, category: Optional[str] = None, limit: int = 20):
+    """
+    Get products that go with a product, from the precomputed compatibility graph
+
+    Use `category` to ask e.g. which chairs go with a given sofa.
+    """
+    graph = get_compatibility_graph()
+    if graph is None:
+        raise HTTPException(status_code=503, detail="Compatibility graph has not been built")
+
+    try:
+        matches = graph.neighbours(product_id, category=category, limit=min(max(limit, 1), 100))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid product id")
+    if matches is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    return {"product_id": product_id, "matches": matches}
+
+
+@app.get("/scheduler")
+async def get_scheduler_stats():
+    """Generation queue depth and per-tier queue-time SLO metrics"""
+    return generation_scheduler.snapshot()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for all workers"""
+    return metrics_response()
+
+
 @app.get("/agent-info")
 async def get_agent_info():
     """Get information about available AI agents"""
     return {
-        "design_director": design_director.get_agent_info()
+        "design_director": design_director.get_agent_info(),
+        "space_planner": space_planner.get_agent_info(),
+        "budget_analyst": budget_analyst.get_agent_info()
     }
 
 
 if __name__ == "__main__":
+    # Development server; for production run `python serve.py design` from backend/
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001, reload=True)
+    uvicorn.run("design_generation_service.main:app", host="0.0.0.0", port=8001, reload=settings.DEBUG)
@@ -0,0 +1,108 @@
+"""
+Dynamic request batching for CPU model inference
+"""
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class DynamicBatcher:
+    """
+    Collects concurrent requests into batches for a batch-oriented function
+
+    The first request of a batch waits at most `max_wait_ms` for others to
+    join, and a batch never exceeds `max_batch_size`. While one batch runs
+    on the executor, new requests queue up and form the next batch, so under
+    load batches fill without any added wait.
+
+    Args:
+        process_batch: Function mapping a list of inputs to a list of outputs
+            of the same length; runs on `executor`
+        max_batch_size: Largest batch passed to process_batch
+        max_wait_ms: Longest time the first request waits for company
+        executor: Executor for process_batch (a single dedicated thread keeps
+            model state and thread settings in one place)
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        executor: Optional[Executor] = None
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches_run = 0
+        self.items_run = 0
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one input and wait for its output"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already waiting before considering a timed wait
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [entry for entry in await self._collect() if not entry[1].cancelled()]
+            if not batch:
+                continue
+
+            inputs = [item for item, _ in batch]
+            try:
+                outputs = await loop.run_in_executor(self.executor, self.process_batch, inputs)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.items_run += len(batch)
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+
+    async def close(self):
+        """Stop the batching worker; queued requests are cancelled"""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items_run / self.batches_run if self.batches_run else 0.0
@@ -0,0 +1,238 @@
+"""
+Room photo analysis with dynamically batched CPU inference
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from shared.config import settings
+from .batching import DynamicBatcher
+
+
+INPUT_SIZE = 224
+_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+# ImageNet classes that correspond to furniture, fixtures and decor
+OBJECT_LABELS = {
+    "studio couch": "sofa",
+    "rocking chair": "chair",
+    "folding chair": "chair",
+    "dining table": "dining table",
+    "desk": "desk",
+    "bookcase": "bookcase",
+    "china cabinet": "cabinet",
+    "wardrobe": "wardrobe",
+    "chiffonier": "dresser",
+    "four-poster": "bed",
+    "quilt": "bedding",
+    "pillow": "pillow",
+    "table lamp": "lamp",
+    "lampshade": "lamp",
+    "window shade": "window",
+    "sliding door": "door",
+    "entertainment center": "tv unit",
+    "television": "television",
+    "home theater": "tv unit",
+    "fire screen": "fireplace",
+    "prayer rug": "rug",
+    "vase": "vase",
+    "pot": "plant",
+    "refrigerator": "refrigerator",
+    "stove": "stove",
+    "dishwasher": "dishwasher",
+    "microwave": "microwave",
+    "tub": "bathtub",
+    "bathtub": "bathtub",
+    "shower curtain": "shower",
+    "washbasin": "sink",
+    "toilet seat": "toilet",
+    "file": "file cabinet",
+}
+
+# Objects that indicate a room type
+ROOM_TYPE_OBJECTS = {
+    "living room": {"sofa", "tv unit", "television", "fireplace"},
+    "bedroom": {"bed", "bedding", "wardrobe", "dresser"},
+    "dining room": {"dining table"},
+    "kitchen": {"refrigerator", "stove", "dishwasher", "microwave"},
+    "bathroom": {"bathtub", "shower", "sink", "toilet"},
+    "office": {"desk", "file cabinet", "bookcase"},
+}
+
+MIN_OBJECT_SCORE = 0.02
+MIN_ROOM_TYPE_SCORE = 0.05
+
+
+class UndecodableImageError(Exception):
+    """The file isn't a photo Pillow can decode (e.g. a PDF or SVG floor plan)"""
+
+
+def preprocess(path: str) -> Tuple[np.ndarray, Dict[str, float]]:
+    """
+    Decode a photo into a normalized (3, 224, 224) array plus cheap image stats
+
+    Runs in a worker thread; Pillow releases the GIL while decoding.
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        UndecodableImageError: If the file isn't a decodable image
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            img.draft("RGB", (INPUT_SIZE * 2, INPUT_SIZE * 2))
+            img.load()
+    except FileNotFoundError:
+        raise
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise UndecodableImageError(str(e)) from None
+
+    # Fully loaded above, so the file is already closed
+    img = img.convert("RGB")
+    scale = INPUT_SIZE / min(img.size)
+    img = img.resize(
+        (max(round(img.width * scale), INPUT_SIZE), max(round(img.height * scale), INPUT_SIZE)),
+        Image.BILINEAR
+    )
+    left = (img.width - INPUT_SIZE) // 2
+    top = (img.height - INPUT_SIZE) // 2
+    img = img.crop((left, top, left + INPUT_SIZE, top + INPUT_SIZE))
+    pixels = np.asarray(img, dtype=np.float32) / 255.0
+
+    luminance = pixels @ np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+    stats = {
+        "brightness": round(float(luminance.mean()), 3),
+        "contrast": round(float(luminance.std()), 3),
+        "aspect_ratio": round(width / height, 3) if height else 0.0,
+    }
+    tensor = ((pixels - _MEAN) / _STD).transpose(2, 0, 1)
+    return np.ascontiguousarray(tensor), stats
+
+
+def merge_into_space_data(
+    space_data: Optional[Dict[str, Any]],
+    analyses: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Merge photo analyses into a Project.space_data document
+
+    Analyses are stored under `photo_analysis` keyed by file id. A room type
+    is only filled in when the project doesn't already have one.
+    """
+    merged = dict(space_data or {})
+    photo_analysis = dict(merged.get("photo_analysis") or {})
+    photo_analysis.update(analyses)
+    merged["photo_analysis"] = photo_analysis
+
+    if not merged.get("room_type"):
+        votes: Dict[str, float] = {}
+        for analysis in photo_analysis.values():
+            if analysis.get("room_type"):
+                votes[analysis["room_type"]] = votes.get(analysis["room_type"], 0.0) \
+                    + analysis.get("room_type_confidence", 0.0)
+        if votes:
+            merged["room_type"] = max(votes, key=votes.get)
+
+    return merged
+
+
+class RoomAnalyzer:
+    """
+    Room photo analyzer backed by a batched MobileNetV3 classifier
+
+    Requests from concurrent callers are merged into batches by a
+    DynamicBatcher and run under `torch.inference_mode` on one dedicated
+    thread, with torch's intra-op thread count set once at load time.
+    torch and torchvision are imported on first use only.
+    """
+
+    def __init__(
+        self,
+        weights: Optional[str] = None,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        intra_op_threads: Optional[int] = None
+    ):
+        self.weights = weights or settings.ROOM_ANALYSIS_WEIGHTS
+        self.intra_op_threads = intra_op_threads or settings.INFERENCE_INTRA_OP_THREADS \
+            or max((os.cpu_count() or 2) // 2, 1)
+        self._model = None
+        self._categories: List[str] = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="room-inference")
+        self.batcher = DynamicBatcher(
+            self._run_batch,
+            max_batch_size=max_batch_size or settings.INFERENCE_MAX_BATCH_SIZE,
+            max_wait_ms=settings.INFERENCE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms,
+            executor=self._executor
+        )
+
+    def _load_model(self):
+        """Load the model on the inference thread"""
+        import torch
+        from torchvision.models import MobileNet_V3_Small_Weights, mobilenet_v3_small
+
+        torch.set_num_threads(self.intra_op_threads)
+        weights = MobileNet_V3_Small_Weights.DEFAULT
+        # "none" keeps random weights: same cost profile, no download (benchmarks)
+        model = mobilenet_v3_small(weights=None if self.weights == "none" else weights)
+        self._model = model.eval()
+        self._categories = list(weights.meta["categories"])
+
+    def _run_batch(self, tensors: List[np.ndarray]) -> List[Dict[str, Any]]:
+        import torch
+
+        if self._model is None:
+            self._load_model()
+
+        with torch.inference_mode():
+            logits = self._model(torch.from_numpy(np.stack(tensors)))
+            probabilities = torch.softmax(logits, dim=1).numpy()
+
+        return [self._interpret(row) for row in probabilities]
+
+    def _interpret(self, probabilities: np.ndarray) -> Dict[str, Any]:
+        """Turn class probabilities into detected objects and a room type"""
+        objects: Dict[str, float] = {}
+        for index, category in enumerate(self._categories):
+            label = OBJECT_LABELS.get(category)
+            if label:
+                objects[label] = objects.get(label, 0.0) + float(probabilities[index])
+
+        room_scores = {
+            room: sum(objects.get(label, 0.0) for label in labels)
+            for room, labels in ROOM_TYPE_OBJECTS.items()
+        }
+        room_type = max(room_scores, key=room_scores.get)
+        room_confidence = room_scores[room_type]
+
+        return {
+            "room_type": room_type if room_confidence >= MIN_ROOM_TYPE_SCORE else None,
+            "room_type_confidence": round(room_confidence, 4),
+            "detected_objects": [
+                {"label": label, "score": round(score, 4)}
+                for label, score in sorted(objects.items(), key=lambda item: -item[1])
+                if score >= MIN_OBJECT_SCORE
+            ]
+        }
+
+    async def analyze_tensor(self, tensor: np.ndarray) -> Dict[str, Any]:
+        """Run one preprocessed (3, 224, 224) input through the batcher"""
+        return await self.batcher.submit(tensor)
+
+    async def analyze(self, path: str) -> Dict[str, Any]:
+        """Analyze one room photo"""
+        tensor, stats = await asyncio.to_thread(preprocess, path)
+        result = await self.analyze_tensor(tensor)
+        return {**result, **stats}
+
+    async def close(self):
+        await self.batcher.close()
+        self._executor.shutdown(wait=False)
+
+
+# Global room analyzer instance; the model loads on the first request
+room_analyzer = RoomAnalyzer()
@@ -1,14 +1,69 @@
 """
 Main FastAPI application - API Gateway
 """
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from shared.cache import cache
 from shared.config import settings
+from shared.database import dispose_engine, warm_pool
+from shared.derivatives import derivatives
+from shared.health import health
+from shared.log import RequestIdMiddleware, configure_logging
+from shared.metrics import STARTUP_SECONDS, PrometheusMiddleware, metrics_response
+from shared.profiling import ProfilerMiddleware
+from shared.quotas import enforce_rate_limit
+from shared.responses import CompressionMiddleware, ETagMiddleware
+from shared.upstream import design_service
+
+configure_logging("gateway")
+logger = logging.getLogger(__name__)
+
+
+async def _warm_up():
+    """Open database and Redis connections before the first request needs them"""
+    results = await asyncio.gather(
+        asyncio.wait_for(warm_pool(settings.DB_POOL_WARM_CONNECTIONS), settings.STARTUP_WARM_TIMEOUT_SECONDS),
+        asyncio.wait_for(cache.ping(), settings.STARTUP_WARM_TIMEOUT_SECONDS),
+        return_exceptions=True
+    )
+    # Best effort: a dependency that's down shows up in /health/ready, it doesn't block startup
+    for name, result in zip(("database", "redis"), results):
+        if isinstance(result, BaseException) or result is False:
+            logger.warning("Startup warm-up of %s failed: %r", name, result)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm connection pools on startup and release every pooled resource on shutdown"""
+    import_seconds = time.perf_counter() - _import_started
+    warm_started = time.perf_counter()
+    await _warm_up()
+    warm_seconds = time.perf_counter() - warm_started
+    STARTUP_SECONDS.labels(phase="import").set(import_seconds)
+    STARTUP_SECONDS.labels(phase="warm_up").set(warm_seconds)
+    logger.info("API gateway ready: imports %.2fs, warm-up %.2fs", import_seconds, warm_seconds)
+
+    yield
+
+    await design_service.aclose()
+    await cache.disconnect()
+    await dispose_engine()
+    derivatives.shutdown()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
-    description="AI-first interior design platform API"
+    description="AI-first interior design platform API",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -20,6 +75,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost last: request ids cover everything, metrics see the whole request;
+# ETags hash the uncompressed body
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(ETagMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(PrometheusMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -47,23 +110,49 @@ async def health_check():
     }
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness probe for load balancers
+
+    Probes the database, Redis and the design service concurrently and
+    reports each one's status and latency. Returns 503 when a required
+    dependency is down; results are cached for a couple of seconds.
+    """
+    result = await health.check()
+    return ORJSONResponse(result, status_code=503 if result["status"] == "not_ready" else 200)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for all workers"""
+    return metrics_response()
+
+
 # Import and include routers
 from routers.auth import router as auth_router
+from routers.uploads import router as uploads_router
+from routers.design import router as design_router
+from routers.admin import router as admin_router
 
 app.include_router(auth_router, prefix="/api/v1", tags=["Authentication"])
+# Metered API: each call counts against the caller's per-minute rate limit
+rate_limited = [Depends(enforce_rate_limit)]
+app.include_router(uploads_router, prefix="/api/v1", tags=["Uploads"], dependencies=rate_limited)
+app.include_router(design_router, prefix="/api/v1", tags=["Design"], dependencies=rate_limited)
+app.include_router(admin_router, prefix="/api/v1", tags=["Admin"])
 
 # Import microservice routers (to be implemented in phases)
-# from design_generation_service.routes import router as design_router
 # from project_management_service.routes import router as project_router
 # from commerce_service.routes import router as commerce_router
 # from visualization_service.routes import router as visualization_router
 
-# app.include_router(design_router, prefix="/api/v1/design", tags=["design"])
 # app.include_router(project_router, prefix="/api/v1/projects", tags=["projects"])
 # app.include_router(commerce_router, prefix="/api/v1/commerce", tags=["commerce"])
 # app.include_router(visualization_router, prefix="/api/v1/visualization", tags=["visualization"])
 
 
 if __name__ == "__main__":
+    # Development server; for production run `python serve.py gateway`
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=settings.DEBUG)
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=settings.DEBUG)
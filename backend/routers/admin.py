@@ -0,0 +1,76 @@
+"""
+Admin endpoints for on-demand request profiling
+"""
+import os
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+from shared.auth import require_role
+from shared.config import settings
+from shared.profiling import create_profile_token
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+class ProfileTokenResponse(BaseModel):
+    """Signed header that turns on profiling for a request"""
+    header: str
+    value: str
+    expires_at: int
+    format: str
+
+
+class ProfileInfo(BaseModel):
+    """A written request profile"""
+    name: str
+    size: int
+    created_at: float
+
+
+@router.post("/profiling/token", response_model=ProfileTokenResponse)
+async def create_profiling_token(admin_id: str = Depends(require_role("admin"))):
+    """
+    Issue a short-lived profiling token (admin only)
+
+    Send the returned header with any request, to the gateway or through
+    it to the design service, to profile that request. The response then
+    carries `X-Profile-Id`, the prefix of the written profile's name.
+    """
+    token, expires_at = create_profile_token()
+    return ProfileTokenResponse(
+        header="X-Profile",
+        value=token,
+        expires_at=expires_at,
+        format=settings.PROFILER_FORMAT
+    )
+
+
+@router.get("/profiling/profiles", response_model=List[ProfileInfo])
+async def list_profiles(limit: int = 50, admin_id: str = Depends(require_role("admin"))):
+    """List the most recent profiles written by this gateway (admin only)"""
+    directory = settings.PROFILER_OUTPUT_DIR
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.is_file():
+            stat = entry.stat()
+            profiles.append(ProfileInfo(name=entry.name, size=stat.st_size, created_at=stat.st_mtime))
+    profiles.sort(key=lambda profile: -profile.created_at)
+    return profiles[:max(limit, 1)]
+
+
+@router.get("/profiling/profiles/{name}")
+async def download_profile(name: str, admin_id: str = Depends(require_role("admin"))):
+    """
+    Download a profile (admin only)
+
+    `.speedscope.json` files open in https://www.speedscope.app;
+    `.collapsed` files feed flamegraph.pl or speedscope as well.
+    """
+    path = os.path.join(settings.PROFILER_OUTPUT_DIR, os.path.basename(name))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="application/json" if path.endswith(".json") else "text/plain")
@@ -3,21 +3,22 @@ Authentication endpoints for user registration and login
 """
 from datetime import timedelta
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel, EmailStr, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import uuid
 
-from ..shared.database import get_db
-from ..shared.models import User
-from ..shared.auth import (
+from shared.database import get_db
+from shared.models import User
+from shared.auth import (
     get_password_hash,
     verify_password,
     create_access_token,
     get_current_user_id,
 )
-from ..shared.config import settings
+from shared.config import settings
+from shared.responses import representations
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -115,6 +116,7 @@ async def register_user(
             "sub": str(new_user.user_id),
             "email": new_user.email,
             "role": new_user.role,
+            "tier": new_user.subscription_tier,
             "is_active": new_user.is_active
         },
         expires_delta=access_token_expires
@@ -176,6 +178,7 @@ async def login_user(
             "sub": str(user.user_id),
             "email": user.email,
             "role": user.role,
+            "tier": user.subscription_tier,
             "is_active": user.is_active
         },
         expires_delta=access_token_expires
@@ -198,13 +201,15 @@ async def login_user(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
+    request: Request,
     user_id: str = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get current authenticated user information
 
-    Requires valid JWT token in Authorization header
+    Requires valid JWT token in Authorization header. Supports
+    `If-None-Match`: returns 304 while the user record is unchanged.
     """
     result = await db.execute(
         select(User).where(User.user_id == uuid.UUID(user_id))
@@ -217,14 +222,18 @@ async def get_current_user_info(
             detail="User not found"
         )
 
-    return UserResponse(
-        user_id=str(user.user_id),
-        email=user.email,
-        full_name=user.full_name,
-        role=user.role,
-        subscription_tier=user.subscription_tier,
-        is_active=user.is_active
-    )
+    async def build():
+        return UserResponse(
+            user_id=str(user.user_id),
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            subscription_tier=user.subscription_tier,
+            is_active=user.is_active
+        ).model_dump()
+
+    version = user.updated_at or user.created_at
+    return await representations.respond(request, f"user:{user.user_id}:{version}", build)
 
 
 @router.post("/refresh", response_model=TokenResponse)
@@ -263,6 +272,7 @@ async def refresh_token(
             "sub": str(user.user_id),
             "email": user.email,
             "role": user.role,
+            "tier": user.subscription_tier,
             "is_active": user.is_active
         },
         expires_delta=access_token_expires
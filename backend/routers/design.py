@@ -0,0 +1,82 @@
+"""
+Design generation endpoints - proxied to the design generation service
+"""
+from typing import Dict
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from shared.auth import TENANT_SIGNATURE_HEADER, get_current_tenant, sign_tenant
+from shared.log import request_id_var
+from shared.upstream import UpstreamUnavailable, design_service
+
+router = APIRouter(prefix="/design", tags=["Design"])
+
+# Hop-by-hop headers (RFC 9110 7.6.1) and headers the proxy sets itself
+EXCLUDED_REQUEST_HEADERS = {
+    "connection", "keep-alive", "proxy-authorization", "te", "trailer",
+    "transfer-encoding", "upgrade", "host", "content-length",
+    "authorization", "accept-encoding", "x-request-id",
+    "x-tenant-id", "x-subscription-tier", "x-tenant-signature",
+}
+EXCLUDED_RESPONSE_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "trailer",
+    "transfer-encoding", "upgrade", "content-length", "server", "date", "x-request-id",
+}
+
+
+# Kept out of the OpenAPI schema: one operation per method would share an
+# operation id, and the service's own /docs describe the real endpoints
+@router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"], include_in_schema=False)
+async def proxy_design_service(
+    path: str,
+    request: Request,
+    tenant: Dict[str, str] = Depends(get_current_tenant)
+):
+    """
+    Forward a request to the design generation service (protected)
+
+    `/api/v1/design/generate-design` maps to `/generate-design` on the
+    service, and so on for all of its endpoints. The caller's user id and
+    subscription tier are forwarded, signed, for fair scheduling and plan
+    quotas, and response bodies (including NDJSON streams) are relayed as
+    they arrive.
+    """
+    headers = {
+        key: value for key, value in request.headers.items()
+        if key.lower() not in EXCLUDED_REQUEST_HEADERS
+    }
+    headers["X-Tenant-ID"] = tenant["user_id"]
+    headers["X-Subscription-Tier"] = tenant["tier"]
+    headers[TENANT_SIGNATURE_HEADER] = sign_tenant(tenant["user_id"], tenant["tier"])
+    headers["X-Request-ID"] = request_id_var.get()  # one id across gateway and service logs
+    headers["Accept-Encoding"] = "identity"  # the gateway compresses for the client
+    if request.client:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        headers["X-Forwarded-For"] = (
+            f"{forwarded_for}, {request.client.host}" if forwarded_for else request.client.host
+        )
+
+    try:
+        upstream = await design_service.send(
+            request.method,
+            f"/{path}",
+            params=request.query_params,
+            headers=headers,
+            content=await request.body()
+        )
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
+
+    response_headers = {
+        key: value for key, value in upstream.headers.items()
+        if key.lower() not in EXCLUDED_RESPONSE_HEADERS
+    }
+    response_headers.update(getattr(request.state, "quota_headers", {}))  # the gateway's rate limit
+
+    return StreamingResponse(
+        upstream.aiter_raw(),
+        status_code=upstream.status_code,
+        headers=response_headers,
+        background=BackgroundTask(upstream.aclose)
+    )
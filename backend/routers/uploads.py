@@ -0,0 +1,338 @@
+"""
+Upload endpoints for room photos and floor plans
+"""
+import asyncio
+import uuid
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+import aiofiles.os
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Request, UploadFile, status
+from fastapi.responses import FileResponse, Response
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.auth import get_current_tenant, get_current_user_id
+from shared.config import settings
+from shared.database import get_db
+from shared.derivatives import RENDITION_WIDTHS, UndecodableImageError, WorkerCrashedError, derivatives
+from shared.models import Upload
+from shared.perceptual_hash import image_index, phash_file
+from shared.scheduler import QueueFull, TierScheduler
+from shared.storage import (
+    SHA256_PATTERN,
+    StoredFile,
+    UploadTooLarge,
+    object_exists,
+    object_path,
+    store_stream,
+)
+
+router = APIRouter(prefix="/uploads", tags=["Uploads"])
+
+# Accepted content types per upload kind
+ALLOWED_CONTENT_TYPES = {
+    "room-photo": {"image/jpeg", "image/png", "image/webp", "image/heic"},
+    "floor-plan": {"image/jpeg", "image/png", "image/webp", "image/svg+xml", "application/pdf"},
+    "mood-board": {"image/jpeg", "image/png", "image/webp"},
+}
+
+# Kinds checked against the perceptual-hash index for near-duplicates
+NEAR_DUPLICATE_KINDS = {"room-photo", "mood-board"}
+HASHABLE_CONTENT_TYPES = {"image/jpeg", "image/png", "image/webp"}
+
+# Image work on the shared process pool is admitted fairly across users by tier
+image_jobs = TierScheduler("image-processing", settings.IMAGE_WORKERS * 2)
+
+
+class UploadResponse(BaseModel):
+    """Stored upload information"""
+    file_id: str
+    kind: str
+    content_type: str
+    size: int
+    url: str
+    deduplicated: bool
+    near_duplicates: List[str] = []
+
+
+def _check_kind(kind: str, content_type: Optional[str]) -> str:
+    """Validate upload kind and content type, returning the bare content type"""
+    if kind not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown upload kind: {kind}"
+        )
+
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type not in ALLOWED_CONTENT_TYPES[kind]:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported content type for {kind}: {media_type or 'missing'}"
+        )
+    return media_type
+
+
+def _check_declared_length(content_length: Optional[int]):
+    """Reject uploads that announce an oversized body before reading any of it"""
+    if content_length is not None and content_length > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload exceeds maximum size of {settings.MAX_UPLOAD_SIZE} bytes"
+        )
+
+
+async def _owned(db: AsyncSession, user_id: str, hashes: Iterable[str]) -> Set[str]:
+    """Which of these content hashes the user has uploaded"""
+    hashes = list(hashes)
+    if not hashes:
+        return set()
+    result = await db.execute(
+        select(Upload.sha256).where(Upload.user_id == uuid.UUID(user_id), Upload.sha256.in_(hashes))
+    )
+    return set(result.scalars())
+
+
+async def _owns(db: AsyncSession, user_id: str, sha256: str) -> bool:
+    return bool(await _owned(db, user_id, [sha256]))
+
+
+async def _check_owned(db: AsyncSession, user_id: str, file_id: str):
+    """404 unless the user uploaded this content (whether others did isn't revealed)"""
+    if not SHA256_PATTERN.match(file_id) or not await _owns(db, user_id, file_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+
+
+async def _record_owner(db: AsyncSession, user_id: str, stored: StoredFile, kind: str, content_type: str) -> bool:
+    """
+    Make the user an owner of stored content
+
+    Returns:
+        False if they already owned it
+    """
+    if await _owns(db, user_id, stored.sha256):
+        return False
+    db.add(Upload(
+        user_id=uuid.UUID(user_id),
+        sha256=stored.sha256,
+        kind=kind,
+        content_type=content_type,
+        size=stored.size
+    ))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()  # the same user's concurrent upload got there first
+        return False
+    return True
+
+
+async def _store(
+    chunks: AsyncIterator[bytes],
+    kind: str,
+    content_type: str,
+    user_id: str,
+    db: AsyncSession
+) -> UploadResponse:
+    try:
+        stored = await store_stream(chunks)
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    # Storage is shared across users, but `deduplicated` only reports the
+    # caller's own earlier uploads, so it can't reveal what others stored
+    created = await _record_owner(db, user_id, stored, kind, content_type)
+
+    near_duplicates: List[str] = []
+    if kind in NEAR_DUPLICATE_KINDS and content_type in HASHABLE_CONTENT_TYPES:
+        matches = await _find_near_duplicates(stored.sha256, stored.path, stored.deduplicated)
+        owned = await _owned(db, user_id, matches)
+        near_duplicates = [item_id for item_id in matches if item_id in owned]
+
+    return UploadResponse(
+        file_id=stored.sha256,
+        kind=kind,
+        content_type=content_type,
+        size=stored.size,
+        url=f"/api/v1/uploads/files/{stored.sha256}",
+        deduplicated=not created,
+        near_duplicates=near_duplicates
+    )
+
+
+async def _find_near_duplicates(sha256: str, path: str, deduplicated: bool) -> List[str]:
+    """Index an image by perceptual hash and return visually similar uploads"""
+    value = None
+    if deduplicated:
+        # Content seen before was hashed then; skip decoding it again
+        value = await asyncio.to_thread(image_index.get, sha256)
+    if value is None:
+        try:
+            value = await derivatives.run_in_pool(phash_file, path)
+        except Exception:
+            # Undecodable images (or a crashed worker) still upload; they just aren't indexed
+            return []
+
+    # The index reads and appends to its log on disk, so keep it off the event loop
+    matches = await asyncio.to_thread(
+        image_index.search_and_add, value, sha256, settings.IMAGE_NEAR_DUPLICATE_DISTANCE
+    )
+    return [item_id for item_id, _ in matches if item_id != sha256]
+
+
+@router.post("/{kind}", response_model=UploadResponse, status_code=status.HTTP_201_CREATED)
+async def upload_multipart(
+    kind: str,
+    file: UploadFile = File(...),
+    content_length: Optional[int] = Header(default=None),
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload a room photo or floor plan as multipart form data
+
+    - **kind**: `room-photo`, `floor-plan` or `mood-board`
+    - **file**: The image or document
+
+    Identical content is stored once; re-uploading your own file returns it
+    with `deduplicated` set. Room photos and mood-board images also list
+    visually similar earlier uploads of yours in `near_duplicates`.
+    """
+    _check_declared_length(content_length)
+    content_type = _check_kind(kind, file.content_type)
+
+    async def chunks():
+        while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+            yield chunk
+
+    return await _store(chunks(), kind, content_type, user_id, db)
+
+
+@router.put("/{kind}", response_model=UploadResponse, status_code=status.HTTP_201_CREATED)
+async def upload_raw(
+    kind: str,
+    request: Request,
+    content_length: Optional[int] = Header(default=None),
+    x_content_sha256: Optional[str] = Header(default=None),
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload a room photo or floor plan as the raw request body
+
+    The body is streamed straight to disk, so the size limit is enforced
+    while the data arrives. Clients that send `X-Content-SHA256` get an
+    immediate reference, without the body being read, when they have
+    already uploaded that content; otherwise the body is required.
+    """
+    _check_declared_length(content_length)
+    content_type = _check_kind(kind, request.headers.get("content-type"))
+
+    if x_content_sha256:
+        sha256 = x_content_sha256.lower()
+        if SHA256_PATTERN.match(sha256) and await _owns(db, user_id, sha256) and await object_exists(sha256):
+            return UploadResponse(
+                file_id=sha256,
+                kind=kind,
+                content_type=content_type,
+                size=(await aiofiles.os.stat(object_path(sha256))).st_size,
+                url=f"/api/v1/uploads/files/{sha256}",
+                deduplicated=True
+            )
+
+    return await _store(request.stream(), kind, content_type, user_id, db)
+
+
+@router.get("/files/{file_id}")
+async def get_uploaded_file(
+    file_id: str,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
+    """Download one of your uploads by content hash"""
+    await _check_owned(db, user_id, file_id)
+    if not await object_exists(file_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+
+    # Content never changes for a given hash
+    return FileResponse(
+        object_path(file_id),
+        headers={
+            "ETag": f'"{file_id}"',
+            "Cache-Control": "private, max-age=31536000, immutable"
+        }
+    )
+
+
+@router.get("/files/{file_id}/rendition")
+async def get_rendition(
+    file_id: str,
+    width: int = RENDITION_WIDTHS[1],
+    format: str = "webp",
+    if_none_match: Optional[str] = Header(default=None),
+    tenant: Dict[str, str] = Depends(get_current_tenant),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get a resized rendition of one of your uploaded images
+
+    - **width**: One of 160, 320, 640 or 1280 (images are never upscaled)
+    - **format**: `webp` or `jpeg`
+
+    Renditions are generated once in a worker process and cached on disk.
+    A matching `If-None-Match` returns 304 without touching the cache.
+    Generation is queued fairly across users by subscription tier.
+    Files that aren't decodable images (e.g. PDF or SVG floor plans) return 415.
+    """
+    await _check_owned(db, tenant["user_id"], file_id)
+
+    try:
+        derivatives.validate(width, format)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    etag = derivatives.etag(file_id, width, format)
+    cache_headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=31536000, immutable"
+    }
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    rendition = await derivatives.cached(file_id, width, format)
+    if rendition is None:
+        try:
+            async with image_jobs.slot(tenant["user_id"], tenant["tier"]):
+                rendition = await derivatives.get(file_id, width, format)
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="File not found"
+            )
+        except UndecodableImageError:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Renditions are only available for image files"
+            )
+        except WorkerCrashedError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Image processing failed; please retry",
+                headers={"Retry-After": "2"}
+            )
+        except QueueFull as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(e),
+                headers={"Retry-After": "2"}
+            )
+
+    return FileResponse(rendition.path, media_type=rendition.media_type, headers=cache_headers)
@@ -0,0 +1,184 @@
+"""
+Production server launcher - multi-worker uvicorn with worker recycling
+
+Binds the listening socket once and runs one uvicorn worker process per
+CPU on it, using uvloop and httptools when installed. A worker that has
+served its request quota (max requests plus random jitter) finishes its
+in-flight requests, runs lifespan shutdown and exits; the supervisor
+starts a replacement, so memory growth in long-lived workers is capped
+without dropping traffic. Prometheus metrics are written in multiprocess
+mode, so /metrics on any worker reports totals plus per-worker gauges.
+
+Usage (from backend/):
+    python serve.py gateway
+    python serve.py design --workers 4 --max-requests 5000
+"""
+import argparse
+import importlib.util
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+from prometheus_client import multiprocess
+from uvicorn._subprocess import get_subprocess
+
+from shared.config import settings
+from shared.log import configure_logging
+
+logger = logging.getLogger("serve")
+
+# Service name -> (ASGI app import string, default port)
+SERVICES: Dict[str, tuple] = {
+    "gateway": ("main:app", 8000),
+    "design": ("design_generation_service.main:app", 8001),
+}
+
+# A worker that dies this soon after starting is crashing, not recycling
+CRASH_WINDOW_SECONDS = 5.0
+
+
+def default_workers() -> int:
+    """Number of CPUs this process may run on (respects affinity and cgroup cpusets)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def prepare_metrics_dir() -> str:
+    """
+    Point prometheus_client at a clean multiprocess directory
+
+    Must run before any worker imports the app; workers inherit the
+    environment variable. Stale files from a previous run are removed so
+    counters start from zero.
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        directory = tempfile.mkdtemp(prefix="prometheus-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".db"):
+            os.remove(os.path.join(directory, name))
+    return directory
+
+
+class Supervisor:
+    """Keeps `workers` uvicorn processes running on a shared socket"""
+
+    def __init__(self, app: str, args: argparse.Namespace):
+        self.app = app
+        self.args = args
+        self.loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+        self.http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+        self.base_config = self._config(limit_max_requests=None)
+        self.socket = self.base_config.bind_socket()
+        self.processes: List[multiprocessing.Process] = []
+        self.started_at: Dict[int, float] = {}
+        self.should_exit = threading.Event()
+
+    def _config(self, limit_max_requests: Optional[int]) -> uvicorn.Config:
+        return uvicorn.Config(
+            self.app,
+            host=self.args.host,
+            port=self.args.port,
+            loop=self.loop,
+            http=self.http,
+            lifespan="on",
+            proxy_headers=True,
+            access_log=self.args.access_log,
+            backlog=settings.SERVER_BACKLOG,
+            timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+            timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+            limit_max_requests=limit_max_requests,
+        )
+
+    def _spawn(self) -> multiprocessing.Process:
+        limit = None
+        if self.args.max_requests > 0:
+            limit = self.args.max_requests + random.randint(0, max(self.args.max_requests_jitter, 0))
+        config = self._config(limit_max_requests=limit)
+        process = get_subprocess(config=config, target=uvicorn.Server(config=config).run, sockets=[self.socket])
+        process.start()
+        self.started_at[process.pid] = time.monotonic()
+        logger.info("Started worker [%d] (recycles after %s requests)", process.pid, limit or "unlimited")
+        return process
+
+    def _handle_signal(self, signum, frame):
+        self.should_exit.set()
+
+    def run(self) -> int:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._handle_signal)
+        logger.info("Serving %s on %s:%d with %d workers (loop=%s, http=%s)",
+                    self.app, self.args.host, self.args.port, self.args.workers, self.loop, self.http)
+
+        self.processes = [self._spawn() for _ in range(self.args.workers)]
+        while not self.should_exit.wait(0.5):
+            for index, process in enumerate(self.processes):
+                if process.is_alive():
+                    continue
+                self._reap(process)
+                lifetime = time.monotonic() - self.started_at.pop(process.pid, 0.0)
+                if process.exitcode and lifetime < CRASH_WINDOW_SECONDS:
+                    # Crashing on startup (e.g. a bad config); don't spin
+                    logger.error("Worker [%d] crashed on startup (exit code %s)", process.pid, process.exitcode)
+                    time.sleep(1.0)
+                if not self.should_exit.is_set():
+                    self.processes[index] = self._spawn()
+
+        self.shutdown()
+        return 0
+
+    def _reap(self, process: multiprocessing.Process):
+        process.join()
+        # Drop the dead worker's live gauges from the aggregated metrics
+        multiprocess.mark_process_dead(process.pid)
+
+    def shutdown(self):
+        """Graceful stop: SIGTERM lets workers finish in-flight requests first"""
+        logger.info("Shutting down workers")
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + settings.SERVER_GRACEFUL_TIMEOUT_SECONDS + 5
+        for process in self.processes:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self.socket.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("service", choices=sorted(SERVICES))
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, help="Defaults to 8000 (gateway) or 8001 (design)")
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS or default_workers())
+    parser.add_argument("--max-requests", type=int, default=settings.SERVER_MAX_REQUESTS)
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.SERVER_MAX_REQUESTS_JITTER)
+    parser.add_argument("--access-log", action="store_true")
+    args = parser.parse_args(argv)
+
+    app, default_port = SERVICES[args.service]
+    if args.port is None:
+        args.port = default_port
+    args.workers = max(args.workers, 1)
+
+    configure_logging("supervisor")
+    prepare_metrics_dir()
+    return Supervisor(app, args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
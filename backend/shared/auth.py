@@ -1,20 +1,29 @@
 """
 Authentication utilities for JWT token handling and password hashing
 """
+import hashlib
+import hmac
+import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Security scheme for JWT tokens
 security = HTTPBearer()
 
+# Header the gateway signs forwarded X-Tenant-ID/X-Subscription-Tier with
+TENANT_SIGNATURE_HEADER = "X-Tenant-Signature"
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -72,7 +81,8 @@ def decode_access_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
-    except JWTError:
+    except JWTError as e:
+        logger.warning("Rejected access token: %s", e)
         raise credentials_exception
 
 
@@ -105,7 +115,31 @@ async def get_current_user_id(
     return user_id
 
 
-async def require_role(required_role: str):
+async def get_current_tenant(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> Dict[str, str]:
+    """
+    Dependency to get the caller's user ID and subscription tier for job scheduling
+
+    Tokens issued before the tier claim existed count as "starter".
+
+    Raises:
+        HTTPException: If token is invalid or user ID not found
+    """
+    payload = decode_access_token(credentials.credentials)
+
+    user_id: str = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return {"user_id": user_id, "tier": payload.get("tier") or "starter"}
+
+
+def require_role(required_role: str):
     """
     Dependency factory to require specific user role
 
@@ -123,6 +157,7 @@ async def require_role(required_role: str):
 
         user_role: str = payload.get("role")
         if user_role != required_role and user_role != "admin":
+            logger.warning("User %s with role %s denied %s access", payload.get("sub"), user_role, required_role)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Insufficient permissions. Required role: {required_role}",
@@ -168,3 +203,28 @@ async def get_current_active_user(
         )
 
     return payload
+
+
+def sign_tenant(tenant_id: str, tier: str, ttl_seconds: Optional[int] = None) -> str:
+    """
+    Signed value for the X-Tenant-Signature header
+
+    Internal services honour the tenant and tier headers forwarded by the
+    gateway only when they carry a valid signature, so a caller that
+    reaches a service directly can't claim another tenant or a higher tier.
+    """
+    expires_at = int(time.time()) + (ttl_seconds or settings.TENANT_SIGNATURE_TTL_SECONDS)
+    return f"{expires_at}.{_tenant_signature(tenant_id, tier, expires_at)}"
+
+
+def verify_tenant_signature(tenant_id: str, tier: str, signature: str) -> bool:
+    """Check an X-Tenant-Signature value against the tenant and tier it came with"""
+    expires_at, _, digest = signature.partition(".")
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(digest, _tenant_signature(tenant_id, tier, int(expires_at)))
+
+
+def _tenant_signature(tenant_id: str, tier: str, expires_at: int) -> str:
+    message = f"tenant\n{tenant_id}\n{tier}\n{expires_at}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
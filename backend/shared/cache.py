@@ -2,10 +2,20 @@
 Redis caching utilities for improved performance
 """
 import json
-from typing import Optional, Any
+import logging
+import time
+from typing import Any, Dict, List, Optional
 from datetime import timedelta
 import redis.asyncio as redis
 from .config import settings
+from .metrics import CACHE_LATENCY, CACHE_RESULTS
+
+logger = logging.getLogger(__name__)
+
+
+def _record(operation: str, started: float, result: str):
+    CACHE_LATENCY.labels(operation=operation).observe(time.perf_counter() - started)
+    CACHE_RESULTS.labels(operation=operation, result=result).inc()
 
 
 class RedisCache:
@@ -13,6 +23,7 @@ class RedisCache:
 
     def __init__(self):
         self._client: Optional[redis.Redis] = None
+        self._scripts: Dict[str, Any] = {}  # Lua source -> script registered on the current client
 
     async def connect(self):
         """Connect to Redis server"""
@@ -28,6 +39,7 @@ class RedisCache:
         if self._client:
             await self._client.close()
             self._client = None
+            self._scripts.clear()
 
     async def get(self, key: str) -> Optional[Any]:
         """
@@ -42,13 +54,16 @@ class RedisCache:
         if not self._client:
             await self.connect()
 
+        started = time.perf_counter()
         try:
             value = await self._client.get(key)
+            _record("get", started, "hit" if value else "miss")
             if value:
                 return json.loads(value)
             return None
         except Exception as e:
-            print(f"Redis GET error: {e}")
+            _record("get", started, "error")
+            logger.warning("Redis GET error: %s", e)
             return None
 
     async def set(
@@ -71,15 +86,18 @@ class RedisCache:
         if not self._client:
             await self.connect()
 
+        started = time.perf_counter()
         try:
             serialized_value = json.dumps(value)
             if expire:
                 await self._client.setex(key, expire, serialized_value)
             else:
                 await self._client.set(key, serialized_value)
+            _record("set", started, "ok")
             return True
         except Exception as e:
-            print(f"Redis SET error: {e}")
+            _record("set", started, "error")
+            logger.warning("Redis SET error: %s", e)
             return False
 
     async def delete(self, key: str) -> bool:
@@ -95,11 +113,14 @@ class RedisCache:
         if not self._client:
             await self.connect()
 
+        started = time.perf_counter()
         try:
             result = await self._client.delete(key)
+            _record("delete", started, "ok")
             return result > 0
         except Exception as e:
-            print(f"Redis DELETE error: {e}")
+            _record("delete", started, "error")
+            logger.warning("Redis DELETE error: %s", e)
             return False
 
     async def exists(self, key: str) -> bool:
@@ -115,11 +136,14 @@ class RedisCache:
         if not self._client:
             await self.connect()
 
+        started = time.perf_counter()
         try:
             result = await self._client.exists(key)
+            _record("exists", started, "hit" if result else "miss")
             return result > 0
         except Exception as e:
-            print(f"Redis EXISTS error: {e}")
+            _record("exists", started, "error")
+            logger.warning("Redis EXISTS error: %s", e)
             return False
 
     async def increment(self, key: str, amount: int = 1) -> Optional[int]:
@@ -136,10 +160,14 @@ class RedisCache:
         if not self._client:
             await self.connect()
 
+        started = time.perf_counter()
         try:
-            return await self._client.incrby(key, amount)
+            value = await self._client.incrby(key, amount)
+            _record("increment", started, "ok")
+            return value
         except Exception as e:
-            print(f"Redis INCRBY error: {e}")
+            _record("increment", started, "error")
+            logger.warning("Redis INCRBY error: %s", e)
             return None
 
     async def expire(self, key: str, seconds: int) -> bool:
@@ -156,10 +184,14 @@ class RedisCache:
         if not self._client:
             await self.connect()
 
+        started = time.perf_counter()
         try:
-            return await self._client.expire(key, seconds)
+            updated = await self._client.expire(key, seconds)
+            _record("expire", started, "ok")
+            return updated
         except Exception as e:
-            print(f"Redis EXPIRE error: {e}")
+            _record("expire", started, "error")
+            logger.warning("Redis EXPIRE error: %s", e)
             return False
 
     async def clear_pattern(self, pattern: str) -> int:
@@ -175,16 +207,18 @@ class RedisCache:
         if not self._client:
             await self.connect()
 
+        started = time.perf_counter()
         try:
             keys = []
             async for key in self._client.scan_iter(match=pattern):
                 keys.append(key)
 
-            if keys:
-                return await self._client.delete(*keys)
-            return 0
+            deleted = await self._client.delete(*keys) if keys else 0
+            _record("clear_pattern", started, "ok")
+            return deleted
         except Exception as e:
-            print(f"Redis CLEAR_PATTERN error: {e}")
+            _record("clear_pattern", started, "error")
+            logger.warning("Redis CLEAR_PATTERN error: %s", e)
             return 0
 
     async def ping(self) -> bool:
@@ -197,12 +231,47 @@ class RedisCache:
         if not self._client:
             await self.connect()
 
+        started = time.perf_counter()
         try:
-            return await self._client.ping()
+            alive = await self._client.ping()
+            _record("ping", started, "ok")
+            return alive
         except Exception as e:
-            print(f"Redis PING error: {e}")
+            _record("ping", started, "error")
+            logger.warning("Redis PING error: %s", e)
             return False
 
+    async def run_script(self, script: str, keys: List[str], args: List[Any]) -> Optional[Any]:
+        """
+        Run a Lua script atomically on the server
+
+        The script body is sent once; later calls invoke it by SHA (EVALSHA),
+        reloading it if the server has flushed its script cache.
+
+        Args:
+            script: Lua source
+            keys: Keys the script touches (KEYS)
+            args: Script arguments (ARGV)
+
+        Returns:
+            The script's return value, or None on error
+        """
+        if not self._client:
+            await self.connect()
+
+        started = time.perf_counter()
+        try:
+            registered = self._scripts.get(script)
+            if registered is None:
+                registered = self._scripts[script] = self._client.register_script(script)
+            result = await registered(keys=keys, args=args)
+            _record("script", started, "ok")
+            return result
+        except Exception as e:
+            _record("script", started, "error")
+            logger.warning("Redis SCRIPT error: %s", e)
+            return None
+
 
 # Global cache instance
 cache = RedisCache()
@@ -1,18 +1,25 @@
 """
 Database connection and session management
 """
+import time
+import asyncio
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from .config import settings
+from .metrics import DB_SESSION_LATENCY, DB_SESSIONS_IN_FLIGHT
 
-# Create async engine
+# Create async engine (SQLite, used for local runs, doesn't take pool sizing)
+pool_options = {} if settings.DATABASE_URL.startswith("sqlite") else {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+}
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
     future=True,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+    **pool_options,
 )
 
 # Create async session maker
@@ -30,12 +37,33 @@ Base = declarative_base()
 
 async def get_db() -> AsyncSession:
     """Dependency for getting async database sessions"""
+    outcome = "commit"
+    started = time.perf_counter()
+    DB_SESSIONS_IN_FLIGHT.inc()
     async with AsyncSessionLocal() as session:
         try:
             yield session
             await session.commit()
         except Exception:
+            outcome = "rollback"
             await session.rollback()
             raise
         finally:
             await session.close()
+            DB_SESSIONS_IN_FLIGHT.dec()
+            DB_SESSION_LATENCY.labels(outcome=outcome).observe(time.perf_counter() - started)
+
+
+async def warm_pool(connections: int):
+    """Open pooled connections up front so the first requests don't pay for connecting"""
+    async def connect():
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    # Held concurrently, so each one is a separate pooled connection
+    await asyncio.gather(*[connect() for _ in range(max(connections, 1))])
+
+
+async def dispose_engine():
+    """Close all pooled connections"""
+    await engine.dispose()
@@ -0,0 +1,212 @@
+"""
+Image derivative (thumbnail/rendition) generation with an on-disk cache
+"""
+import asyncio
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+import aiofiles.os
+from .config import settings
+from .storage import object_path
+
+
+# Bump when rendering code changes so cached renditions (and ETags) roll over
+RENDER_VERSION = 1
+
+RENDITION_WIDTHS = (160, 320, 640, 1280)
+
+RENDITION_FORMATS = {
+    "webp": {"pil_format": "WEBP", "media_type": "image/webp", "quality": 80},
+    "jpeg": {"pil_format": "JPEG", "media_type": "image/jpeg", "quality": 82},
+}
+
+
+class UndecodableImageError(Exception):
+    """The stored file isn't an image Pillow can decode (e.g. a PDF or SVG floor plan)"""
+
+
+class WorkerCrashedError(Exception):
+    """A worker process died mid-job (e.g. killed for running out of memory)"""
+
+
+def _render(source_path: str, dest_path: str, width: int, fmt: str, quality: int):
+    """
+    Resize an image and write it atomically (runs in a worker process)
+
+    Pillow is imported here so the web process never pays for it.
+    """
+    from PIL import Image, ImageOps
+
+    img = None
+    try:
+        img = Image.open(source_path)
+        img.draft("RGB", (width, width))  # lets JPEG decode at reduced scale
+        img.load()
+    except FileNotFoundError:
+        raise
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        # Pillow's own exceptions don't exist in the web process, so report
+        # decode failures with one that does
+        if img is not None:
+            img.close()
+        raise UndecodableImageError(str(e)) from None
+
+    with img:
+        img = ImageOps.exif_transpose(img)
+        if img.width > width:
+            height = max(round(img.height * width / img.width), 1)
+            img = img.resize((width, height), Image.LANCZOS)
+        if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+
+        tmp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+        img.save(tmp_path, format=fmt, quality=quality, optimize=True)
+    os.replace(tmp_path, dest_path)
+
+
+class Rendition:
+    """A generated derivative on disk"""
+
+    def __init__(self, path: str, media_type: str, etag: str):
+        self.path = path
+        self.media_type = media_type
+        self.etag = etag
+
+
+class DerivativeService:
+    """
+    Generates image renditions in a process pool and caches them on disk
+
+    Renditions are keyed by source content hash and rendering parameters, so
+    a cached file is valid forever and its ETag can be computed without
+    touching the disk. Concurrent requests for the same rendition share a
+    single render.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.IMAGE_WORKERS
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def rendition_key(sha256: str, width: int, fmt: str) -> str:
+        quality = RENDITION_FORMATS[fmt]["quality"]
+        return f"{sha256}-w{width}-q{quality}-v{RENDER_VERSION}.{fmt}"
+
+    @classmethod
+    def etag(cls, sha256: str, width: int, fmt: str) -> str:
+        """Strong ETag for a rendition, derived from its cache key"""
+        return f'"{cls.rendition_key(sha256, width, fmt)}"'
+
+    @staticmethod
+    def validate(width: int, fmt: str):
+        """Only fixed presets are allowed, so clients can't fill the cache with arbitrary sizes"""
+        if width not in RENDITION_WIDTHS:
+            raise ValueError(f"Unsupported width {width}; choose from {RENDITION_WIDTHS}")
+        if fmt not in RENDITION_FORMATS:
+            raise ValueError(f"Unsupported format {fmt}; choose from {tuple(RENDITION_FORMATS)}")
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _run(self, fn, *args):
+        """
+        Run a function on the worker processes
+
+        Raises:
+            WorkerCrashedError: If a worker died; the pool is replaced for later jobs
+        """
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool as e:
+            # A broken pool rejects every later job, so drop it (unless a
+            # concurrent failure already has) and start fresh workers next time
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise WorkerCrashedError(str(e)) from None
+
+    def _rendition(self, sha256: str, width: int, fmt: str) -> Rendition:
+        key = self.rendition_key(sha256, width, fmt)
+        dest_path = os.path.join(settings.UPLOAD_DIR, "derivatives", sha256[:2], key)
+        return Rendition(dest_path, RENDITION_FORMATS[fmt]["media_type"], self.etag(sha256, width, fmt))
+
+    async def cached(self, sha256: str, width: int, fmt: str = "webp") -> Optional[Rendition]:
+        """Get a rendition only if it has already been generated"""
+        self.validate(width, fmt)
+        rendition = self._rendition(sha256, width, fmt)
+        return rendition if await aiofiles.os.path.exists(rendition.path) else None
+
+    async def get(self, sha256: str, width: int, fmt: str = "webp") -> Rendition:
+        """
+        Get a rendition of a stored image, generating it if needed
+
+        Args:
+            sha256: Content hash of the source image
+            width: Target width (one of RENDITION_WIDTHS); smaller images are not upscaled
+            fmt: Output format (webp or jpeg)
+
+        Returns:
+            Rendition with its path, media type and ETag
+
+        Raises:
+            ValueError: If the width or format isn't a supported preset
+            FileNotFoundError: If the source image doesn't exist
+            UndecodableImageError: If the source isn't a decodable image
+            WorkerCrashedError: If the worker process died while rendering
+        """
+        self.validate(width, fmt)
+        key = self.rendition_key(sha256, width, fmt)
+        rendition = self._rendition(sha256, width, fmt)
+
+        # Register before the first await so concurrent callers always find
+        # the pending render instead of starting their own
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._generate(sha256, rendition.path, width, fmt))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shield so one cancelled client doesn't abort the render for the others
+        await asyncio.shield(pending)
+        return rendition
+
+    async def _generate(self, sha256: str, dest_path: str, width: int, fmt: str):
+        """Render a rendition unless it's already on disk"""
+        if await aiofiles.os.path.exists(dest_path):
+            return
+
+        source_path = object_path(sha256)
+        if not await aiofiles.os.path.exists(source_path):
+            raise FileNotFoundError(source_path)
+        await aiofiles.os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+        options = RENDITION_FORMATS[fmt]
+        await self._run(
+            _render,
+            source_path,
+            dest_path,
+            width,
+            options["pil_format"],
+            options["quality"]
+        )
+
+    async def run_in_pool(self, fn, *args):
+        """Run other CPU-bound image work (e.g. hashing) on the same worker processes"""
+        return await self._run(fn, *args)
+
+    def shutdown(self):
+        """Stop worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global derivative service instance
+derivatives = DerivativeService()
@@ -0,0 +1,420 @@
+"""
+Memory-mapped product embedding store shared across worker processes
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from .config import settings
+
+
+ProductId = Union[str, uuid.UUID]
+
+CURRENT_FILE = "CURRENT"
+
+
+def _key(product_id: ProductId) -> bytes:
+    """16-byte key for a product UUID"""
+    if not isinstance(product_id, uuid.UUID):
+        product_id = uuid.UUID(str(product_id))
+    return product_id.bytes
+
+
+def _record_dtype(dim: int) -> np.dtype:
+    """Fixed-size delta record, so segments can be mapped as arrays"""
+    return np.dtype([("id", "V16"), ("deleted", "u1"), ("vector", "<f4", (dim,))])
+
+
+class _State:
+    """
+    One consistent view of the store: a snapshot plus the deltas read on top of it
+
+    Never modified once published. Refreshes and swaps build a new state and
+    replace the store's reference in one assignment, so a reader that takes
+    a single reference per call never pairs new ids with old vectors.
+    """
+
+    def __init__(
+        self,
+        version: Optional[str],
+        dim: int,
+        ids: np.ndarray,
+        vectors: np.ndarray,
+        delta: Optional[Dict[bytes, Optional[np.ndarray]]] = None,
+        delta_offsets: Optional[Dict[str, int]] = None
+    ):
+        self.version = version
+        self.dim = dim
+        self.ids = ids
+        self.vectors = vectors
+        self.delta = delta or {}
+        self.delta_offsets = delta_offsets or {}
+
+    @classmethod
+    def empty(cls, dim: int) -> "_State":
+        return cls(None, dim, np.empty(0, dtype="V16"), np.empty((0, dim), dtype=np.float32))
+
+    def snapshot_row(self, key: bytes) -> Optional[int]:
+        if not len(self.ids):
+            return None
+        needle = np.frombuffer(key, dtype="V16")
+        row = int(np.searchsorted(self.ids, needle[0]))
+        if row < len(self.ids) and self.ids[row] == needle[0]:
+            return row
+        return None
+
+
+class EmbeddingStore:
+    """
+    Product style vectors on disk, opened with mmap
+
+    Layout of the store directory:
+
+        CURRENT                  name of the active snapshot, swapped atomically
+        v000001/meta.json        dimension and row count
+        v000001/ids.npy          sorted 16-byte product ids (the offset table)
+        v000001/vectors.npy      float32 (rows, dim); row i belongs to ids[i]
+        v000001/delta-000001.bin append-only upserts/deletes since the snapshot
+
+    Snapshot arrays are memory-mapped read-only, so every worker process
+    shares one copy in the OS page cache and startup is just an mmap call.
+    Lookups binary-search the sorted id table; recent changes live in small
+    delta segments that are replayed into a dict. Compaction folds deltas
+    into a new snapshot and swaps CURRENT; readers pick it up on refresh.
+
+    Any number of processes may read; only one process may write. Within a
+    process, readers work from one immutable _State per call, so they can
+    run alongside background compaction without locking.
+    """
+
+    def __init__(self, path: Optional[str] = None, dim: Optional[int] = None):
+        self.path = path or settings.EMBEDDING_STORE_DIR
+        self.dim = dim or settings.EMBEDDING_DIM
+        self._state = _State.empty(self.dim)
+        self._checked_at = 0.0
+        self._publish_lock = threading.Lock()  # serializes building and replacing _state
+        self._write_lock = threading.Lock()
+        self._compacting: Optional[threading.Thread] = None
+        self.refresh(force=True)
+
+    # Reading
+
+    @property
+    def _version(self) -> Optional[str]:
+        return self._state.version
+
+    def _current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.path, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _version_dir(self, version: Optional[str] = None) -> str:
+        return os.path.join(self.path, version or self._version)
+
+    def refresh(self, force: bool = False):
+        """
+        Pick up a swapped snapshot and newly appended delta records
+
+        Called automatically on reads at most every EMBEDDING_REFRESH_SECONDS.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < settings.EMBEDDING_REFRESH_SECONDS:
+            return
+        self._checked_at = now
+
+        with self._publish_lock:
+            state = self._state
+            version = self._current_version()
+            if version != state.version:
+                state = self._open_snapshot(version)
+            self._state = self._read_deltas(state)
+
+    def _open_snapshot(self, version: Optional[str]) -> _State:
+        if version is None:
+            return _State.empty(self.dim)
+
+        directory = self._version_dir(version)
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        return _State(
+            version,
+            meta["dim"],
+            np.load(os.path.join(directory, "ids.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        )
+
+    def _segments(self, version: Optional[str]) -> List[str]:
+        if version is None:
+            return []
+        return sorted(
+            name for name in os.listdir(self._version_dir(version))
+            if name.startswith("delta-") and name.endswith(".bin")
+        )
+
+    def _read_deltas(self, state: _State) -> _State:
+        """State with newly appended delta records applied (the same state if there are none)"""
+        dtype = _record_dtype(state.dim)
+        delta, offsets = state.delta, state.delta_offsets
+        changed = False
+        for name in self._segments(state.version):
+            path = os.path.join(self._version_dir(state.version), name)
+            offset = offsets.get(name, 0)
+            size = os.path.getsize(path)
+            count = (size - offset) // dtype.itemsize  # ignores a partially written record
+            if count <= 0:
+                continue
+            if not changed:
+                delta, offsets, changed = dict(delta), dict(offsets), True
+            records = np.fromfile(path, dtype=dtype, count=count, offset=offset)
+            for record in records:
+                key = record["id"].tobytes()
+                delta[key] = None if record["deleted"] else np.array(record["vector"])
+            offsets[name] = offset + count * dtype.itemsize
+        if not changed:
+            return state
+        return _State(state.version, state.dim, state.ids, state.vectors, delta, offsets)
+
+    def _publish_deltas(self):
+        with self._publish_lock:
+            self._state = self._read_deltas(self._state)
+
+    def get(self, product_id: ProductId) -> Optional[np.ndarray]:
+        """Get one product vector, or None if the product has none"""
+        self.refresh()
+        state = self._state
+        key = _key(product_id)
+        if key in state.delta:
+            return state.delta[key]
+        row = state.snapshot_row(key)
+        return None if row is None else state.vectors[row]
+
+    def get_many(self, product_ids: Iterable[ProductId]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get vectors for many products at once
+
+        Returns:
+            Tuple of a (n, dim) float32 matrix and a boolean mask of which
+            products were found (missing rows are zero)
+        """
+        self.refresh()
+        state = self._state
+        keys = [_key(product_id) for product_id in product_ids]
+        matrix = np.zeros((len(keys), state.dim), dtype=np.float32)
+        found = np.zeros(len(keys), dtype=bool)
+        if not keys:
+            return matrix, found
+
+        # Vectorized snapshot lookup for everything, then overlay deltas
+        if len(state.ids):
+            needles = np.frombuffer(b"".join(keys), dtype="V16")
+            rows = np.minimum(np.searchsorted(state.ids, needles), len(state.ids) - 1)
+            hit = state.ids[rows] == needles
+            matrix[hit] = state.vectors[rows[hit]]
+            found |= hit
+
+        for i, key in enumerate(keys):
+            if key in state.delta:
+                vector = state.delta[key]
+                found[i] = vector is not None
+                matrix[i] = vector if vector is not None else 0.0
+        return matrix, found
+
+    def snapshot_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Memory-mapped (ids, vectors) of the current snapshot, for vectorized scans
+
+        Pending delta records are not included; call compact() first when
+        they matter.
+        """
+        self.refresh()
+        state = self._state
+        return state.ids, state.vectors
+
+    def __len__(self) -> int:
+        self.refresh()
+        state = self._state
+        if not state.delta:
+            return len(state.ids)
+        in_snapshot = sum(state.snapshot_row(key) is not None for key in state.delta)
+        upserted = sum(vector is not None for vector in state.delta.values())
+        return len(state.ids) - in_snapshot + upserted
+
+    @property
+    def pending_deltas(self) -> int:
+        return len(self._state.delta)
+
+    # Writing (single writer process)
+
+    def _check_vector(self, vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Expected vector of shape ({self.dim},), got {vector.shape}")
+        return vector
+
+    def write_snapshot(self, product_ids: Iterable[ProductId], vectors: np.ndarray) -> str:
+        """
+        Replace the store contents with a full snapshot
+
+        Args:
+            product_ids: Product UUIDs, one per row of vectors
+            vectors: (n, dim) array
+
+        Returns:
+            The new snapshot version
+        """
+        keys = np.frombuffer(b"".join(_key(product_id) for product_id in product_ids), dtype="V16")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(keys):
+            raise ValueError("vectors must be (len(product_ids), dim)")
+        self.dim = vectors.shape[1]
+
+        with self._write_lock:
+            version = self._write_version(keys, vectors)
+            self._swap(version)
+        return version
+
+    def _write_version(self, keys: np.ndarray, vectors: np.ndarray) -> str:
+        """Write a sorted snapshot into a fresh version directory"""
+        # Later duplicates win, matching delta semantics
+        order = np.argsort(keys, kind="stable")
+        keys, vectors = keys[order], vectors[order]
+        if len(keys) > 1:
+            last = np.append(keys[1:] != keys[:-1], True)
+            keys, vectors = keys[last], vectors[last]
+
+        current = self._current_version()
+        version = f"v{int(current[1:]) + 1 if current else 1:06d}"
+        directory = os.path.join(self.path, version)
+        tmp_dir = f"{directory}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "ids.npy"), keys)
+        np.save(os.path.join(tmp_dir, "vectors.npy"), vectors)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"dim": int(vectors.shape[1]), "rows": int(len(keys)), "created_at": time.time()}, f)
+        os.rename(tmp_dir, directory)
+        return version
+
+    def _swap(self, version: str):
+        """Atomically point CURRENT at a version and reopen it"""
+        tmp_path = os.path.join(self.path, f"{CURRENT_FILE}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, CURRENT_FILE))
+
+        previous = self._version
+        with self._publish_lock:
+            self._state = self._read_deltas(self._open_snapshot(version))
+        self._cleanup(keep={version, previous})
+
+    def _cleanup(self, keep: set):
+        """Remove old versions; mapped files stay readable in other processes after unlink"""
+        for name in os.listdir(self.path):
+            if name.startswith("v") and name not in keep and os.path.isdir(os.path.join(self.path, name)):
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def _append(self, key: bytes, vector: Optional[np.ndarray]):
+        if self._version is None:
+            # Deltas need a snapshot to attach to; start from an empty one
+            self._swap(self._write_version(np.empty(0, dtype="V16"), np.empty((0, self.dim), np.float32)))
+
+        record = np.zeros(1, dtype=_record_dtype(self.dim))
+        record["id"] = np.frombuffer(key, dtype="V16")
+        record["deleted"] = vector is None
+        if vector is not None:
+            record["vector"] = vector
+
+        segments = self._segments(self._version)
+        name = segments[-1] if segments else "delta-000001.bin"
+        path = os.path.join(self._version_dir(), name)
+        if os.path.exists(path) and os.path.getsize(path) >= settings.EMBEDDING_DELTA_SEGMENT_BYTES:
+            name = f"delta-{int(name[6:12]) + 1:06d}.bin"
+            path = os.path.join(self._version_dir(), name)
+
+        with open(path, "ab") as f:
+            f.write(record.tobytes())
+        self._publish_deltas()
+
+    def put(self, product_id: ProductId, vector: np.ndarray):
+        """Insert or update a product vector (appended to the current delta segment)"""
+        vector = self._check_vector(vector)
+        with self._write_lock:
+            self._append(_key(product_id), vector)
+        self._maybe_compact()
+
+    def delete(self, product_id: ProductId):
+        """Remove a product vector"""
+        with self._write_lock:
+            self._append(_key(product_id), None)
+        self._maybe_compact()
+
+    def compact(self) -> Optional[str]:
+        """
+        Fold delta segments into a new snapshot and swap it in
+
+        The merge runs without holding the write lock, so puts continue
+        meanwhile; records written during the merge are carried over to the
+        new version before the swap.
+
+        Returns:
+            The new version, or None if there was nothing to compact
+        """
+        with self._write_lock:
+            self._publish_deltas()
+            state = self._state
+            if not state.delta:
+                return None
+            base_version = state.version
+            merged_offsets, delta = state.delta_offsets, state.delta
+            base_ids, base_vectors, dim = state.ids, state.vectors, state.dim
+
+        delta_keys = np.frombuffer(b"".join(delta), dtype="V16")
+        keep = ~np.isin(base_ids, delta_keys)
+        upserts = [(key, vector) for key, vector in delta.items() if vector is not None]
+        keys = np.concatenate([
+            base_ids[keep],
+            np.frombuffer(b"".join(key for key, _ in upserts), dtype="V16")
+        ])
+        vectors = np.concatenate([
+            base_vectors[keep],
+            np.array([vector for _, vector in upserts], dtype=np.float32).reshape(-1, dim)
+        ])
+
+        with self._write_lock:
+            if self._version != base_version:
+                return None  # another snapshot was written meanwhile
+            version = self._write_version(keys, vectors)
+            self._carry_over_deltas(base_version, version, merged_offsets)
+            self._swap(version)
+        return version
+
+    def _carry_over_deltas(self, old_version: str, new_version: str, merged_offsets: Dict[str, int]):
+        """Copy delta records that arrived after the merge started into the new version"""
+        old_dir = os.path.join(self.path, old_version)
+        new_path = os.path.join(self.path, new_version, "delta-000001.bin")
+        with open(new_path, "ab") as out:
+            for name in sorted(os.listdir(old_dir)):
+                if not (name.startswith("delta-") and name.endswith(".bin")):
+                    continue
+                with open(os.path.join(old_dir, name), "rb") as f:
+                    f.seek(merged_offsets.get(name, 0))
+                    out.write(f.read())
+
+    def _maybe_compact(self):
+        if self.pending_deltas >= settings.EMBEDDING_COMPACT_THRESHOLD:
+            self.compact_in_background()
+
+    def compact_in_background(self):
+        """Start compaction on a daemon thread unless one is already running"""
+        if self._compacting is not None and self._compacting.is_alive():
+            return
+        self._compacting = threading.Thread(target=self.compact, name="embedding-compaction", daemon=True)
+        self._compacting.start()
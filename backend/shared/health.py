@@ -0,0 +1,123 @@
+"""
+Dependency health checks - concurrent probes with cached results
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+from sqlalchemy import text
+from .cache import cache
+from .config import settings
+from .database import engine
+from .upstream import design_service
+
+Probe = Callable[[], Awaitable[Any]]
+
+
+class ProbeFailed(Exception):
+    """Raised by a probe whose dependency answered but isn't usable"""
+
+
+class HealthChecker:
+    """
+    Readiness of the process's dependencies
+
+    All probes run concurrently, each under its own timeout, so a check
+    takes as long as the slowest probe rather than their sum. The result
+    is cached for a short window and concurrent callers share the check
+    in flight, so a flood of load-balancer probes costs one round of
+    dependency calls per window.
+    """
+
+    def __init__(
+        self,
+        probes: Dict[str, Probe],
+        required: Iterable[str],
+        timeout: float,
+        cache_seconds: float
+    ):
+        self.probes = probes
+        self.required = set(required)
+        self.timeout = timeout
+        self.cache_seconds = cache_seconds
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._in_flight: Optional[asyncio.Task] = None
+
+    async def check(self) -> Dict[str, Any]:
+        """
+        Probe every dependency, or return the cached result if still fresh
+
+        Returns:
+            {"status": "ready" | "degraded" | "not_ready", "checked_at",
+            "cached", "dependencies": {name: {"status", "latency_ms",
+            "required", "error"?}}}. Only required dependencies being down
+            makes the process not ready.
+        """
+        if self._result is not None and time.monotonic() - self._checked_at < self.cache_seconds:
+            return {**self._result, "cached": True}
+
+        if self._in_flight is None:
+            self._in_flight = asyncio.create_task(self._run())
+            self._in_flight.add_done_callback(self._finished)
+        # Shielded: one caller disconnecting mustn't cancel everyone's check
+        return {**await asyncio.shield(self._in_flight), "cached": False}
+
+    def _finished(self, task: asyncio.Task):
+        self._in_flight = None
+        if not task.cancelled() and task.exception() is None:
+            self._result = task.result()
+            self._checked_at = time.monotonic()
+
+    async def _run(self) -> Dict[str, Any]:
+        names = list(self.probes)
+        outcomes = await asyncio.gather(*[self._probe(name) for name in names])
+        dependencies = dict(zip(names, outcomes))
+
+        down = {name for name, outcome in dependencies.items() if outcome["status"] != "up"}
+        if down & self.required:
+            status = "not_ready"
+        elif down:
+            status = "degraded"
+        else:
+            status = "ready"
+        return {"status": status, "checked_at": time.time(), "dependencies": dependencies}
+
+    async def _probe(self, name: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        outcome: Dict[str, Any] = {"status": "up", "required": name in self.required}
+        try:
+            await asyncio.wait_for(self.probes[name](), self.timeout)
+        except asyncio.TimeoutError:
+            outcome.update(status="down", error=f"Timed out after {self.timeout}s")
+        except Exception as e:
+            outcome.update(status="down", error=str(e) or type(e).__name__)
+        outcome["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return outcome
+
+
+async def probe_database():
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def probe_redis():
+    if not await cache.ping():
+        raise ProbeFailed("PING failed")
+
+
+async def probe_design_service():
+    # Up if any instance is; reuses the proxy's pooled connections
+    await design_service.probe()
+
+
+# Global health checker instance
+health = HealthChecker(
+    probes={
+        "database": probe_database,
+        "redis": probe_redis,
+        "design_generation": probe_design_service,
+    },
+    required=settings.HEALTH_REQUIRED_DEPENDENCIES,
+    timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS,
+    cache_seconds=settings.HEALTH_CACHE_SECONDS
+)
@@ -0,0 +1,203 @@
+"""
+Structured logging - JSON records written off the event loop by a background thread
+
+`configure_logging()` installs a non-blocking QueueHandler on the root
+logger. Callers only copy the record onto a queue; a QueueListener thread
+formats it as JSON and writes it to stdout, so a burst of errors (a Redis
+outage fails every request) never stalls the event loop on terminal or
+pipe writes. Repeats of the same warning or error from the same call site
+are collapsed within LOG_DEDUP_WINDOW_SECONDS, and every record carries the
+id of the request that produced it.
+"""
+import atexit
+import copy
+import logging
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
+from pythonjsonlogger import jsonlogger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import settings
+from .metrics import LOG_RECORDS_DROPPED, LOG_RECORDS_SUPPRESSED
+
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_REQUEST_ID_LENGTH = 128
+
+JSON_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+
+# Libraries that log every call at INFO (httpx: one line per proxied request)
+QUIET_LOGGERS = ("httpx", "httpcore")
+
+# Id of the request being handled by the current task ("-" outside requests)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the service name and the current request id"""
+
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.service = self.service
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DuplicateFilter(logging.Filter):
+    """
+    Collapse repeated warnings and errors from the same call site
+
+    The first record from a call site is logged; further records from it
+    within the window are dropped and counted. The next record logged after
+    the window closes carries `repeated`, the number that were dropped.
+    Records are keyed on where they were logged, not on their text, so
+    "Redis GET error" with a different exception each time still counts as
+    a repeat. Info and debug records pass through untouched.
+    """
+
+    def __init__(self, window_seconds: float, max_sites: int = 1024):
+        super().__init__()
+        self.window = window_seconds
+        self.max_sites = max_sites
+        self._sites: Dict[Tuple[str, int, int], List[float]] = {}  # site -> [window start, dropped]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.window <= 0 or record.levelno < logging.WARNING:
+            return True
+
+        site = (record.pathname, record.lineno, record.levelno)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sites.get(site)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                LOG_RECORDS_SUPPRESSED.inc()
+                return False
+            if entry is None and len(self._sites) >= self.max_sites:
+                self._sites.clear()
+            self._sites[site] = [now, 0]
+
+        if entry is not None and entry[1]:
+            record.repeated = int(entry[1])
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+
+    _traceback_formatter = logging.Formatter()
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message and traceback now, while the arguments and the
+        # exception are still live, but leave formatting to the listener so
+        # the JSON output keeps separate fields
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = self._traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RequestIdMiddleware:
+    """
+    Give every request an id for its log records
+
+    Uses the caller's X-Request-ID (so ids follow a request from the gateway
+    into the design service) or generates one, and echoes it in the response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")[:MAX_REQUEST_ID_LENGTH]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((REQUEST_ID_HEADER, request_id.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[QueueHandler] = None
+
+
+def configure_logging(service: str):
+    """
+    Route the root logger through the background writer
+
+    Safe to call more than once; only the first call takes effect.
+
+    Args:
+        service: Name stamped on every record (e.g. "gateway")
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    if settings.LOG_FORMAT == "json":
+        formatter = jsonlogger.JsonFormatter(
+            JSON_FORMAT,
+            rename_fields={"asctime": "time", "levelname": "level", "name": "logger"},
+            json_ensure_ascii=False
+        )
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+
+    _handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    _handler.addFilter(DuplicateFilter(settings.LOG_DEDUP_WINDOW_SECONDS))
+    _handler.addFilter(RequestContextFilter(service))
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = QueueListener(_handler.queue, output)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener, _handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_handler)
+    _listener.stop()
+    _listener = _handler = None
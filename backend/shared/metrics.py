@@ -0,0 +1,171 @@
+"""
+Prometheus metrics - HTTP middleware, hot-path timers and the /metrics exposition
+"""
+import os
+import resource
+import sys
+import time
+from typing import Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.responses import Response
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# With PROMETHEUS_MULTIPROC_DIR set (before this module is imported), every
+# worker process writes its samples to mmapped files in that directory and
+# /metrics aggregates all of them, whichever worker serves the scrape.
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Latency buckets from sub-millisecond cache hits up to minute-long LLM calls
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 45.0, 60.0, 120.0)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to send the complete response",
+    ["method", "route"], buckets=HTTP_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled",
+    ["method", "route"], multiprocess_mode="livesum"
+)
+
+# Per-worker gauges; in multiprocess mode each live worker is reported with a pid label
+WORKER_REQUESTS = Gauge(
+    "worker_requests_handled", "Requests handled by this worker since it started",
+    multiprocess_mode="liveall"
+)
+WORKER_MAX_RSS = Gauge(
+    "worker_max_resident_memory_bytes", "Peak resident memory of this worker",
+    multiprocess_mode="liveall"
+)
+
+STARTUP_SECONDS = Gauge(
+    "process_startup_seconds", "Time from process start to serving (imports plus warm-up)",
+    ["phase"], multiprocess_mode="max"
+)
+
+CACHE_LATENCY = Histogram(
+    "cache_operation_duration_seconds", "Redis cache call latency",
+    ["operation"], buckets=FAST_BUCKETS
+)
+CACHE_RESULTS = Counter(
+    "cache_operations_total", "Redis cache calls by result (hit, miss, ok, error)",
+    ["operation", "result"]
+)
+
+DB_SESSION_LATENCY = Histogram(
+    "db_session_duration_seconds", "Lifetime of a request's database session",
+    ["outcome"], buckets=HTTP_BUCKETS
+)
+DB_SESSIONS_IN_FLIGHT = Gauge(
+    "db_sessions_in_flight", "Open database sessions", multiprocess_mode="livesum"
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Time to response headers from an upstream service",
+    ["upstream", "instance", "outcome"], buckets=HTTP_BUCKETS
+)
+
+LLM_LATENCY = Histogram(
+    "agent_llm_invoke_duration_seconds", "Agent language model call latency",
+    ["agent", "outcome"], buckets=LLM_BUCKETS
+)
+LLM_IN_FLIGHT = Gauge(
+    "agent_llm_invocations_in_flight", "Language model calls in progress",
+    ["agent"], multiprocess_mode="livesum"
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full"
+)
+LOG_RECORDS_SUPPRESSED = Counter(
+    "log_records_suppressed_total", "Repeated warnings and errors collapsed by the duplicate filter"
+)
+
+
+def _max_rss_bytes() -> int:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class PrometheusMiddleware:
+    """
+    Per-route request count, latency and in-flight metrics
+
+    Routes are labelled by their path template ("/files/{file_id}"), not
+    the raw path, so label cardinality stays bounded. A plain ASGI
+    middleware: streaming responses pass through untouched and are timed
+    until their last chunk is sent.
+    """
+
+    def __init__(self, app: ASGIApp, skip_paths: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method=method, route=route)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_LATENCY.labels(method=method, route=route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method=method, route=route, status=str(status_code)).inc()
+            in_flight.dec()
+            WORKER_REQUESTS.inc()
+            WORKER_MAX_RSS.set(_max_rss_bytes())
+
+    @staticmethod
+    def _route(scope: Scope) -> str:
+        router = scope.get("app")
+        for route in getattr(router, "routes", ()):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", UNMATCHED_ROUTE)
+        return UNMATCHED_ROUTE
+
+
+def metrics_response() -> Response:
+    """Prometheus text exposition of all metrics (aggregated across workers)"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid: int):
+    """Drop a dead worker's live gauges (call from the process manager)"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
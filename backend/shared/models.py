@@ -1,7 +1,7 @@
 """
 Shared database models
 """
-from sqlalchemy import Column, String, DateTime, Boolean, Float, JSON, ForeignKey
+from sqlalchemy import Column, String, DateTime, Boolean, Float, Integer, JSON, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -98,3 +98,15 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class Upload(Base):
+    """A user's upload; content is stored once per hash, so one object can have many owners"""
+    __tablename__ = "uploads"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id"), primary_key=True)
+    sha256 = Column(String(64), primary_key=True)
+    kind = Column(String(50))  # room-photo, floor-plan, mood-board
+    content_type = Column(String(100))
+    size = Column(Integer)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
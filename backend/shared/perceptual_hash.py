@@ -0,0 +1,271 @@
+"""
+Perceptual image hashing and near-duplicate search
+"""
+import fcntl
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .config import settings
+
+
+HASH_BITS = 64
+
+_DCT_SIZE = 32
+_DCT_KEEP = 8
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so a 2D DCT is two matrix products"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+
+def _bits_to_int(bits: np.ndarray) -> List[int]:
+    """Pack (B, 64) booleans into Python ints, most significant bit first"""
+    packed = np.packbits(bits.astype(np.uint8), axis=1)
+    return [int.from_bytes(row.tobytes(), "big") for row in packed]
+
+
+def phash_batch(gray: np.ndarray) -> List[int]:
+    """
+    DCT perceptual hashes for a batch of 32x32 grayscale images
+
+    Args:
+        gray: (B, 32, 32) array of luminance values
+
+    Returns:
+        64-bit hashes: the 8x8 lowest frequencies thresholded at their median
+    """
+    freq = _DCT @ gray.astype(np.float32) @ _DCT.T
+    low = freq[:, :_DCT_KEEP, :_DCT_KEEP].reshape(len(gray), -1)
+    # The DC term only reflects average brightness; exclude it from the median
+    median = np.median(low[:, 1:], axis=1, keepdims=True)
+    return _bits_to_int(low > median)
+
+
+def dhash_batch(gray: np.ndarray) -> List[int]:
+    """
+    Difference hashes for a batch of 8x9 (rows x cols) grayscale images
+
+    Cheaper than pHash and robust to brightness changes, but less robust
+    to crops and rotation.
+    """
+    g = gray.astype(np.int16)
+    return _bits_to_int((g[:, :, 1:] > g[:, :, :-1]).reshape(len(gray), -1))
+
+
+def load_gray(path: str, size: Tuple[int, int]) -> np.ndarray:
+    """Decode an image to a (height, width) luminance array of the given (width, height)"""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.draft("L", size)
+        return np.asarray(img.convert("L").resize(size, Image.LANCZOS), dtype=np.float32)
+
+
+def phash_file(path: str) -> int:
+    """pHash of an image file"""
+    return phash_batch(load_gray(path, (_DCT_SIZE, _DCT_SIZE))[None])[0]
+
+
+def dhash_file(path: str) -> int:
+    """dHash of an image file"""
+    return dhash_batch(load_gray(path, (9, 8))[None])[0]
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes under Hamming distance
+
+    Children are keyed by their distance to the parent; the triangle
+    inequality lets a radius-k query skip every subtree whose edge distance
+    is outside [d - k, d + k], so lookups touch a small part of the tree.
+    Identical hashes share a node and collect all their ids.
+    """
+
+    def __init__(self):
+        self._hashes: List[int] = []
+        self._ids: List[List[str]] = []
+        self._children: List[Dict[int, int]] = []
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self._ids)
+
+    def add(self, value: int, item_id: str):
+        if not self._hashes:
+            self._new_node(value, item_id)
+            return
+
+        node = 0
+        while True:
+            distance = hamming(value, self._hashes[node])
+            if distance == 0:
+                if item_id not in self._ids[node]:
+                    self._ids[node].append(item_id)
+                return
+            child = self._children[node].get(distance)
+            if child is None:
+                self._children[node][distance] = self._new_node(value, item_id)
+                return
+            node = child
+
+    def _new_node(self, value: int, item_id: str) -> int:
+        self._hashes.append(value)
+        self._ids.append([item_id])
+        self._children.append({})
+        return len(self._hashes) - 1
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[str, int]]:
+        """Find ids whose hash is within max_distance, nearest first"""
+        if not self._hashes:
+            return []
+
+        matches: List[Tuple[str, int]] = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, self._hashes[node])
+            if distance <= max_distance:
+                matches.extend((item_id, distance) for item_id in self._ids[node])
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(
+                child for edge, child in self._children[node].items()
+                if low <= edge <= high
+            )
+        matches.sort(key=lambda match: match[1])
+        return matches
+
+
+class ImageHashIndex:
+    """
+    Persistent near-duplicate index for product and mood-board images
+
+    Inserts are appended to a plain-text log (`<hash hex> <id>` per line) and
+    the tree is rebuilt from it on first use, so the index survives restarts
+    without a separate snapshot step. Every call first reads whatever other
+    processes appended since, so all workers search the same set. Methods
+    read and write the log under a lock, so async callers should run them in
+    a thread (asyncio.to_thread).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.IMAGE_HASH_INDEX_PATH
+        self._reset()
+        self._lock = threading.Lock()
+
+    def _reset(self):
+        self._tree = BKTree()
+        self._hashes: Dict[str, int] = {}  # id -> hash
+        self._offset = 0  # bytes of complete lines read from the log
+
+    def _load(self):
+        """Read lines appended to the log since the last call, by any process"""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if size < self._offset:
+            self._reset()  # the log was replaced; start over
+        if size == self._offset:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # Stop at the last newline: an unterminated final line is either
+        # still being written or was torn by a crash, and must not be read
+        # as an entry with a truncated id
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].decode().splitlines():
+            parts = line.split(maxsplit=1)
+            if len(parts) == 2:
+                self._insert(int(parts[0], 16), parts[1])
+        self._offset += end
+
+    def _insert(self, value: int, item_id: str):
+        self._tree.add(value, item_id)
+        self._hashes[item_id] = value
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._tree)
+
+    def get(self, item_id: str) -> Optional[int]:
+        """Hash stored for an id, or None if it isn't indexed"""
+        with self._lock:
+            self._load()
+            return self._hashes.get(item_id)
+
+    def add(self, value: int, item_id: str):
+        """Insert a hash and append it to the on-disk log"""
+        with self._lock:
+            self._load()
+            self._append(value, item_id)
+
+    def _append(self, value: int, item_id: str):
+        if any(c.isspace() for c in item_id):
+            raise ValueError(f"Item id must not contain whitespace: {item_id!r}")
+        if self._hashes.get(item_id) == value:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a+b") as f:
+            # Appends from every process take this lock, so an unterminated
+            # tail seen while holding it can only be left by a dead writer
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                size = f.seek(0, os.SEEK_END)
+                if size > self._offset:
+                    f.seek(self._offset)
+                    tail = f.read()
+                    if not tail.endswith(b"\n"):
+                        # Cut the torn line so this entry isn't glued onto it
+                        size = self._offset + tail.rfind(b"\n") + 1
+                        f.truncate(size)
+                f.write(f"{value:016x} {item_id}\n".encode())
+                f.flush()
+                end = f.tell()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        if size == self._offset:
+            self._offset = end  # nothing unread came before this line
+        self._insert(value, item_id)
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[str, int]]:
+        """Find (id, distance) pairs within max_distance of a hash"""
+        with self._lock:
+            self._load()
+            return self._tree.search(value, max_distance)
+
+    def search_and_add(self, value: int, item_id: str, max_distance: int) -> List[Tuple[str, int]]:
+        """
+        Find near duplicates of a hash, then insert it
+
+        Both happen under one lock hold, so async callers need a single
+        thread hop per upload.
+
+        Returns:
+            (id, distance) pairs found before the insert, nearest first
+        """
+        with self._lock:
+            self._load()
+            matches = self._tree.search(value, max_distance)
+            self._append(value, item_id)
+            return matches
+
+
+# Global image hash index
+image_index = ImageHashIndex()
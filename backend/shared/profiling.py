@@ -0,0 +1,294 @@
+"""
+On-demand request profiling - sampled async stacks written as flamegraph files
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import settings
+from .metrics import PrometheusMiddleware
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+PROFILE_SUFFIXES = (".speedscope.json", ".collapsed")
+
+Frame = Tuple[str, str, int]  # (name, file, first line)
+
+
+def create_profile_token(ttl_seconds: Optional[int] = None) -> Tuple[str, int]:
+    """
+    Signed value for the X-Profile header
+
+    Returns:
+        (token, expiry as a Unix timestamp)
+    """
+    expires_at = int(time.time()) + (ttl_seconds or settings.PROFILER_TOKEN_TTL_SECONDS)
+    return f"{expires_at}.{_signature(expires_at)}", expires_at
+
+
+def verify_profile_token(token: str) -> bool:
+    expires_at, _, signature = token.partition(".")
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(int(expires_at)))
+
+
+def _signature(expires_at: int) -> str:
+    message = f"profile:{expires_at}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{code.co_qualname}", code.co_filename, code.co_firstlineno
+
+
+def _coroutine_frames(coro) -> List[Any]:
+    """Frames of a coroutine and everything it is awaiting, outermost first"""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+
+class _Session:
+    def __init__(self, label: str, task: asyncio.Task, loop: asyncio.AbstractEventLoop):
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.label = label
+        self.task = task
+        self.loop = loop
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self.last_sample = self.started
+        self.samples: List[Tuple[Tuple[Frame, ...], float]] = []
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampler for the asyncio tasks serving profiled requests
+
+    A background thread wakes every interval and, for each profiled
+    request, walks its task's await chain (so time spent waiting on the
+    database or an LLM shows up, not just CPU time). Tasks the request is
+    waiting on (gather children, awaited tasks) are followed across the
+    boundary, marked by a "[task name]" frame. When one of those tasks is
+    running on the event loop at that instant, the synchronous frames it
+    is executing are appended too. The thread only runs while at least one
+    request is being profiled.
+    """
+
+    def __init__(self, interval_ms: float, max_samples: int):
+        self.interval = interval_ms / 1000
+        self.max_samples = max_samples
+        self._sessions: Dict[str, _Session] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, label: str) -> _Session:
+        """Begin sampling the current task"""
+        session = _Session(label, asyncio.current_task(), asyncio.get_running_loop())
+        with self._lock:
+            self._sessions[session.id] = session
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        return session
+
+    def stop(self, session: _Session) -> _Session:
+        with self._lock:
+            self._sessions.pop(session.id, None)
+        return session
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                sessions = list(self._sessions.values())
+                if not sessions:
+                    self._thread = None
+                    return
+            thread_frames = sys._current_frames()
+            for session in sessions:
+                now = time.perf_counter()
+                if len(session.samples) < self.max_samples:
+                    try:
+                        stack = self._stack(session, thread_frames.get(session.thread_id))
+                    except Exception:
+                        continue  # the task changed under us mid-walk; skip this sample
+                    session.samples.append((stack, (now - session.last_sample) * 1000))
+                session.last_sample = now
+
+    def _stack(self, session: _Session, thread_frame) -> Tuple[Frame, ...]:
+        running = asyncio.tasks._current_tasks.get(session.loop)
+        stack: List[Frame] = [(session.label, "", 0)]
+        task: Optional[asyncio.Future] = session.task
+        seen = set()
+
+        while isinstance(task, asyncio.Task) and id(task) not in seen:
+            seen.add(id(task))
+            frames = _coroutine_frames(task.get_coro())
+            stack.extend(_frame_key(frame) for frame in frames)
+            if task is running and frames and thread_frame is not None:
+                stack.extend(self._running_frames(frames[-1], thread_frame))
+                break
+
+            waiter = getattr(task, "_fut_waiter", None)
+            children = getattr(waiter, "_children", None)
+            if isinstance(waiter, asyncio.Task):
+                task = waiter
+            elif children:
+                # gather(): follow the child that is running, else the first unfinished one
+                pending = [child for child in children if not child.done()]
+                task = running if running in pending else (pending[0] if pending else None)
+            else:
+                break
+            if isinstance(task, asyncio.Task):
+                stack.append((f"[task {task.get_name()}]", "", 0))
+        return tuple(stack)
+
+    @staticmethod
+    def _running_frames(innermost_coroutine_frame, thread_frame) -> List[Frame]:
+        """Synchronous frames the event loop thread is executing inside a coroutine"""
+        frames = []
+        frame = thread_frame
+        while frame is not None and frame is not innermost_coroutine_frame:
+            frames.append(frame)
+            frame = frame.f_back
+        if frame is None:
+            return []  # not inside this coroutine after all
+        return [_frame_key(frame) for frame in reversed(frames)]
+
+    def write(self, session: _Session, output_format: str, directory: str) -> str:
+        """
+        Write a session's samples as speedscope JSON or collapsed stacks; returns the path
+
+        The oldest profiles in the directory are then deleted to keep it
+        within PROFILER_MAX_FILES and PROFILER_MAX_BYTES.
+        """
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", session.label).strip("-")[:60]
+        if output_format == "collapsed":
+            path = os.path.join(directory, f"{session.id}-{slug}.collapsed")
+            counts: Dict[str, float] = {}
+            for stack, weight_ms in session.samples:
+                key = ";".join(name.replace(";", ":") for name, _, _ in stack)
+                counts[key] = counts.get(key, 0.0) + weight_ms
+            body = "".join(f"{key} {max(round(ms), 1)}\n" for key, ms in counts.items())
+        else:
+            path = os.path.join(directory, f"{session.id}-{slug}.speedscope.json")
+            body = json.dumps(self._speedscope(session))
+
+        with open(path, "w") as f:
+            f.write(body)
+        prune_profiles(directory, settings.PROFILER_MAX_FILES, settings.PROFILER_MAX_BYTES)
+        return path
+
+    @staticmethod
+    def _speedscope(session: _Session) -> Dict[str, Any]:
+        frame_index: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, weight_ms in session.samples:
+            samples.append([frame_index.setdefault(frame, len(frame_index)) for frame in stack])
+            weights.append(round(weight_ms, 3))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": session.label,
+            "exporter": settings.APP_NAME,
+            "shared": {"frames": [
+                {"name": name, "file": file, "line": line} if file else {"name": name}
+                for name, file, line in frame_index
+            ]},
+            "profiles": [{
+                "type": "sampled",
+                "name": session.label,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+
+
+def prune_profiles(directory: str, max_files: int, max_bytes: int):
+    """Delete the oldest profile files until the directory is within both limits"""
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(PROFILE_SUFFIXES):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue  # pruned by another worker
+            profiles.append((stat.st_mtime, stat.st_size, entry.path))
+
+    profiles.sort(reverse=True)  # newest first
+    kept, kept_bytes = 0, 0
+    for _, size, path in profiles:
+        if kept < max_files and kept_bytes + size <= max_bytes:
+            kept, kept_bytes = kept + 1, kept_bytes + size
+            continue
+        max_files = kept  # over a limit: delete everything older too
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class ProfilerMiddleware:
+    """
+    Profile a request when asked to (signed X-Profile header) or at random
+
+    Requests without the header cost one header scan and, only when a
+    sample rate is configured, one random() call. Profiled responses carry
+    an X-Profile-Id header naming the file written to PROFILER_OUTPUT_DIR.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.PROFILER_ENABLED or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        label = f"{scope['method']} {PrometheusMiddleware._route(scope)}"
+        session = profiler.start(label)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((PROFILE_ID_HEADER, session.id.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop(session)
+            await asyncio.to_thread(
+                profiler.write, session, settings.PROFILER_FORMAT, settings.PROFILER_OUTPUT_DIR
+            )
+
+    @staticmethod
+    def _wanted(scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return verify_profile_token(value.decode("latin-1"))
+        rate = settings.PROFILER_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+
+# Global profiler instance
+profiler = SamplingProfiler(settings.PROFILER_INTERVAL_MS, settings.PROFILER_MAX_SAMPLES)
@@ -0,0 +1,299 @@
+"""
+Plan quotas - per-tenant rate limits and monthly allowances by subscription tier
+
+Each check is a single Lua script on Redis, so reading, updating and
+expiring the counter is atomic and costs one round trip (EVALSHA). Two
+kinds of limit are supported:
+
+- Token buckets for request rates (API calls per minute): `capacity`
+  tokens, refilled continuously, one spent per call.
+- Fixed quotas for allowances per calendar month (design generations),
+  charged up front and refunded if the work then fails.
+
+In front of Redis sits a per-process pre-filter. It remembers what Redis
+last reported for each tenant and lets the bucket drain locally at the
+refill rate; a request it can prove would be rejected (other processes only
+ever spend more tokens) is turned away without a Redis call, so a client
+hammering past its limit costs nothing upstream. Monthly quotas reported
+as used up are also rejected locally, but only for a few seconds, since a
+refund in another process can free them again. When Redis is
+unreachable, checks fail open.
+"""
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from fastapi import Depends, HTTPException, Request, Response, status
+from .auth import get_current_tenant
+from .cache import RedisCache, cache
+from .config import settings
+
+# KEYS[1] bucket; ARGV: capacity, refill per second, cost.
+# Returns {allowed, tokens left, ms until full}; uses the server clock so
+# gateways with skewed clocks agree.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+if capacity <= 0 or rate <= 0 then
+    return {0, "0", 0}  -- a zero limit blocks the plan outright
+end
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate / 1000)
+
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+
+local full_in_ms = math.ceil((capacity - tokens) * 1000 / rate)
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated", now)
+redis.call("PEXPIRE", KEYS[1], full_in_ms + 1000)
+return {allowed, tostring(tokens), full_in_ms}
+"""
+
+# KEYS[1] counter for the period; ARGV: limit, cost, seconds to keep the key.
+# Returns {allowed, used}
+FIXED_QUOTA_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local used = tonumber(redis.call("GET", KEYS[1]) or "0")
+if used + cost > limit then
+    return {0, used}
+end
+used = redis.call("INCRBY", KEYS[1], cost)
+if used == cost then
+    redis.call("EXPIRE", KEYS[1], ARGV[3])
+end
+return {1, used}
+"""
+
+# KEYS[1] counter for the period; ARGV: cost. Gives back units charged by
+# FIXED_QUOTA_SCRIPT (never below zero). Returns the new usage.
+REFUND_SCRIPT = """
+local used = tonumber(redis.call("GET", KEYS[1]) or "0")
+local refund = math.min(tonumber(ARGV[1]), used)
+if refund <= 0 then
+    return used
+end
+return redis.call("DECRBY", KEYS[1], refund)
+"""
+
+
+class QuotaDecision:
+    """Outcome of a quota check, with the response headers that describe it"""
+
+    def __init__(
+        self,
+        allowed: bool,
+        limit: int,
+        remaining: Optional[float],
+        reset_seconds: Optional[float],
+        retry_after: Optional[float] = None,
+        header_prefix: str = "RateLimit",
+        key: Optional[str] = None
+    ):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_seconds = reset_seconds
+        self.retry_after = retry_after
+        self.header_prefix = header_prefix
+        self.key = key  # counter that was charged, for refunds (None if nothing was)
+
+    def headers(self) -> Dict[str, str]:
+        """X-<prefix>-Limit/-Remaining/-Reset, plus Retry-After when rejected"""
+        prefix = f"X-{self.header_prefix}"
+        headers = {f"{prefix}-Limit": str(self.limit)}
+        if self.remaining is not None:
+            headers[f"{prefix}-Remaining"] = str(max(int(self.remaining), 0))
+        if self.reset_seconds is not None:
+            headers[f"{prefix}-Reset"] = str(max(math.ceil(self.reset_seconds), 0))
+        if not self.allowed and self.retry_after is not None:
+            headers["Retry-After"] = str(max(math.ceil(self.retry_after), 1))
+        return headers
+
+
+def _tier_value(limits: Dict[str, int], tier: str) -> int:
+    # Unknown tiers get the smallest plan, as the scheduler does
+    return limits.get(tier, min(limits.values(), default=0))
+
+
+def _month_window(now: datetime) -> Tuple[str, float]:
+    """Current calendar month (UTC) as a key suffix, and seconds until it ends"""
+    if now.month == 12:
+        next_month = now.replace(year=now.year + 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    else:
+        next_month = now.replace(month=now.month + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    return now.strftime("%Y%m"), (next_month - now).total_seconds()
+
+
+class QuotaEnforcer:
+    """
+    Token-bucket and fixed-quota checks against Redis with a local pre-filter
+
+    The pre-filter keeps, per bucket, the level (capacity minus tokens) that
+    Redis last reported, drained at the refill rate since. Other processes
+    can only have spent more, so if the drained level still leaves too few
+    tokens the request is rejected locally. Fixed quotas reported as used up
+    are remembered for `exhausted_seconds` (refunds can reopen them, so this
+    stays short). Both tables are LRU-bounded.
+    """
+
+    def __init__(self, redis_cache: RedisCache, local_entries: int, exhausted_seconds: float):
+        self.cache = redis_cache
+        self.local_entries = local_entries
+        self.exhausted_seconds = exhausted_seconds
+        self._levels: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (level, at)
+        self._exhausted: "OrderedDict[str, float]" = OrderedDict()  # key -> recheck after (monotonic)
+        self.local_rejections = 0
+
+    def _remember(self, table: OrderedDict, key: str, value):
+        table[key] = value
+        table.move_to_end(key)
+        if len(table) > self.local_entries:
+            table.popitem(last=False)
+
+    async def take(self, name: str, tenant_id: str, capacity: int, per_second: float, cost: int = 1) -> QuotaDecision:
+        """
+        Spend `cost` tokens from a tenant's bucket
+
+        Args:
+            name: Limit name, part of the Redis key
+            tenant_id: Tenant (user) id
+            capacity: Bucket size (the largest burst)
+            per_second: Refill rate
+            cost: Tokens this request needs
+
+        Returns:
+            The decision; X-RateLimit-Limit reports the refill per minute.
+            A zero capacity or rate blocks every request.
+        """
+        key = f"ratelimit:{name}:{tenant_id}"
+        limit = round(per_second * 60)
+        now = time.monotonic()
+        if capacity <= 0 or per_second <= 0:
+            return QuotaDecision(False, limit, 0, None)
+
+        local = self._levels.get(key)
+        if local is not None:
+            level = max(local[0] - (now - local[1]) * per_second, 0.0)
+            if level + cost > capacity:
+                self.local_rejections += 1
+                return QuotaDecision(
+                    False, limit, capacity - level, level / per_second,
+                    retry_after=(level + cost - capacity) / per_second
+                )
+
+        result = await self.cache.run_script(TOKEN_BUCKET_SCRIPT, [key], [capacity, per_second, cost])
+        if result is None:
+            return QuotaDecision(True, limit, None, None)  # Redis down: fail open
+
+        allowed, tokens, full_in_ms = int(result[0]), float(result[1]), int(result[2])
+        self._remember(self._levels, key, (capacity - tokens, now))
+        return QuotaDecision(
+            bool(allowed), limit, tokens, full_in_ms / 1000,
+            retry_after=None if allowed else (cost - tokens) / per_second
+        )
+
+    async def consume(self, name: str, tenant_id: str, limit: int, cost: int = 1) -> QuotaDecision:
+        """
+        Use `cost` units of a tenant's allowance for the current calendar month (UTC)
+
+        Returns:
+            The decision, reported with X-Quota-* headers. When allowed, its
+            `key` can be passed to refund() if the work doesn't happen.
+        """
+        period, reset_seconds = _month_window(datetime.now(timezone.utc))
+        key = f"quota:{name}:{tenant_id}:{period}"
+        now = time.monotonic()
+
+        if self._exhausted.get(key, 0.0) > now:
+            self.local_rejections += 1
+            return QuotaDecision(False, limit, 0, reset_seconds, reset_seconds, header_prefix="Quota")
+
+        # Keep the counter a day past the period so a skewed clock can't reopen it
+        ttl = math.ceil(reset_seconds) + 86400
+        result = await self.cache.run_script(FIXED_QUOTA_SCRIPT, [key], [limit, cost, ttl])
+        if result is None:
+            return QuotaDecision(True, limit, None, reset_seconds, header_prefix="Quota")
+
+        allowed, used = int(result[0]), int(result[1])
+        if used >= limit:
+            self._remember(self._exhausted, key, now + min(self.exhausted_seconds, reset_seconds))
+        return QuotaDecision(
+            bool(allowed), limit, limit - used, reset_seconds,
+            retry_after=None if allowed else reset_seconds, header_prefix="Quota",
+            key=key if allowed else None
+        )
+
+    async def refund(self, decision: QuotaDecision, cost: int = 1):
+        """
+        Give back units charged by consume(), e.g. when the request then failed
+
+        The refund goes to the period that was charged, even if a new month
+        has started since.
+        """
+        if decision.key is None:
+            return  # rejected, or Redis was down and nothing was charged
+        key, decision.key = decision.key, None
+        self._exhausted.pop(key, None)
+        await self.cache.run_script(REFUND_SCRIPT, [key], [cost])
+
+    async def api_call(self, tenant_id: str, tier: str) -> QuotaDecision:
+        """Charge one API call against the tier's per-minute rate limit"""
+        per_minute = _tier_value(settings.API_RATE_LIMIT_PER_MINUTE, tier)
+        burst = _tier_value(settings.API_RATE_LIMIT_BURST, tier)
+        return await self.take("api", tenant_id, burst, per_minute / 60)
+
+    async def design_generation(self, tenant_id: str, tier: str) -> QuotaDecision:
+        """Charge one design generation against the tier's monthly allowance"""
+        return await self.consume("design_generations", tenant_id, _tier_value(settings.DESIGN_GENERATIONS_PER_MONTH, tier))
+
+
+def apply_quota(request: Request, response: Response, decision: QuotaDecision, detail: str):
+    """
+    Attach a decision's headers to the response, or reject the request
+
+    Headers are also kept on `request.state.quota_headers` for endpoints
+    that build their own Response (e.g. streaming).
+
+    Raises:
+        HTTPException: 429 with the same headers when the decision is a rejection
+    """
+    headers = decision.headers()
+    if not decision.allowed:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=detail, headers=headers)
+    response.headers.update(headers)
+    request.state.quota_headers = {**getattr(request.state, "quota_headers", {}), **headers}
+
+
+async def enforce_rate_limit(
+    request: Request,
+    response: Response,
+    tenant: Dict[str, str] = Depends(get_current_tenant)
+) -> Dict[str, str]:
+    """
+    Dependency that charges the caller one API call against their tier's rate limit
+
+    Returns:
+        The caller's tenant (user id and tier)
+
+    Raises:
+        HTTPException: 429 when the rate limit is exhausted
+    """
+    if settings.QUOTAS_ENABLED:
+        decision = await quotas.api_call(tenant["user_id"], tenant["tier"])
+        apply_quota(request, response, decision, "API rate limit exceeded for your plan")
+    return tenant
+
+
+# Global quota enforcer instance
+quotas = QuotaEnforcer(cache, settings.QUOTA_LOCAL_ENTRIES, settings.QUOTA_EXHAUSTED_CACHE_SECONDS)
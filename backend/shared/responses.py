@@ -0,0 +1,270 @@
+"""
+HTTP response helpers - compression, ETags and cached JSON representations
+"""
+import hashlib
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+import orjson
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def make_etag(body: bytes) -> str:
+    """Weak ETag for a serialized body (weak: compression changes the bytes on the wire)"""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def _is_compressible(content_type: str) -> bool:
+    content_type = content_type.split(";")[0].strip().lower()
+    return content_type.endswith("+json") or content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported content coding the client accepts (br, then gzip)"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip()] = q
+    for coding in ("br", "gzip") if brotli is not None else ("gzip",):
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """Compress a chunk; non-final chunks are flushed so streams aren't held back"""
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    Brotli/gzip response compression above a size threshold
+
+    Only text-like content types are compressed (images and archives are
+    already compressed). Complete bodies smaller than `minimum_size` are
+    sent as-is; streamed bodies are compressed chunk by chunk and flushed
+    after each one, so NDJSON lines still reach the client immediately.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if (
+                    "content-encoding" in headers
+                    or not _is_compressible(headers.get("content-type", ""))
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers and not headers["etag"].startswith("W/"):
+                    headers["ETag"] = "W/" + headers["etag"]
+                del headers["content-length"]
+                body = compressor.compress(body, final=not more_body)
+                if not more_body:
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+            else:
+                body = compressor.compress(body, final=not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class ETagMiddleware:
+    """
+    ETags and 304s for complete GET responses
+
+    A 200 response whose body is sent in one piece and that has no ETag
+    yet gets one from a hash of its body; if it matches `If-None-Match`
+    the body is replaced with an empty 304. This saves bandwidth for any
+    endpoint; endpoints that want to skip serialization as well use
+    `representations.respond()`, which sets its own ETag.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            if start["status"] != 200 or message.get("more_body", False) or "etag" in headers:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            etag = make_etag(message.get("body", b""))
+            if etag_matches(if_none_match, etag):
+                await send({"type": "http.response.start", "status": 304, "headers": [
+                    (key, value) for key, value in start["headers"]
+                    if key.lower() not in (b"content-length", b"content-type")
+                ] + [(b"etag", etag.encode("latin-1"))]})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            headers["ETag"] = etag
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class RepresentationCache:
+    """
+    Serialized JSON bodies and their ETags, keyed by resource version
+
+    Keys must change whenever the resource does (e.g. include its
+    `updated_at`), so a cached body is never stale. A conditional request
+    whose ETag matches gets a 304, and any other hit is served from the
+    cached bytes: either way the payload is not serialized again.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str, bytes]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, etag, body = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return etag, body
+
+    def put(self, key: str, payload: Any) -> Tuple[str, bytes]:
+        body = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        etag = make_etag(body)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, etag, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return etag, body
+
+    async def respond(self, request: Request, key: str, build: Callable[[], Awaitable[Any]]) -> Response:
+        """
+        JSON response for a resource version, built only on a cache miss
+
+        Args:
+            request: Incoming request (for If-None-Match)
+            key: Resource identity and version
+            build: Coroutine function producing the JSON-serializable payload
+
+        Returns:
+            304 if the client's copy is current, otherwise the JSON body
+        """
+        cached = self.get(key)
+        if cached is None:
+            cached = self.put(key, await build())
+        etag, body = cached
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+
+
+# Global representation cache
+representations = RepresentationCache(
+    settings.REPRESENTATION_CACHE_SIZE,
+    settings.REPRESENTATION_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,218 @@
+"""
+Tier-aware fair scheduler for expensive jobs (design generation, image processing)
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+from .config import settings
+
+
+class QueueFull(Exception):
+    """Raised when a tenant already has too many jobs waiting"""
+
+
+class TierStats:
+    """Rolling queue-time statistics for one subscription tier"""
+
+    def __init__(self, window: int, slo_ms: Optional[float]):
+        self.slo_ms = slo_ms
+        self._waits_ms: Deque[float] = deque(maxlen=window)
+        self.started = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.slo_met = 0
+
+    def record_wait(self, wait_ms: float):
+        self._waits_ms.append(wait_ms)
+        self.started += 1
+        if self.slo_ms is None or wait_ms <= self.slo_ms:
+            self.slo_met += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._waits_ms:
+            return None
+        ordered = sorted(self._waits_ms)
+        return ordered[int(pct / 100 * (len(ordered) - 1))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "started": self.started,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "queue_wait_p50_ms": round(p50, 1) if p50 is not None else None,
+            "queue_wait_p95_ms": round(p95, 1) if p95 is not None else None,
+            "queue_slo_ms": self.slo_ms,
+            "slo_attainment": round(self.slo_met / self.started, 4) if self.started else None
+        }
+
+
+class _Tenant:
+    def __init__(self, tenant_id: str, tier: str):
+        self.tenant_id = tenant_id
+        self.tier = tier
+        self.queue: Deque["_Job"] = deque()
+        self.running = 0
+        self.last_finish = 0.0
+
+
+class _Job:
+    def __init__(self, tenant: _Tenant, tier: str, start: float, finish: float, future: asyncio.Future):
+        self.tenant = tenant
+        self.tier = tier
+        self.start_tag = start
+        self.finish_tag = finish
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class TierScheduler:
+    """
+    Weighted fair queuing across tenants, weighted by subscription tier
+
+    Each tenant has its own FIFO queue. A job's virtual finish tag is
+    `max(virtual time, tenant's previous finish) + cost / tier weight`, and
+    the free slot always goes to the waiting job with the smallest tag, so
+    a tenant with 500 queued jobs only delays others by its fair share and
+    higher tiers get proportionally more throughput. Tenants are also
+    capped at a per-tier number of concurrent jobs, and queue waits are
+    tracked per tier against a queue-time SLO.
+
+    Runs inside one event loop; each service process has its own instance.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        capacity: int,
+        weights: Optional[Dict[str, float]] = None,
+        tenant_limits: Optional[Dict[str, int]] = None,
+        slo_ms: Optional[Dict[str, float]] = None,
+        max_queued_per_tenant: Optional[int] = None
+    ):
+        self.name = name
+        self.capacity = capacity
+        self.weights = weights or settings.SCHEDULER_TIER_WEIGHTS
+        self.tenant_limits = tenant_limits or settings.SCHEDULER_TENANT_CONCURRENCY
+        self.slo_ms = slo_ms or settings.SCHEDULER_QUEUE_SLO_MS
+        self.max_queued_per_tenant = max_queued_per_tenant or settings.SCHEDULER_MAX_QUEUED_PER_TENANT
+        self._tenants: Dict[str, _Tenant] = {}
+        self._virtual_time = 0.0
+        self._running = 0
+        self._stats: Dict[str, TierStats] = {}
+
+    def _tier_stats(self, tier: str) -> TierStats:
+        if tier not in self._stats:
+            self._stats[tier] = TierStats(settings.SCHEDULER_STATS_WINDOW, self.slo_ms.get(tier))
+        return self._stats[tier]
+
+    def _limit(self, tenant: _Tenant) -> int:
+        return self.tenant_limits.get(tenant.tier, min(self.tenant_limits.values(), default=1))
+
+    @property
+    def queued(self) -> int:
+        return sum(len(tenant.queue) for tenant in self._tenants.values())
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    async def acquire(self, tenant_id: str, tier: str, cost: float = 1.0) -> _Job:
+        """
+        Wait for a slot
+
+        Args:
+            tenant_id: Who the work is for (user or organization id)
+            tier: The tenant's subscription tier
+            cost: Relative size of the job (1.0 = a typical request)
+
+        Returns:
+            Handle to pass to release()
+
+        Raises:
+            QueueFull: If the tenant already has too many jobs waiting
+        """
+        tenant = self._tenants.get(tenant_id)
+        if tenant is None:
+            tenant = self._tenants[tenant_id] = _Tenant(tenant_id, tier)
+        tenant.tier = tier
+        if len(tenant.queue) >= self.max_queued_per_tenant:
+            self._tier_stats(tier).rejected += 1
+            raise QueueFull(f"Too many queued {self.name} jobs")
+
+        weight = self.weights.get(tier, min(self.weights.values(), default=1.0))
+        start = max(self._virtual_time, tenant.last_finish)
+        tenant.last_finish = start + cost / weight
+        job = _Job(tenant, tier, start, tenant.last_finish, asyncio.get_running_loop().create_future())
+        tenant.queue.append(job)
+        self._dispatch()
+
+        try:
+            await job.future
+        except asyncio.CancelledError:
+            if job.future.done() and not job.future.cancelled():
+                self.release(job)  # granted just as the caller gave up
+            else:
+                tenant.queue.remove(job)
+                self._tier_stats(tier).cancelled += 1
+                self._forget(tenant)
+            raise
+        return job
+
+    def release(self, job: _Job):
+        """Return a slot and start the next job"""
+        self._running -= 1
+        job.tenant.running -= 1
+        self._forget(job.tenant)
+        self._dispatch()
+
+    def _forget(self, tenant: _Tenant):
+        # Idle tenants are dropped; a returning tenant starts at the current
+        # virtual time, so idling doesn't bank credit
+        if not tenant.queue and not tenant.running:
+            self._tenants.pop(tenant.tenant_id, None)
+
+    def _dispatch(self):
+        while self._running < self.capacity:
+            best: Optional[_Tenant] = None
+            for tenant in self._tenants.values():
+                if tenant.queue and tenant.running < self._limit(tenant):
+                    if best is None or tenant.queue[0].finish_tag < best.queue[0].finish_tag:
+                        best = tenant
+            if best is None:
+                return
+
+            job = best.queue.popleft()
+            self._virtual_time = max(self._virtual_time, job.start_tag)
+            self._running += 1
+            best.running += 1
+            self._tier_stats(job.tier).record_wait((time.monotonic() - job.enqueued_at) * 1000)
+            job.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, tenant_id: str, tier: str, cost: float = 1.0) -> AsyncIterator[None]:
+        """Run a block of work once the scheduler grants a slot"""
+        job = await self.acquire(tenant_id, tier, cost)
+        try:
+            yield
+        finally:
+            self.release(job)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current load and per-tier queue-time metrics"""
+        queued_by_tier: Dict[str, int] = {}
+        for tenant in self._tenants.values():
+            queued_by_tier[tenant.tier] = queued_by_tier.get(tenant.tier, 0) + len(tenant.queue)
+        return {
+            "name": self.name,
+            "capacity": self.capacity,
+            "running": self._running,
+            "queued": self.queued,
+            "active_tenants": len(self._tenants),
+            "tiers": {
+                tier: {**stats.snapshot(), "queued": queued_by_tier.get(tier, 0)}
+                for tier, stats in self._stats.items()
+            }
+        }
@@ -0,0 +1,112 @@
+"""
+Content-addressed file storage for uploads
+"""
+import hashlib
+import os
+import re
+import uuid
+from typing import AsyncIterator, Optional
+import aiofiles
+import aiofiles.os
+from .config import settings
+
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadTooLarge(Exception):
+    """Raised as soon as a streamed upload exceeds the size limit"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds maximum size of {limit} bytes")
+        self.limit = limit
+
+
+class StoredFile:
+    """Result of storing an upload"""
+
+    def __init__(self, sha256: str, size: int, path: str, deduplicated: bool):
+        self.sha256 = sha256
+        self.size = size
+        self.path = path
+        self.deduplicated = deduplicated
+
+
+def object_path(sha256: str) -> str:
+    """
+    Get the on-disk path for a content hash
+
+    Objects are fanned out by the first two hex characters so no single
+    directory grows too large.
+    """
+    if not SHA256_PATTERN.match(sha256):
+        raise ValueError(f"Invalid content hash: {sha256}")
+    return os.path.join(settings.UPLOAD_DIR, "objects", sha256[:2], sha256)
+
+
+async def object_exists(sha256: str) -> bool:
+    """Check whether content with this hash is already stored"""
+    return await aiofiles.os.path.exists(object_path(sha256))
+
+
+async def store_stream(
+    chunks: AsyncIterator[bytes],
+    max_size: Optional[int] = None
+) -> StoredFile:
+    """
+    Stream chunks to disk while hashing them, then store by content hash
+
+    The data goes to a temporary file in the upload directory and is never
+    held in memory as a whole. The upload is aborted as soon as it passes
+    `max_size`. When the hash matches an existing object, the temporary file
+    is discarded and the existing object is referenced instead.
+
+    Args:
+        chunks: Async iterator of byte chunks
+        max_size: Size limit in bytes (defaults to MAX_UPLOAD_SIZE)
+
+    Returns:
+        StoredFile describing the stored object
+
+    Raises:
+        UploadTooLarge: If the stream exceeds max_size
+    """
+    limit = max_size or settings.MAX_UPLOAD_SIZE
+    tmp_dir = os.path.join(settings.UPLOAD_DIR, "tmp")
+    await aiofiles.os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as f:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > limit:
+                    raise UploadTooLarge(limit)
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        await _remove_quietly(tmp_path)
+        raise
+
+    sha256 = digest.hexdigest()
+    final_path = object_path(sha256)
+
+    if await aiofiles.os.path.exists(final_path):
+        await _remove_quietly(tmp_path)
+        return StoredFile(sha256, size, final_path, deduplicated=True)
+
+    await aiofiles.os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    # Atomic on the same filesystem; a concurrent identical upload just overwrites equal bytes
+    await aiofiles.os.replace(tmp_path, final_path)
+    return StoredFile(sha256, size, final_path, deduplicated=False)
+
+
+async def _remove_quietly(path: str):
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,235 @@
+"""
+Upstream service client - pooled keep-alive connections, load balancing and retries
+"""
+import asyncio
+import importlib.util
+import logging
+import random
+import time
+from typing import Dict, List, Mapping, Optional
+import httpx
+from .config import settings
+from .metrics import UPSTREAM_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# Methods that can be safely sent twice
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Upstream statuses worth retrying on another instance
+RETRYABLE_STATUSES = {502, 503, 504}
+
+# Errors where the request never reached the upstream, so any method can be retried
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Of those, the ones that say the instance is unhealthy. A PoolTimeout only
+# means this gateway's own connection pool was exhausted, so it's retried
+# without ejecting anything.
+EJECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when no upstream instance could serve a request"""
+
+
+class _Instance:
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.ejected_until = 0.0
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Response body that counts as in flight on its instance until closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, instance: _Instance):
+        self._stream = stream
+        self._instance = instance
+        self._open = True
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        if self._open:
+            self._open = False
+            self._instance.outstanding -= 1
+        await self._stream.aclose()
+
+
+class UpstreamPool:
+    """
+    Client for a service running as several identical instances
+
+    All instances share one `httpx.AsyncClient`, so connections stay open
+    between requests (HTTP/2 when the `h2` package is installed and the
+    upstream negotiates it over TLS). Each request goes to the available
+    instance with the fewest requests in flight; an instance that refuses
+    connections or answers 502/503/504 is ejected for a short while.
+    Failures are retried on another instance: always if the request was
+    never sent, otherwise only for idempotent methods.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        urls: List[str],
+        timeout: httpx.Timeout,
+        limits: httpx.Limits,
+        retries: int,
+        eject_seconds: float
+    ):
+        if not urls:
+            raise ValueError(f"No instances configured for upstream {name}")
+        self.name = name
+        self.instances = [_Instance(url) for url in urls]
+        self.timeout = timeout
+        self.limits = limits
+        self.retries = retries
+        self.eject_seconds = eject_seconds
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                limits=self.limits
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _pick(self, exclude: List[_Instance]) -> _Instance:
+        now = time.monotonic()
+        candidates = [i for i in self.instances if i not in exclude and i.ejected_until <= now]
+        if not candidates:
+            # Everything is ejected or already tried: any instance beats failing outright
+            candidates = [i for i in self.instances if i not in exclude] or self.instances
+        fewest = min(i.outstanding for i in candidates)
+        return random.choice([i for i in candidates if i.outstanding == fewest])
+
+    def _eject(self, instance: _Instance):
+        logger.warning("Ejecting %s instance %s for %.0fs", self.name, instance.url, self.eject_seconds)
+        instance.ejected_until = time.monotonic() + self.eject_seconds
+
+    async def send(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Mapping[str, str]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        content: Optional[bytes] = None
+    ) -> httpx.Response:
+        """
+        Send a request and return the response with its body unread
+
+        The caller must `aclose()` the response (StreamingResponse does
+        this via a background task) to return the connection to the pool.
+
+        Args:
+            method: HTTP method
+            path: Path on the upstream, starting with "/"
+            params: Query parameters
+            headers: Request headers
+            content: Request body (buffered, so it can be resent)
+
+        Returns:
+            Streaming httpx response
+
+        Raises:
+            UpstreamUnavailable: If every attempt failed to connect or timed out
+        """
+        method = method.upper()
+        tried: List[_Instance] = []
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(min(0.05 * 2 ** (attempt - 1), 0.5))
+            instance = self._pick(tried)
+            tried.append(instance)
+            request = self.client.build_request(
+                method, instance.url + path, params=params, headers=headers, content=content
+            )
+
+            started = time.perf_counter()
+            instance.outstanding += 1
+            try:
+                response = await self.client.send(request, stream=True)
+            except httpx.TransportError as e:
+                instance.outstanding -= 1
+                self._observe(instance, "error", started)
+                last_error = e
+                if isinstance(e, EJECT_ERRORS):
+                    self._eject(instance)
+                if isinstance(e, NOT_SENT_ERRORS) or method in IDEMPOTENT_METHODS:
+                    continue
+                raise UpstreamUnavailable(f"{self.name} request failed: {e}") from e
+            response.stream = _TrackedStream(response.stream, instance)
+
+            self._observe(instance, str(response.status_code), started)
+            if response.status_code in RETRYABLE_STATUSES:
+                self._eject(instance)
+                if method in IDEMPOTENT_METHODS and attempt < self.retries:
+                    await response.aclose()
+                    continue
+            return response
+
+        raise UpstreamUnavailable(f"{self.name} unavailable: {last_error}")
+
+    def _observe(self, instance: _Instance, outcome: str, started: float):
+        # Time to response headers; streamed bodies are timed by the HTTP middleware
+        UPSTREAM_LATENCY.labels(upstream=self.name, instance=instance.url, outcome=outcome).observe(
+            time.perf_counter() - started
+        )
+
+    async def probe(self, path: str = "/") -> Dict[str, str]:
+        """
+        Check every instance concurrently
+
+        Returns:
+            Instance URL to "up" or an error description
+
+        Raises:
+            UpstreamUnavailable: If no instance is up
+        """
+        async def check(instance: _Instance) -> str:
+            try:
+                response = await self.client.get(instance.url + path)
+            except httpx.HTTPError as e:
+                return str(e) or type(e).__name__
+            return "up" if response.status_code < 500 else f"HTTP {response.status_code}"
+
+        results = await asyncio.gather(*[check(instance) for instance in self.instances])
+        statuses = {instance.url: result for instance, result in zip(self.instances, results)}
+        if "up" not in statuses.values():
+            raise UpstreamUnavailable(f"No {self.name} instance is up: {statuses}")
+        return statuses
+
+
+# Global design generation service pool
+design_service = UpstreamPool(
+    "design-generation",
+    settings.DESIGN_SERVICE_URLS,
+    timeout=httpx.Timeout(
+        settings.DESIGN_SERVICE_READ_TIMEOUT_SECONDS,
+        connect=settings.DESIGN_SERVICE_CONNECT_TIMEOUT_SECONDS,
+        pool=settings.DESIGN_SERVICE_CONNECT_TIMEOUT_SECONDS
+    ),
+    limits=httpx.Limits(
+        max_connections=settings.DESIGN_SERVICE_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.DESIGN_SERVICE_MAX_CONNECTIONS,
+        keepalive_expiry=settings.DESIGN_SERVICE_KEEPALIVE_SECONDS
+    ),
+    retries=settings.DESIGN_SERVICE_RETRIES,
+    eject_seconds=settings.DESIGN_SERVICE_EJECT_SECONDS
+)